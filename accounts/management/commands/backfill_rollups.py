@@ -0,0 +1,40 @@
+import datetime
+from django.core.management.base import BaseCommand, CommandError
+from clients.rollups import rebuild_client_counts
+from subscriptions.rollups import rebuild_membership_counts
+from payments.rollups import rebuild_revenue
+from subscriptions.occupancy import rebuild_occupancy
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает сводки по платежам, абонементам, клиентам и посещениям'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--from', dest='first_day', help='Начальная дата (ГГГГ-ММ-ДД)')
+        parser.add_argument('--to', dest='last_day', help='Конечная дата (ГГГГ-ММ-ДД)')
+
+    def _parse_date(self, value):
+        if not value:
+            return None
+        try:
+            return datetime.date.fromisoformat(value)
+        except ValueError:
+            raise CommandError(f'Неверная дата: {value}')
+
+    def handle(self, *args, **options):
+        first_day = self._parse_date(options['first_day'])
+        last_day = self._parse_date(options['last_day'])
+
+        revenue = rebuild_revenue(first_day, last_day)
+        self.stdout.write(f'Выручка: {revenue} строк')
+
+        memberships = rebuild_membership_counts(first_day, last_day)
+        self.stdout.write(f'Абонементы: {memberships} строк')
+
+        clients = rebuild_client_counts(first_day, last_day)
+        self.stdout.write(f'Клиенты: {clients} строк')
+
+        occupancy = rebuild_occupancy(first_day, last_day)
+        self.stdout.write(f'Посещаемость: {occupancy} строк')
+
+        self.stdout.write(self.style.SUCCESS('Сводки пересчитаны'))
@@ -0,0 +1,140 @@
+import datetime
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Sum, Q, Exists, OuterRef
+from django.utils import timezone
+from clients.models import Client, DailyClientCounts
+from subscriptions.models import Membership, MembershipPlan, HourlyOccupancy
+from payments.models import Payment, DailyRevenue
+
+DASHBOARD_CACHE_KEY = 'dashboard:metrics'
+# Сбрасывается сигналами; рассчитано на общий кэш из settings.CACHES
+DASHBOARD_CACHE_TIMEOUT = getattr(settings, 'DASHBOARD_CACHE_TIMEOUT', 60)
+
+# За сколько последних дней считается процент продлений
+RENEWAL_WINDOW_DAYS = 30
+
+# За сколько последних дней считается загруженность клуба
+OCCUPANCY_WINDOW_DAYS = 30
+CLUB_HOURLY_CAPACITY = getattr(settings, 'CLUB_HOURLY_CAPACITY', 60)
+
+
+def _percent(part, total):
+    if not total:
+        return '0%'
+    return f'{round(part * 100 / total)}%'
+
+
+def compute_dashboard_metrics(today=None):
+    """
+    Считает все показатели дашборда: по одному агрегирующему запросу
+    на абонементы и на сводки клиентов, платежей и посещаемости.
+    """
+    today = today or timezone.localdate()
+    month_start = today.replace(day=1)
+    week_later = today + datetime.timedelta(days=7)
+    renewal_from = today - datetime.timedelta(days=RENEWAL_WINDOW_DAYS)
+
+    clients = DailyClientCounts.objects.aggregate(
+        total=Sum('count'),
+        active=Sum('count', filter=Q(status='active')),
+        new_today=Sum('count', filter=Q(date=today)),
+        new_month=Sum('count', filter=Q(date__gte=month_start, date__lte=today)),
+    )
+
+    # Продлением считаем любой более поздний абонемент того же клиента
+    successors = Membership.objects.filter(
+        client=OuterRef('client'),
+        start_date__gt=OuterRef('start_date'),
+    )
+    memberships = Membership.objects.aggregate(
+        total=Count('id'),
+        active=Count('id', filter=Q(status='active')),
+        expiring_soon=Count('id', filter=Q(
+            status='active',
+            end_date__range=[today, week_later],
+        )),
+        expired=Count('id', filter=Q(status='expired')),
+        ended_recently=Count('id', filter=Q(
+            end_date__gte=renewal_from, end_date__lt=today,
+        )),
+        renewed=Count('id', filter=Q(
+            Exists(successors),
+            end_date__gte=renewal_from, end_date__lt=today,
+        )),
+    )
+
+    payments = DailyRevenue.objects.filter(status='completed').aggregate(
+        total=Sum('total'),
+        completed_count=Sum('count'),
+        today=Sum('total', filter=Q(date=today)),
+        month=Sum('total', filter=Q(date__gte=month_start, date__lte=today)),
+    )
+    total_payments = payments['total'] or 0
+    completed_count = payments['completed_count'] or 0
+
+    # Загруженность: средние входы в час (по часам, когда клуб посещали) к вместимости
+    occupancy = HourlyOccupancy.objects.filter(
+        date__gt=today - datetime.timedelta(days=OCCUPANCY_WINDOW_DAYS),
+        date__lte=today,
+        entries__gt=0,
+    ).aggregate(entries=Sum('entries'), hours=Count('id'))
+
+    popular_plans = list(MembershipPlan.objects.annotate(
+        active_count=Count('memberships', filter=Q(memberships__status='active'))
+    ).filter(active_count__gt=0).order_by('-active_count')[:5])
+
+    recent_payments = list(Payment.objects.filter(
+        status='completed'
+    ).select_related('client').order_by('-payment_date')[:10])
+
+    recent_clients = list(Client.objects.order_by('-registration_date')[:10])
+
+    return {
+        # Клиенты
+        'total_clients': clients['total'] or 0,
+        'active_clients': clients['active'] or 0,
+        'new_clients_today': clients['new_today'] or 0,
+        'new_clients_month': clients['new_month'] or 0,
+
+        # Абонементы
+        'active_memberships': memberships['active'],
+        'total_memberships': memberships['total'],
+        'expiring_soon': memberships['expiring_soon'],
+        'expired': memberships['expired'],
+
+        # Платежи
+        'total_payments': total_payments,
+        'today_payments': payments['today'] or 0,
+        'month_payments': payments['month'] or 0,
+
+        # Дополнительные данные
+        'popular_plans': popular_plans,
+        'recent_payments': recent_payments,
+        'recent_clients': recent_clients,
+        'statistics': {
+            'avg_payment': total_payments / completed_count if completed_count > 0 else 0,
+            'clients_with_memberships': Client.objects.filter(has_active_membership=True).count(),
+            'renewal_rate': _percent(memberships['renewed'], memberships['ended_recently']),
+            'occupancy_rate': (
+                _percent(occupancy['entries'], occupancy['hours'] * CLUB_HOURLY_CAPACITY)
+                if occupancy['hours'] else None
+            ),
+        },
+        'today': today,
+    }
+
+
+def get_dashboard_metrics():
+    """Показатели дашборда из кэша (пересчитываются не чаще раза в TTL)"""
+    today = timezone.localdate()
+    metrics = cache.get(DASHBOARD_CACHE_KEY)
+    if metrics is None or metrics['today'] != today:
+        metrics = compute_dashboard_metrics(today)
+        cache.set(DASHBOARD_CACHE_KEY, metrics, DASHBOARD_CACHE_TIMEOUT)
+    return metrics
+
+
+def invalidate_dashboard_metrics():
+    """Сбросить кэш дашборда"""
+    cache.delete(DASHBOARD_CACHE_KEY)
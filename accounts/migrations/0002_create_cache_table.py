@@ -0,0 +1,20 @@
+from django.core.management import call_command
+from django.db import migrations
+
+
+def create_cache_table(apps, schema_editor):
+    # Таблица общего кэша (CACHES в settings): сигналы сбрасывают кэш при
+    # каждом сохранении клиента, абонемента и платежа, поэтому таблица
+    # должна появиться вместе с обычным migrate. Существующая не трогается
+    call_command('createcachetable', database=schema_editor.connection.alias, verbosity=0)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_cache_table, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,19 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from clients.models import Client
+from subscriptions.models import Membership, MembershipPlan
+from payments.models import Payment
+from .metrics import invalidate_dashboard_metrics
+
+
+@receiver(post_save, sender=Client)
+@receiver(post_delete, sender=Client)
+@receiver(post_save, sender=Membership)
+@receiver(post_delete, sender=Membership)
+@receiver(post_save, sender=MembershipPlan)
+@receiver(post_delete, sender=MembershipPlan)
+@receiver(post_save, sender=Payment)
+@receiver(post_delete, sender=Payment)
+def reset_dashboard_metrics(sender, **kwargs):
+    """Любое изменение клиентов, абонементов и платежей сбрасывает кэш дашборда"""
+    invalidate_dashboard_metrics()
@@ -4,11 +4,7 @@ from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from .forms import LoginForm, RegisterForm, UserUpdateForm
 from .models import User
-from clients.models import Client
-from subscriptions.models import Membership, MembershipPlan
-from payments.models import Payment
-from django.utils import timezone
-import datetime
+from .metrics import get_dashboard_metrics
 from django.contrib.auth.views import (
     PasswordResetView,
     PasswordResetDoneView,
@@ -16,7 +12,6 @@ from django.contrib.auth.views import (
     PasswordResetCompleteView
 )
 from django.urls import reverse_lazy
-from django.db.models import Count, Sum, Q
 
 def login_view(request):
     """Кастомный view для входа в систему"""
@@ -85,89 +80,7 @@ def profile_view(request):
 @login_required
 def dashboard_view(request):
     """Дашборд системы с расширенной аналитикой"""
-    today = timezone.now().date()
-    
-    total_clients = Client.objects.count()
-    active_clients = Client.objects.filter(status='active').count()
-    new_clients_today = Client.objects.filter(
-        registration_date__date=today
-    ).count()
-    new_clients_month = Client.objects.filter(
-        registration_date__date__gte=today.replace(day=1)
-    ).count()
-    
-    active_memberships = Membership.objects.filter(status='active').count()
-    total_memberships = Membership.objects.count()
-    
-    week_later = today + datetime.timedelta(days=7)
-    expiring_soon = Membership.objects.filter(
-        status='active',
-        end_date__range=[today, week_later]
-    ).count()
-    
-    expired = Membership.objects.filter(
-        status='active',
-        end_date__lt=today
-    ).count()
-    
-    total_payments = Payment.objects.filter(status='completed').aggregate(
-        total=Sum('amount')
-    )['total'] or 0
-    
-    today_payments = Payment.objects.filter(
-        status='completed',
-        payment_date__date=today
-    ).aggregate(total=Sum('amount'))['total'] or 0
-    
-    month_payments = Payment.objects.filter(
-        status='completed',
-        payment_date__date__gte=today.replace(day=1)
-    ).aggregate(total=Sum('amount'))['total'] or 0
-    
-    popular_plans = MembershipPlan.objects.annotate(
-        active_count=Count('memberships', filter=Q(memberships__status='active'))
-    ).filter(active_count__gt=0).order_by('-active_count')[:5]
-    
-    recent_payments = Payment.objects.filter(
-        status='completed'
-    ).select_related('client').order_by('-payment_date')[:10]
-    
-    recent_clients = Client.objects.all().order_by('-registration_date')[:10]
-    
-    completed_payments_count = Payment.objects.filter(status='completed').count()
-    statistics = {
-        'avg_payment': total_payments / completed_payments_count if completed_payments_count > 0 else 0,
-        'clients_with_memberships': Client.objects.filter(memberships__status='active').distinct().count(),
-        'renewal_rate': '78%',  
-        'occupancy_rate': '65%',  
-    }
-    
-    context = {
-        # Клиенты
-        'total_clients': total_clients,
-        'active_clients': active_clients,
-        'new_clients_today': new_clients_today,
-        'new_clients_month': new_clients_month,
-        
-        # Абонементы
-        'active_memberships': active_memberships,
-        'total_memberships': total_memberships,
-        'expiring_soon': expiring_soon,
-        'expired': expired,
-        
-        # Платежи
-        'total_payments': total_payments,
-        'today_payments': today_payments,
-        'month_payments': month_payments,
-        
-        # Дополнительные данные
-        'popular_plans': popular_plans,
-        'recent_payments': recent_payments,
-        'recent_clients': recent_clients,
-        'statistics': statistics,
-        'today': today,
-    }
-    
+    context = get_dashboard_metrics()
     return render(request, 'dashboard.html', context)
 
 # Password Reset Views
@@ -1,18 +1,30 @@
+import io
+from django import forms
 from django.contrib import admin
+from django.core.exceptions import PermissionDenied
+from django.http import HttpResponse
+from django.template.response import TemplateResponse
+from django.urls import path
 from .models import Client
 
+class ClientImportUploadForm(forms.Form):
+    file = forms.FileField(label='Файл (CSV или XLSX)')
+    batch_size = forms.IntegerField(label='Размер пачки', min_value=100, max_value=10000, initial=1000)
+    dry_run = forms.BooleanField(label='Только проверить', required=False)
+
 @admin.register(Client)
 class ClientAdmin(admin.ModelAdmin):
     list_display = ('get_full_name', 'phone', 'email', 'status', 'registration_date')
     list_filter = ('status', 'registration_date')
-    search_fields = ('first_name', 'last_name', 'phone', 'email')
+    search_fields = ('first_name', 'last_name', 'phone', 'card_number', 'email')
     readonly_fields = ('created_at', 'updated_at', 'registration_date')
+    change_list_template = 'admin/clients/client/change_list.html'
     fieldsets = (
         ('Основная информация', {
             'fields': ('first_name', 'last_name', 'middle_name', 'birth_date')
         }),
         ('Контактная информация', {
-            'fields': ('phone', 'email')
+            'fields': ('phone', 'card_number', 'email')
         }),
         ('Дополнительно', {
             'fields': ('photo', 'medical_notes', 'notes', 'status')
@@ -25,4 +37,47 @@ class ClientAdmin(admin.ModelAdmin):
     
     def get_full_name(self, obj):
         return obj.get_full_name()
-    get_full_name.short_description = 'ФИО'
\ No newline at end of file
+    get_full_name.short_description = 'ФИО'
+    
+    def get_urls(self):
+        urls = [
+            path('import/', self.admin_site.admin_view(self.import_view), name='clients_client_import'),
+        ]
+        return urls + super().get_urls()
+    
+    def import_view(self, request):
+        """Массовый импорт клиентов из файла"""
+        from .importer import import_clients
+        
+        if not self.has_add_permission(request):
+            raise PermissionDenied
+        
+        result = None
+        form = ClientImportUploadForm(request.POST or None, request.FILES or None)
+        if request.method == 'POST' and form.is_valid():
+            upload = form.cleaned_data['file']
+            try:
+                result = import_clients(
+                    upload, upload.name,
+                    batch_size=form.cleaned_data['batch_size'],
+                    dry_run=form.cleaned_data['dry_run'],
+                )
+            except ValueError as exc:
+                form.add_error('file', str(exc))
+            else:
+                if result.errors and 'report' in request.POST:
+                    report = io.StringIO()
+                    result.write_report(report)
+                    response = HttpResponse('\ufeff' + report.getvalue(), content_type='text/csv; charset=utf-8')
+                    response['Content-Disposition'] = 'attachment; filename="import_errors.csv"'
+                    return response
+        
+        context = {
+            **self.admin_site.each_context(request),
+            'opts': self.model._meta,
+            'title': 'Импорт клиентов',
+            'form': form,
+            'result': result,
+            'errors': result.errors[:500] if result else [],
+        }
+        return TemplateResponse(request, 'admin/clients/client/import.html', context)
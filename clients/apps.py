@@ -3,4 +3,7 @@ from django.apps import AppConfig
 class ClientsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'clients'
-    verbose_name = 'Управление клиентами'
\ No newline at end of file
+    verbose_name = 'Управление клиентами'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,108 @@
+import datetime
+import logging
+import tempfile
+from django.conf import settings
+from django.core.files import File
+from django.db.models import Q
+from django.http import QueryDict
+from django.utils import timezone
+from .models import ExportJob
+
+logger = logging.getLogger(__name__)
+
+# Сколько клиентов можно выгрузить прямо в запросе; больше - фоновой задачей
+BACKGROUND_THRESHOLD = getattr(settings, 'CLIENT_EXPORT_BACKGROUND_THRESHOLD', 20000)
+
+# Через сколько секунд выгрузка в статусе 'running' считается зависшей
+EXPORT_JOB_TIMEOUT = getattr(settings, 'EXPORT_JOB_TIMEOUT', 30 * 60)
+
+# Только колонки, которые попадают в PDF (без medical_notes, notes и т.п.)
+PDF_COLUMNS = ('last_name', 'first_name', 'middle_name', 'phone', 'email')
+
+
+def write_clients_pdf(clients, output):
+    """
+    Рисует список клиентов в PDF. Данные читаются порциями через iterator(),
+    поэтому память не зависит от количества клиентов. Возвращает число строк.
+    """
+    from reportlab.pdfgen import canvas
+    from reportlab.lib.pagesizes import A4
+
+    p = canvas.Canvas(output, pagesize=A4)
+
+    # Заголовок
+    p.setFont("Helvetica-Bold", 16)
+    p.drawString(50, 800, "Список клиентов фитнес-клуба")
+
+    # Данные
+    p.setFont("Helvetica", 10)
+    y = 750
+    count = 0
+    rows = clients.order_by('last_name', 'first_name', 'id').values_list(*PDF_COLUMNS)
+
+    for last_name, first_name, middle_name, phone, email in rows.iterator(chunk_size=2000):
+        if y < 50:
+            p.showPage()
+            p.setFont("Helvetica", 10)
+            y = 750
+
+        full_name = ' '.join(part for part in (last_name, first_name, middle_name) if part)
+        p.drawString(50, y, full_name)
+        p.drawString(200, y, phone)
+        p.drawString(300, y, email or '-')
+        y -= 20
+        count += 1
+
+    p.save()
+    return count
+
+
+def run_export_job(job_id):
+    """Сформировать файл выгрузки (вызывается в фоне или из manage.py)"""
+    from .models import Client
+    from .forms import ClientSearchForm, filter_clients
+
+    updated = ExportJob.objects.filter(pk=job_id, status='pending').update(
+        status='running', started_at=timezone.now(),
+    )
+    if not updated:
+        return
+    job = ExportJob.objects.get(pk=job_id)
+
+    try:
+        form = ClientSearchForm(QueryDict(job.params) or None)
+        clients = filter_clients(Client.objects.all(), form)
+        with tempfile.TemporaryFile() as output:
+            job.row_count = write_clients_pdf(clients, output)
+            output.seek(0)
+            job.file.save(f'clients_{job.pk}.pdf', File(output), save=False)
+        job.status = 'done'
+    except Exception as exc:
+        logger.exception('Export job %s failed', job_id)
+        job.status = 'failed'
+        job.error = str(exc)
+    job.finished_at = timezone.now()
+    job.save()
+
+
+def release_stale_jobs(now=None):
+    """Вернуть в очередь выгрузки, которые формировал упавший обработчик"""
+    now = now or timezone.now()
+    stale_before = now - datetime.timedelta(seconds=EXPORT_JOB_TIMEOUT)
+    return ExportJob.objects.filter(status='running').filter(
+        Q(started_at__lt=stale_before) | Q(started_at__isnull=True)
+    ).update(status='pending', started_at=None)
+
+
+def run_export_jobs():
+    """Сформировать все выгрузки из очереди; возвращает (обработано, возвращено в очередь)"""
+    released = release_stale_jobs()
+    job_ids = list(ExportJob.objects.filter(status='pending').order_by('created_at').values_list('id', flat=True))
+    for job_id in job_ids:
+        run_export_job(job_id)
+    return len(job_ids), released
+
+
+def start_export_job(params, user):
+    """Поставить выгрузку в очередь (ее сформирует manage.py run_export_jobs)"""
+    return ExportJob.objects.create(kind='clients_pdf', params=params, created_by=user)
@@ -1,6 +1,7 @@
 from django import forms
 from django.core.validators import RegexValidator
 from .models import Client
+from .search import search_clients
 
 class ClientForm(forms.ModelForm):
     phone_validator = RegexValidator(
@@ -20,7 +21,7 @@ class ClientForm(forms.ModelForm):
         model = Client
         fields = [
             'first_name', 'last_name', 'middle_name',
-            'phone', 'email', 'birth_date',
+            'phone', 'card_number', 'email', 'birth_date',
             'medical_notes', 'notes', 'status', 'photo'
         ]
         widgets = {
@@ -36,6 +37,10 @@ class ClientForm(forms.ModelForm):
                 'class': 'form-control',
                 'placeholder': 'Введите отчество'
             }),
+            'card_number': forms.TextInput(attrs={
+                'class': 'form-control',
+                'placeholder': 'Номер клубной карты'
+            }),
             'email': forms.EmailInput(attrs={
                 'class': 'form-control',
                 'placeholder': 'email@example.com'
@@ -78,4 +83,47 @@ class ClientSearchForm(forms.Form):
         required=False,
         choices=[('', 'Все статусы')] + Client.STATUS_CHOICES,
         widget=forms.Select(attrs={'class': 'form-control'})
-    )
\ No newline at end of file
+    )
+    
+    membership = forms.ChoiceField(
+        required=False,
+        label='Абонемент',
+        choices=[
+            ('', 'Все клиенты'),
+            ('active', 'С активным абонементом'),
+            ('none', 'Без активного абонемента'),
+        ],
+        widget=forms.Select(attrs={'class': 'form-control'})
+    )
+    
+    order = forms.ChoiceField(
+        required=False,
+        label='Сортировка',
+        choices=[
+            ('', 'По ФИО'),
+            ('total_paid', 'По сумме оплат'),
+        ],
+        widget=forms.Select(attrs={'class': 'form-control'})
+    )
+
+
+def filter_clients(clients, form):
+    """Применить фильтры ClientSearchForm к выборке клиентов"""
+    if not form.is_valid():
+        return clients
+    
+    search = form.cleaned_data.get('search')
+    status = form.cleaned_data.get('status')
+    membership = form.cleaned_data.get('membership')
+    
+    if search:
+        clients = search_clients(search, clients)
+    
+    if status:
+        clients = clients.filter(status=status)
+    
+    # Фильтр по сводному полю, без JOIN с абонементами
+    if membership:
+        clients = clients.filter(has_active_membership=(membership == 'active'))
+    
+    return clients
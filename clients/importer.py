@@ -0,0 +1,207 @@
+import csv
+import datetime
+import io
+import os
+from django import forms
+from django.db import transaction
+from .forms import ClientForm
+from .models import Client, month_day
+from .rollups import clients_created
+from .search import normalize_phone
+
+IMPORT_FIELDS = [
+    'last_name', 'first_name', 'middle_name', 'phone', 'email',
+    'birth_date', 'status', 'medical_notes', 'notes',
+]
+
+# Заголовки колонок: имена полей модели и их русские названия
+HEADER_ALIASES = {field: field for field in IMPORT_FIELDS}
+HEADER_ALIASES.update({
+    Client._meta.get_field(field).verbose_name.lower(): field for field in IMPORT_FIELDS
+})
+HEADER_ALIASES.update({'e-mail': 'email', 'телефон клиента': 'phone'})
+
+STATUS_ALIASES = {label.lower(): value for value, label in Client.STATUS_CHOICES}
+
+
+class ClientImportForm(ClientForm):
+    """Проверка одной строки импорта (без фото и без запроса уникальности)"""
+
+    birth_date = forms.DateField(required=False, input_formats=['%Y-%m-%d', '%d.%m.%Y', '%d/%m/%Y'])
+
+    class Meta(ClientForm.Meta):
+        fields = IMPORT_FIELDS
+
+    def clean_phone(self):
+        # Уникальность проверяется одним запросом на всю пачку
+        return self.cleaned_data.get('phone')
+
+    def validate_unique(self):
+        pass
+
+
+def _cell(value):
+    if value is None:
+        return ''
+    if isinstance(value, datetime.datetime):
+        return value.date().isoformat()
+    if isinstance(value, datetime.date):
+        return value.isoformat()
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value).strip()
+
+
+def _header_map(header):
+    """Номер колонки -> поле модели (неизвестные колонки пропускаются)"""
+    mapping = {}
+    for index, title in enumerate(header):
+        field = HEADER_ALIASES.get(_cell(title).lower())
+        if field:
+            mapping[index] = field
+    if 'phone' not in mapping.values():
+        raise ValueError('В файле нет колонки с телефоном')
+    return mapping
+
+
+def _csv_rows(file):
+    text = io.TextIOWrapper(file, encoding='utf-8-sig', newline='')
+    sample = text.read(4096)
+    text.seek(0)
+    try:
+        dialect = csv.Sniffer().sniff(sample, delimiters=',;\t')
+    except csv.Error:
+        dialect = csv.excel
+    yield from csv.reader(text, dialect)
+
+
+def _xlsx_rows(file):
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(file, read_only=True, data_only=True)
+    try:
+        yield from workbook.active.iter_rows(values_only=True)
+    finally:
+        workbook.close()
+
+
+def read_rows(file, filename):
+    """
+    Построчно читает CSV или XLSX. Возвращает пары (номер строки, данные),
+    номер считается как в табличном редакторе (заголовок - строка 1).
+    """
+    ext = os.path.splitext(filename)[1].lower()
+    if ext == '.xlsx':
+        rows = _xlsx_rows(file)
+    elif ext in ('.csv', '.txt'):
+        rows = _csv_rows(file)
+    else:
+        raise ValueError(f'Неподдерживаемый формат файла: {ext or filename}')
+
+    mapping = None
+    for number, row in enumerate(rows, start=1):
+        if mapping is None:
+            mapping = _header_map(row)
+            continue
+        values = {field: _cell(row[index]) for index, field in mapping.items() if index < len(row)}
+        if any(values.values()):
+            yield number, values
+
+
+class ImportResult:
+    def __init__(self):
+        self.created = 0
+        self.processed = 0
+        self.errors = []
+
+    def add_error(self, row_number, data, message):
+        self.errors.append((row_number, data.get('phone', ''), message))
+
+    def write_report(self, output):
+        """Отчет об ошибках в CSV: строка файла, телефон, причина"""
+        writer = csv.writer(output)
+        writer.writerow(['Строка', 'Телефон', 'Ошибка'])
+        writer.writerows(self.errors)
+
+
+def _field_label(field):
+    if field in IMPORT_FIELDS:
+        return Client._meta.get_field(field).verbose_name
+    return field
+
+
+def _validate(number, data, result):
+    data = dict(data)
+    if data.get('phone'):
+        data['phone'] = normalize_phone(data['phone'])
+    if data.get('status'):
+        data['status'] = STATUS_ALIASES.get(data['status'].lower(), data['status'])
+    else:
+        data['status'] = 'active'
+
+    form = ClientImportForm(data)
+    if form.is_valid():
+        return form.instance
+    message = '; '.join(
+        f'{_field_label(field)}: {" ".join(errors)}' for field, errors in form.errors.items()
+    )
+    result.add_error(number, data, message)
+    return None
+
+
+def _import_batch(batch, result, seen_phones, dry_run):
+    """Проверить пачку строк и сохранить подходящих клиентов одним bulk_create"""
+    candidates = []
+    for number, data in batch:
+        client = _validate(number, data, result)
+        if client is None:
+            continue
+        if client.phone in seen_phones:
+            result.add_error(number, data, 'Телефон повторяется в файле')
+            continue
+        seen_phones.add(client.phone)
+        candidates.append((number, data, client))
+
+    # Один запрос на всю пачку вместо проверки каждого телефона
+    existing = set(
+        Client.objects.filter(phone__in=[client.phone for _, _, client in candidates])
+        .values_list('phone', flat=True)
+    )
+    clients = []
+    for number, data, client in candidates:
+        if client.phone in existing:
+            result.add_error(number, data, 'Клиент с таким телефоном уже существует')
+        else:
+            clients.append(client)
+
+    result.processed += len(batch)
+    if dry_run or not clients:
+        return
+
+    # bulk_create не вызывает save(): день рождения для поиска заполняем сами
+    for client in clients:
+        client.birth_month_day = month_day(client.birth_date)
+
+    with transaction.atomic():
+        created = Client.objects.bulk_create(clients)
+        clients_created(created)
+    result.created += len(created)
+
+
+def import_clients(file, filename, batch_size=1000, dry_run=False):
+    """
+    Импорт клиентов из CSV/XLSX. Файл читается потоково, каждая пачка из
+    batch_size строк проверяется и сохраняется в своей транзакции, поэтому
+    ошибка в одной строке не отменяет остальные. Возвращает ImportResult.
+    """
+    result = ImportResult()
+    seen_phones = set()
+    batch = []
+    for number, data in read_rows(file, filename):
+        batch.append((number, data))
+        if len(batch) >= batch_size:
+            _import_batch(batch, result, seen_phones, dry_run)
+            batch = []
+    if batch:
+        _import_batch(batch, result, seen_phones, dry_run)
+    return result
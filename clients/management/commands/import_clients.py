@@ -0,0 +1,44 @@
+import os
+from django.core.management.base import BaseCommand, CommandError
+from clients.importer import import_clients
+
+
+class Command(BaseCommand):
+    help = 'Импортирует клиентов из CSV или XLSX файла'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Путь к файлу .csv или .xlsx')
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Сколько строк проверять и сохранять в одной транзакции')
+        parser.add_argument('--errors', dest='errors_path',
+                            help='Куда записать отчет об ошибках (CSV)')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Только проверить файл, ничего не сохранять')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        if not os.path.exists(path):
+            raise CommandError(f'Файл не найден: {path}')
+
+        try:
+            with open(path, 'rb') as file:
+                result = import_clients(
+                    file, path,
+                    batch_size=options['batch_size'],
+                    dry_run=options['dry_run'],
+                )
+        except ValueError as exc:
+            raise CommandError(str(exc))
+
+        if options['errors_path'] and result.errors:
+            with open(options['errors_path'], 'w', encoding='utf-8-sig', newline='') as report:
+                result.write_report(report)
+        else:
+            for row_number, phone, message in result.errors[:20]:
+                self.stderr.write(f'Строка {row_number} ({phone}): {message}')
+            if len(result.errors) > 20:
+                self.stderr.write(f'... и еще {len(result.errors) - 20} ошибок (см. --errors)')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Строк: {result.processed}, добавлено клиентов: {result.created}, ошибок: {len(result.errors)}'
+        ))
@@ -0,0 +1,34 @@
+import os
+from django.core.management.base import BaseCommand
+from clients.models import Client, client_photo_path
+from clients.photos import generate_variants
+
+
+class Command(BaseCommand):
+    help = 'Переносит фото клиентов под постоянные ключи и создает уменьшенные копии'
+
+    def handle(self, *args, **options):
+        moved = processed = failed = 0
+        clients = Client.objects.exclude(photo='').exclude(photo__isnull=True).only('id', 'photo')
+
+        for client in clients.iterator(chunk_size=500):
+            storage = client.photo.storage
+            name = client.photo.name
+            try:
+                # Старая схема: clients/photos/client_<id>/photo_<id>.<ext>
+                if os.path.basename(os.path.splitext(name)[0]) != 'original':
+                    with storage.open(name, 'rb') as source:
+                        new_name = storage.save(client_photo_path(client, name), source)
+                    Client.objects.filter(pk=client.pk).update(photo=new_name)
+                    storage.delete(name)
+                    name = new_name
+                    moved += 1
+                generate_variants(name, storage)
+                processed += 1
+            except (OSError, ValueError) as exc:
+                failed += 1
+                self.stderr.write(f'Клиент {client.pk}: {exc}')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Обработано фото: {processed}, перенесено: {moved}, ошибок: {failed}'
+        ))
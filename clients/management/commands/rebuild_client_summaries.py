@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from clients.summary import rebuild_client_summaries
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает сводку клиентов (активный абонемент, окончание абонемента, '
+        'сумма и дата последнего платежа)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        total = rebuild_client_summaries(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Обновлена сводка клиентов: {total}'))
@@ -0,0 +1,26 @@
+import time
+from django.core.management.base import BaseCommand
+from clients.exports import run_export_jobs
+
+
+class Command(BaseCommand):
+    help = (
+        'Формирует файлы выгрузок, оставшиеся в очереди, и возвращает в очередь зависшие. '
+        'С --loop работает постоянно как обработчик очереди'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true',
+                            help='Не завершаться, а проверять очередь каждые --interval секунд')
+        parser.add_argument('--interval', type=int, default=10)
+
+    def handle(self, *args, **options):
+        while True:
+            processed, released = run_export_jobs()
+            if released:
+                self.stdout.write(self.style.WARNING(f'Возвращено в очередь зависших: {released}'))
+            if processed or not options['loop']:
+                self.stdout.write(self.style.SUCCESS(f'Обработано выгрузок: {processed}'))
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
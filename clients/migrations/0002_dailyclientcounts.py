@@ -0,0 +1,36 @@
+# Generated by Django 4.2 on 2026-10-17 06:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clients', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyClientCounts',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='Дата регистрации')),
+                ('status', models.CharField(choices=[('active', 'Активный'), ('inactive', 'Неактивный'), ('suspended', 'Приостановлен')], max_length=20, verbose_name='Статус')),
+                ('count', models.IntegerField(default=0, verbose_name='Количество')),
+            ],
+            options={
+                'verbose_name': 'Клиенты за день',
+                'verbose_name_plural': 'Клиенты по дням',
+                'ordering': ['-date'],
+            },
+        ),
+        migrations.AlterField(
+            model_name='client',
+            name='phone',
+            field=models.CharField(help_text='Формат: +996XXXXXXXXX', max_length=20, unique=True, verbose_name='Телефон'),
+        ),
+        migrations.AddConstraint(
+            model_name='dailyclientcounts',
+            constraint=models.UniqueConstraint(fields=('date', 'status'), name='unique_daily_client_counts'),
+        ),
+    ]
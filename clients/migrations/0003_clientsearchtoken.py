@@ -0,0 +1,31 @@
+# Generated by Django 4.2 on 2026-10-17 06:35
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clients', '0002_dailyclientcounts'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ClientSearchToken',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('name', 'ФИО'), ('phone', 'Телефон'), ('email', 'Email')], max_length=10, verbose_name='Тип')),
+                ('token', models.CharField(max_length=254, verbose_name='Токен')),
+                ('client', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_tokens', to='clients.client', verbose_name='Клиент')),
+            ],
+            options={
+                'verbose_name': 'Поисковый токен клиента',
+                'verbose_name_plural': 'Поисковые токены клиентов',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='clientsearchtoken',
+            index=models.Index(fields=['kind', 'token'], name='clients_cli_kind_5e01dd_idx'),
+        ),
+    ]
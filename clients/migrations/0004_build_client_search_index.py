@@ -0,0 +1,33 @@
+from django.db import migrations
+
+
+def build_index(apps, schema_editor):
+    from clients.search import client_tokens
+    Client = apps.get_model('clients', 'Client')
+    ClientSearchToken = apps.get_model('clients', 'ClientSearchToken')
+    last_id = 0
+    while True:
+        batch = list(Client.objects.filter(id__gt=last_id).order_by('id')[:2000])
+        if not batch:
+            break
+        ClientSearchToken.objects.bulk_create([
+            ClientSearchToken(client_id=client.pk, kind=kind, token=token[:254])
+            for client in batch
+            for kind, token in client_tokens(client)
+        ], batch_size=1000)
+        last_id = batch[-1].id
+
+
+def clear_index(apps, schema_editor):
+    apps.get_model('clients', 'ClientSearchToken').objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clients', '0003_clientsearchtoken'),
+    ]
+
+    operations = [
+        migrations.RunPython(build_index, clear_index),
+    ]
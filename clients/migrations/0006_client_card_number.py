@@ -0,0 +1,18 @@
+# Generated by Django 4.2 on 2026-10-17 06:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clients', '0005_exportjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='client',
+            name='card_number',
+            field=models.CharField(blank=True, max_length=32, null=True, unique=True, verbose_name='Номер карты'),
+        ),
+    ]
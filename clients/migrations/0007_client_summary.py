@@ -0,0 +1,49 @@
+# Generated by Django 4.2 on 2026-10-17 06:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clients', '0006_client_card_number'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='client',
+            name='has_active_membership',
+            field=models.BooleanField(default=False, editable=False, verbose_name='Есть активный абонемент'),
+        ),
+        migrations.AddField(
+            model_name='client',
+            name='last_payment_date',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='Последний платеж'),
+        ),
+        migrations.AddField(
+            model_name='client',
+            name='membership_end_date',
+            field=models.DateField(blank=True, editable=False, null=True, verbose_name='Окончание последнего абонемента'),
+        ),
+        migrations.AddField(
+            model_name='client',
+            name='total_paid',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=12, verbose_name='Оплачено всего'),
+        ),
+        migrations.AddIndex(
+            model_name='client',
+            index=models.Index(fields=['has_active_membership', 'last_name', 'first_name'], name='clients_cli_has_act_178244_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='client',
+            index=models.Index(fields=['membership_end_date'], name='clients_cli_members_f6f6ce_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='client',
+            index=models.Index(fields=['total_paid'], name='clients_cli_total_p_93e786_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='client',
+            index=models.Index(fields=['last_payment_date'], name='clients_cli_last_pa_8103e5_idx'),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 4.2 on 2026-10-17 07:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clients', '0007_client_summary'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='client',
+            name='birth_month_day',
+            field=models.PositiveSmallIntegerField(blank=True, editable=False, null=True, verbose_name='День рождения (ММДД)'),
+        ),
+        migrations.AddIndex(
+            model_name='client',
+            index=models.Index(fields=['birth_month_day'], name='clients_cli_birth_m_8f1d35_idx'),
+        ),
+    ]
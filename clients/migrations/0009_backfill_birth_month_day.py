@@ -0,0 +1,29 @@
+from django.db import migrations
+
+
+def backfill_birth_month_day(apps, schema_editor):
+    Client = apps.get_model('clients', 'Client')
+    last_id = 0
+    while True:
+        batch = list(
+            Client.objects.filter(id__gt=last_id, birth_date__isnull=False)
+            .only('id', 'birth_date')
+            .order_by('id')[:2000]
+        )
+        if not batch:
+            break
+        for client in batch:
+            client.birth_month_day = client.birth_date.month * 100 + client.birth_date.day
+        Client.objects.bulk_update(batch, ['birth_month_day'])
+        last_id = batch[-1].id
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clients', '0008_client_birth_month_day'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_birth_month_day, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2 on 2026-10-17 07:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clients', '0009_backfill_birth_month_day'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='exportjob',
+            name='started_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Начато'),
+        ),
+    ]
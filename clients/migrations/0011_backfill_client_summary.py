@@ -0,0 +1,55 @@
+from decimal import Decimal
+from django.db import migrations
+from django.db.models import Count, Max, Q, Sum
+
+
+def backfill_client_summary(apps, schema_editor):
+    Client = apps.get_model('clients', 'Client')
+    Membership = apps.get_model('subscriptions', 'Membership')
+    Payment = apps.get_model('payments', 'Payment')
+    last_id = 0
+    while True:
+        batch = list(
+            Client.objects.filter(id__gt=last_id)
+            .only('id')
+            .order_by('id')[:2000]
+        )
+        if not batch:
+            break
+        ids = [client.id for client in batch]
+        memberships = {
+            row['client_id']: row
+            for row in Membership.objects.filter(client_id__in=ids).values('client_id')
+            .annotate(active=Count('id', filter=Q(status='active')), end_date=Max('end_date'))
+            .order_by()
+        }
+        payments = {
+            row['client_id']: row
+            for row in Payment.objects.filter(client_id__in=ids, status='completed').values('client_id')
+            .annotate(total=Sum('amount'), last=Max('payment_date'))
+            .order_by()
+        }
+        for client in batch:
+            membership = memberships.get(client.id, {})
+            payment = payments.get(client.id, {})
+            client.has_active_membership = membership.get('active', 0) > 0
+            client.membership_end_date = membership.get('end_date')
+            client.total_paid = payment.get('total') or Decimal('0')
+            client.last_payment_date = payment.get('last')
+        Client.objects.bulk_update(batch, [
+            'has_active_membership', 'membership_end_date', 'total_paid', 'last_payment_date',
+        ])
+        last_id = batch[-1].id
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clients', '0010_exportjob_started_at'),
+        ('subscriptions', '0001_initial'),
+        ('payments', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_client_summary, migrations.RunPython.noop),
+    ]
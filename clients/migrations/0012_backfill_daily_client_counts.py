@@ -0,0 +1,32 @@
+from django.db import migrations
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+
+
+def backfill_daily_client_counts(apps, schema_editor):
+    Client = apps.get_model('clients', 'Client')
+    DailyClientCounts = apps.get_model('clients', 'DailyClientCounts')
+    # День регистрации - местный (TruncDate в текущем часовом поясе)
+    aggregates = (
+        Client.objects
+        .annotate(day=TruncDate('registration_date'))
+        .values('day', 'status')
+        .annotate(count=Count('id'))
+        .order_by()
+    )
+    DailyClientCounts.objects.all().delete()
+    DailyClientCounts.objects.bulk_create([
+        DailyClientCounts(date=row['day'], status=row['status'], count=row['count'])
+        for row in aggregates.iterator()
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clients', '0011_backfill_client_summary'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_daily_client_counts, migrations.RunPython.noop),
+    ]
@@ -1,12 +1,21 @@
+from django.conf import settings
 from django.db import models
 from django.core.validators import MinLengthValidator, EmailValidator
 from django.utils import timezone
 import os
+import uuid
 
 def client_photo_path(instance, filename):
-    ext = filename.split('.')[-1]
-    filename = f'photo_{instance.id}.{ext}'
-    return os.path.join('clients', 'photos', f'client_{instance.id}', filename)
+    # id нового клиента еще не известен, поэтому ключ файла - случайный uuid
+    ext = filename.split('.')[-1].lower()
+    key = uuid.uuid4().hex
+    return os.path.join('clients', 'photos', key[:2], key, f'original.{ext}')
+
+def month_day(day):
+    """Дата как число ММДД (1 марта -> 301), None для пустой даты"""
+    if day is None:
+        return None
+    return day.month * 100 + day.day
 
 class Client(models.Model):
     STATUS_CHOICES = [
@@ -48,12 +57,29 @@ class Client(models.Model):
         validators=[EmailValidator()]
     )
     
+    # Номер клубной карты (для входа через турникет)
+    card_number = models.CharField(
+        max_length=32,
+        verbose_name='Номер карты',
+        unique=True,
+        blank=True,
+        null=True
+    )
+    
     birth_date = models.DateField(
         verbose_name='Дата рождения',
         blank=True,
         null=True
     )
     
+    # Месяц и день рождения числом ММДД (для поиска именинников по индексу)
+    birth_month_day = models.PositiveSmallIntegerField(
+        verbose_name='День рождения (ММДД)',
+        blank=True,
+        null=True,
+        editable=False
+    )
+    
     photo = models.ImageField(
         upload_to=client_photo_path,
         verbose_name='Фото',
@@ -86,6 +112,37 @@ class Client(models.Model):
         null=True
     )
     
+    # Сводка по абонементам и платежам (обновляется в clients.summary)
+    SUMMARY_FIELDS = ['has_active_membership', 'membership_end_date', 'total_paid', 'last_payment_date']
+    
+    has_active_membership = models.BooleanField(
+        verbose_name='Есть активный абонемент',
+        default=False,
+        editable=False
+    )
+    
+    membership_end_date = models.DateField(
+        verbose_name='Окончание последнего абонемента',
+        blank=True,
+        null=True,
+        editable=False
+    )
+    
+    total_paid = models.DecimalField(
+        verbose_name='Оплачено всего',
+        max_digits=12,
+        decimal_places=2,
+        default=0,
+        editable=False
+    )
+    
+    last_payment_date = models.DateTimeField(
+        verbose_name='Последний платеж',
+        blank=True,
+        null=True,
+        editable=False
+    )
+    
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
@@ -97,6 +154,11 @@ class Client(models.Model):
             models.Index(fields=['last_name', 'first_name']),
             models.Index(fields=['phone']),
             models.Index(fields=['status']),
+            models.Index(fields=['has_active_membership', 'last_name', 'first_name']),
+            models.Index(fields=['membership_end_date']),
+            models.Index(fields=['total_paid']),
+            models.Index(fields=['last_payment_date']),
+            models.Index(fields=['birth_month_day']),
         ]
     
     def __str__(self):
@@ -104,6 +166,17 @@ class Client(models.Model):
             return f'{self.last_name} {self.first_name} {self.middle_name}'
         return f'{self.last_name} {self.first_name}'
     
+    def save(self, *args, **kwargs):
+        self.birth_month_day = month_day(self.birth_date)
+        # Сводку пишет только clients.summary: сохранение карточки клиента
+        # (форма, админка) не должно затирать ее значениями, прочитанными раньше
+        if not self._state.adding and not args and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.SUMMARY_FIELDS
+            ]
+        super().save(*args, **kwargs)
+    
     def get_full_name(self):
         """Полное ФИО клиента"""
         parts = [self.last_name, self.first_name]
@@ -111,6 +184,21 @@ class Client(models.Model):
             parts.append(self.middle_name)
         return ' '.join(parts)
     
+    def get_photo_url(self, variant):
+        """Адрес уменьшенной копии фото (с версией для долгого кэширования)"""
+        from django.urls import reverse
+        from .photos import photo_version
+        if not self.photo:
+            return None
+        url = reverse('client_photo', kwargs={'pk': self.pk, 'variant': variant})
+        return f'{url}?v={photo_version(self.photo.name)}'
+    
+    def get_photo_avatar_url(self):
+        return self.get_photo_url('avatar')
+    
+    def get_photo_card_url(self):
+        return self.get_photo_url('card')
+    
     def get_age(self):
         """Возраст клиента"""
         if not self.birth_date:
@@ -132,4 +220,142 @@ class Client(models.Model):
     @property
     def has_medical_restrictions(self):
         """Есть ли медицинские противопоказания"""
-        return bool(self.medical_notes)
\ No newline at end of file
+        return bool(self.medical_notes)
+
+
+class ClientSearchToken(models.Model):
+    """Токен поискового индекса клиентов (нормализованный, в нижнем регистре)"""
+
+    KIND_CHOICES = [
+        ('name', 'ФИО'),
+        ('phone', 'Телефон'),
+        ('email', 'Email'),
+    ]
+
+    client = models.ForeignKey(
+        Client,
+        on_delete=models.CASCADE,
+        verbose_name='Клиент',
+        related_name='search_tokens'
+    )
+
+    kind = models.CharField(
+        max_length=10,
+        verbose_name='Тип',
+        choices=KIND_CHOICES
+    )
+
+    token = models.CharField(max_length=254, verbose_name='Токен')
+
+    class Meta:
+        verbose_name = 'Поисковый токен клиента'
+        verbose_name_plural = 'Поисковые токены клиентов'
+        indexes = [
+            models.Index(fields=['kind', 'token']),
+        ]
+
+    def __str__(self):
+        return f'{self.kind}: {self.token}'
+
+class DailyClientCounts(models.Model):
+    """Количество зарегистрированных клиентов за день по статусам"""
+
+    date = models.DateField(verbose_name='Дата регистрации')
+
+    status = models.CharField(
+        max_length=20,
+        verbose_name='Статус',
+        choices=Client.STATUS_CHOICES
+    )
+
+    count = models.IntegerField(verbose_name='Количество', default=0)
+
+    class Meta:
+        verbose_name = 'Клиенты за день'
+        verbose_name_plural = 'Клиенты по дням'
+        ordering = ['-date']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['date', 'status'],
+                name='unique_daily_client_counts'
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.date} {self.status}: {self.count}'
+
+
+def export_file_path(instance, filename):
+    return os.path.join('exports', f'job_{instance.id}', filename)
+
+
+class ExportJob(models.Model):
+    """Фоновая выгрузка (большие PDF-отчеты формируются вне запроса)"""
+
+    STATUS_CHOICES = [
+        ('pending', 'В очереди'),
+        ('running', 'Формируется'),
+        ('done', 'Готово'),
+        ('failed', 'Ошибка'),
+    ]
+
+    KIND_CHOICES = [
+        ('clients_pdf', 'Клиенты (PDF)'),
+    ]
+
+    kind = models.CharField(
+        max_length=30,
+        verbose_name='Тип выгрузки',
+        choices=KIND_CHOICES,
+        default='clients_pdf'
+    )
+
+    status = models.CharField(
+        max_length=20,
+        verbose_name='Статус',
+        choices=STATUS_CHOICES,
+        default='pending'
+    )
+
+    # GET-параметры фильтров списка, с которыми запущена выгрузка
+    params = models.TextField(verbose_name='Фильтры', blank=True, default='')
+
+    file = models.FileField(
+        upload_to=export_file_path,
+        verbose_name='Файл',
+        blank=True,
+        null=True
+    )
+
+    row_count = models.IntegerField(verbose_name='Строк', default=0)
+
+    error = models.TextField(verbose_name='Ошибка', blank=True, null=True)
+
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        verbose_name='Запустил',
+        blank=True,
+        null=True,
+        related_name='export_jobs'
+    )
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    # Когда обработчик взял выгрузку; зависшие дольше таймаута возвращаются в очередь
+    started_at = models.DateTimeField(verbose_name='Начато', blank=True, null=True)
+    finished_at = models.DateTimeField(verbose_name='Завершено', blank=True, null=True)
+
+    class Meta:
+        verbose_name = 'Выгрузка'
+        verbose_name_plural = 'Выгрузки'
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status']),
+        ]
+
+    def __str__(self):
+        return f'Выгрузка #{self.id} ({self.get_kind_display()}, {self.status})'
+
+    @property
+    def is_finished(self):
+        return self.status in ('done', 'failed')
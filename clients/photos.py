@@ -0,0 +1,78 @@
+import hashlib
+import io
+import os
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+
+# Уменьшенные копии фото: (ширина, высота, обрезать до квадрата)
+PHOTO_VARIANTS = {
+    'avatar': (96, 96, True),
+    'card': (480, 480, False),
+}
+
+PHOTO_FORMATS = {
+    'webp': ('WEBP', 'image/webp', {'quality': 80, 'method': 4}),
+    'jpeg': ('JPEG', 'image/jpeg', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+
+
+def photo_version(name):
+    """Короткий хэш имени оригинала: меняется при загрузке нового фото"""
+    return hashlib.md5(name.encode()).hexdigest()[:10]
+
+
+def variant_name(name, variant, fmt):
+    """Путь уменьшенной копии рядом с оригиналом"""
+    root, _ext = os.path.splitext(name)
+    return f'{root}.{variant}.{fmt}'
+
+
+def render_variant(source, variant, fmt):
+    """Уменьшает изображение из файла source, возвращает байты в формате fmt"""
+    from PIL import Image, ImageOps
+
+    width, height, crop = PHOTO_VARIANTS[variant]
+    pil_format, _content_type, options = PHOTO_FORMATS[fmt]
+
+    with Image.open(source) as image:
+        # Фото с телефонов часто повернуты только через EXIF
+        image = ImageOps.exif_transpose(image)
+        if image.mode not in ('RGB', 'L'):
+            image = image.convert('RGB')
+        if crop:
+            image = ImageOps.fit(image, (width, height), Image.LANCZOS)
+        else:
+            image.thumbnail((width, height), Image.LANCZOS)
+
+        output = io.BytesIO()
+        image.save(output, pil_format, **options)
+    return output.getvalue()
+
+
+def get_variant(name, variant, fmt, storage=default_storage):
+    """
+    Имя файла уменьшенной копии; при первом обращении копия создается
+    и сохраняется рядом с оригиналом.
+    """
+    path = variant_name(name, variant, fmt)
+    if not storage.exists(path):
+        with storage.open(name, 'rb') as source:
+            data = render_variant(source, variant, fmt)
+        # save() может дописать суффикс, если копию параллельно создал другой запрос
+        path = storage.save(path, ContentFile(data))
+    return path
+
+
+def generate_variants(name, storage=default_storage):
+    """Создать все копии фото сразу (после загрузки)"""
+    for variant in PHOTO_VARIANTS:
+        for fmt in PHOTO_FORMATS:
+            get_variant(name, variant, fmt, storage)
+
+
+def delete_variants(name, storage=default_storage):
+    for variant in PHOTO_VARIANTS:
+        for fmt in PHOTO_FORMATS:
+            path = variant_name(name, variant, fmt)
+            if storage.exists(path):
+                storage.delete(path)
@@ -0,0 +1,75 @@
+from functools import reduce
+from operator import or_
+from django.db import transaction
+from django.db.models import Count, Min, Max, Q
+from django.db.models.functions import TruncDate
+from accounts.metrics import invalidate_dashboard_metrics
+from fitness_club.dates import local_day, local_day_range
+from .models import Client, DailyClientCounts
+from .search import index_clients
+
+
+def _days_filter(days):
+    """Условие «клиент зарегистрирован в один из локальных дней»"""
+    ranges = [local_day_range(day, day) for day in sorted(days)]
+    return reduce(or_, (Q(registration_date__gte=start, registration_date__lt=end) for start, end in ranges))
+
+
+def _client_rows(condition):
+    """Строки DailyClientCounts по клиентам, подходящим под условие"""
+    aggregates = (
+        Client.objects
+        .filter(condition)
+        .annotate(day=TruncDate('registration_date'))
+        .values('day', 'status')
+        .annotate(count=Count('id'))
+        .order_by()
+    )
+    return [
+        DailyClientCounts(date=row['day'], status=row['status'], count=row['count'])
+        for row in aggregates.iterator()
+    ]
+
+
+def refresh_client_days(days):
+    """Пересчитать DailyClientCounts за указанные дни регистрации"""
+    days = {day for day in days if day}
+    if not days:
+        return
+    rows = _client_rows(_days_filter(days))
+    with transaction.atomic():
+        DailyClientCounts.objects.filter(date__in=days).delete()
+        DailyClientCounts.objects.bulk_create(rows)
+
+
+def clients_created(clients):
+    """
+    Обновить все, что зависит от клиентов, после bulk_create (сигналы не
+    вызываются): поисковый индекс и DailyClientCounts - сразу, в текущей
+    транзакции, кэш дашборда - после коммита.
+    """
+    index_clients(clients)
+    refresh_client_days({local_day(client.registration_date) for client in clients})
+    transaction.on_commit(invalidate_dashboard_metrics)
+
+
+def rebuild_client_counts(first_day=None, last_day=None):
+    """Пересобрать DailyClientCounts целиком или за диапазон дат"""
+    full = first_day is None and last_day is None
+    if first_day is None or last_day is None:
+        bounds = Client.objects.aggregate(first=Min('registration_date'), last=Max('registration_date'))
+        if bounds['first'] is None:
+            DailyClientCounts.objects.all().delete()
+            return 0
+        first_day = first_day or local_day(bounds['first'])
+        last_day = last_day or local_day(bounds['last'])
+
+    start, end = local_day_range(first_day, last_day)
+    rows = _client_rows(Q(registration_date__gte=start, registration_date__lt=end))
+    stale = DailyClientCounts.objects.all()
+    if not full:
+        stale = stale.filter(date__gte=first_day, date__lte=last_day)
+    with transaction.atomic():
+        stale.delete()
+        DailyClientCounts.objects.bulk_create(rows, batch_size=1000)
+    return len(rows)
@@ -0,0 +1,157 @@
+import re
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+from .models import Client, ClientSearchToken
+
+# Верхняя граница для поиска по префиксу через диапазон token >= x AND token < x + MAX_CHAR:
+# такое условие использует индекс, в отличие от LIKE '%x%'
+MAX_CHAR = '\U0010ffff'
+
+# Код страны, который можно не вводить при поиске по телефону
+COUNTRY_CODE = '996'
+
+WORD_RE = re.compile(r'[\w@.+-]+')
+PHONE_CHARS_RE = re.compile(r'^[\d\s()+-]+$')
+
+
+def normalize(text):
+    """Приводим текст к виду, в котором он хранится в индексе"""
+    return (text or '').casefold().replace('ё', 'е').strip()
+
+
+def digits(text):
+    return re.sub(r'\D', '', text or '')
+
+
+def normalize_phone(value):
+    """Привести телефон к виду +996XXXXXXXXX (если это возможно)"""
+    number = digits(value)
+    if len(number) == 12 and number.startswith(COUNTRY_CODE):
+        return f'+{number}'
+    if len(number) == 10 and number.startswith('0'):
+        return f'+{COUNTRY_CODE}{number[1:]}'
+    if len(number) == 9:
+        return f'+{COUNTRY_CODE}{number}'
+    return (value or '').strip()
+
+
+def phone_tokens(phone):
+    """Варианты номера для поиска: полностью, без кода страны и с ведущим нулем"""
+    number = digits(phone)
+    if not number:
+        return set()
+    tokens = {number}
+    if number.startswith(COUNTRY_CODE) and len(number) > len(COUNTRY_CODE):
+        local = number[len(COUNTRY_CODE):]
+        tokens.update({local, '0' + local})
+    return tokens
+
+
+def client_tokens(client):
+    """Все токены индекса для клиента: набор пар (kind, token)"""
+    tokens = set()
+    for value in (client.last_name, client.first_name, client.middle_name):
+        for word in re.findall(r'\w+', normalize(value)):
+            tokens.add(('name', word))
+    for token in phone_tokens(client.phone):
+        tokens.add(('phone', token))
+    email = normalize(client.email)
+    if email:
+        tokens.add(('email', email))
+    return tokens
+
+
+def index_clients(clients):
+    """Перестроить токены для переданных клиентов"""
+    clients = list(clients)
+    if not clients:
+        return
+    tokens = [
+        ClientSearchToken(client_id=client.pk, kind=kind, token=token[:254])
+        for client in clients
+        for kind, token in client_tokens(client)
+    ]
+    with transaction.atomic():
+        ClientSearchToken.objects.filter(client_id__in=[client.pk for client in clients]).delete()
+        ClientSearchToken.objects.bulk_create(tokens, batch_size=1000)
+
+
+def rebuild_index(batch_size=2000):
+    """Перестроить весь поисковый индекс клиентов"""
+    ClientSearchToken.objects.all().delete()
+    total = 0
+    last_id = 0
+    while True:
+        batch = list(
+            Client.objects.filter(id__gt=last_id)
+            .only('id', 'first_name', 'last_name', 'middle_name', 'phone', 'email')
+            .order_by('id')[:batch_size]
+        )
+        if not batch:
+            break
+        index_clients(batch)
+        total += len(batch)
+        last_id = batch[-1].id
+    return total
+
+
+def parse_query(query):
+    """
+    Разбираем строку поиска на термы (kind, term).
+    Строка из цифр, пробелов, скобок и +/- считается одним номером телефона.
+    """
+    query = normalize(query)
+    if not query:
+        return []
+    if PHONE_CHARS_RE.match(query) and digits(query):
+        return [('phone', digits(query))]
+
+    terms = []
+    for word in WORD_RE.findall(query):
+        if digits(word) == word.strip('+-'):
+            terms.append(('phone', digits(word)))
+        elif '@' in word:
+            terms.append(('email', word))
+        else:
+            terms.append(('text', word.strip('.+-')))
+    return [(kind, term) for kind, term in terms if term]
+
+
+def _term_tokens(kind, term):
+    """Токены индекса, начинающиеся с терма"""
+    kinds = ['name', 'email'] if kind == 'text' else [kind]
+    return ClientSearchToken.objects.filter(
+        kind__in=kinds,
+        token__gte=term,
+        token__lt=term + MAX_CHAR,
+    )
+
+
+def filter_by_search(queryset, query, field='pk'):
+    """
+    Оставить в queryset только записи, чей клиент подходит под запрос.
+    field - путь к id клиента: 'pk' для Client, 'client_id' для абонементов и платежей.
+    """
+    for kind, term in parse_query(query):
+        client_ids = _term_tokens(kind, term).values('client_id')
+        queryset = queryset.filter(**{f'{field}__in': client_ids})
+    return queryset
+
+
+def annotate_rank(queryset, query):
+    """
+    Добавить признак exact_match: одно из слов запроса совпало с токеном целиком
+    (например, фамилия введена полностью). Такие клиенты идут первыми.
+    """
+    terms = [term for kind, term in parse_query(query)]
+    return queryset.annotate(exact_match=Exists(
+        ClientSearchToken.objects.filter(client=OuterRef('pk'), token__in=terms)
+    ))
+
+
+def search_clients(query, queryset=None):
+    """Клиенты, подходящие под запрос, в порядке релевантности"""
+    if queryset is None:
+        queryset = Client.objects.all()
+    queryset = filter_by_search(queryset, query)
+    return annotate_rank(queryset, query).order_by('-exact_match', 'last_name', 'first_name', 'id')
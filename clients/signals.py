@@ -0,0 +1,57 @@
+from django.db.models.signals import pre_save, post_save, post_delete
+import logging
+from django.dispatch import receiver
+from fitness_club.dates import local_day
+from .models import Client
+from .rollups import refresh_client_days
+from .search import index_clients
+from .photos import generate_variants, delete_variants
+
+logger = logging.getLogger(__name__)
+
+
+@receiver(pre_save, sender=Client)
+def remember_registration_day(sender, instance, **kwargs):
+    """Запоминаем прежний день регистрации и фото, чтобы обработать изменения"""
+    instance._previous_registration_date = None
+    instance._previous_photo = None
+    if instance.pk:
+        previous = (
+            Client.objects.filter(pk=instance.pk)
+            .values_list('registration_date', 'photo').first()
+        )
+        if previous:
+            instance._previous_registration_date, instance._previous_photo = previous
+
+
+@receiver(post_save, sender=Client)
+@receiver(post_delete, sender=Client)
+def update_client_rollups(sender, instance, **kwargs):
+    days = {local_day(instance.registration_date)}
+    previous = getattr(instance, '_previous_registration_date', None)
+    if previous:
+        days.add(local_day(previous))
+    refresh_client_days(days)
+
+
+@receiver(post_save, sender=Client)
+def update_search_index(sender, instance, **kwargs):
+    """Поисковые токены клиента пересобираются при каждом сохранении"""
+    index_clients([instance])
+
+
+@receiver(post_save, sender=Client)
+def process_photo(sender, instance, created, **kwargs):
+    """Уменьшенные копии нового фото создаются сразу после загрузки"""
+    name = instance.photo.name if instance.photo else None
+    previous = getattr(instance, '_previous_photo', None)
+    if name == previous:
+        return
+    if previous:
+        delete_variants(previous, instance.photo.storage)
+    if name:
+        try:
+            generate_variants(name, instance.photo.storage)
+        except (OSError, ValueError):
+            # Не страшно: копии будут созданы при первом запросе фото
+            logger.exception('Could not process photo of client %s', instance.pk)
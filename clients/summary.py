@@ -0,0 +1,81 @@
+from decimal import Decimal
+from django.db import transaction
+from django.db.models import Count, Max, Q, Sum
+from .models import Client
+
+SUMMARY_FIELDS = Client.SUMMARY_FIELDS
+
+
+def compute_summaries(client_ids):
+    """
+    Сводка по абонементам и оплаченным платежам для клиентов client_ids:
+    по одному агрегирующему запросу на абонементы и на платежи.
+    """
+    from subscriptions.models import Membership
+    from payments.models import Payment
+
+    summaries = {
+        client_id: {
+            'has_active_membership': False,
+            'membership_end_date': None,
+            'total_paid': Decimal('0'),
+            'last_payment_date': None,
+        }
+        for client_id in client_ids
+    }
+    memberships = (
+        Membership.objects.filter(client_id__in=client_ids)
+        .values('client_id')
+        .annotate(active=Count('id', filter=Q(status='active')), end_date=Max('end_date'))
+        .order_by()
+    )
+    for row in memberships:
+        summaries[row['client_id']].update(
+            has_active_membership=row['active'] > 0,
+            membership_end_date=row['end_date'],
+        )
+    payments = (
+        Payment.objects.filter(client_id__in=client_ids, status='completed')
+        .values('client_id')
+        .annotate(total=Sum('amount'), last=Max('payment_date'))
+        .order_by()
+    )
+    for row in payments:
+        summaries[row['client_id']].update(
+            total_paid=row['total'] or Decimal('0'),
+            last_payment_date=row['last'],
+        )
+    return summaries
+
+
+def refresh_client_summaries(client_ids):
+    """
+    Пересчитать сводку для указанных клиентов. Вызывается из сигналов
+    абонементов и платежей и после пакетных операций (update/bulk_create
+    сигналы не вызывают). Клиенты сохраняются через bulk_update, поэтому
+    их собственные сигналы и updated_at не затрагиваются.
+    """
+    client_ids = sorted({client_id for client_id in client_ids if client_id})
+    if not client_ids:
+        return
+    summaries = compute_summaries(client_ids)
+    clients = [Client(pk=client_id, **values) for client_id, values in summaries.items()]
+    with transaction.atomic():
+        Client.objects.bulk_update(clients, SUMMARY_FIELDS, batch_size=500)
+
+
+def rebuild_client_summaries(batch_size=2000):
+    """Пересчитать сводку у всех клиентов (пачками по id)"""
+    total = 0
+    last_id = 0
+    while True:
+        ids = list(
+            Client.objects.filter(id__gt=last_id)
+            .order_by('id').values_list('id', flat=True)[:batch_size]
+        )
+        if not ids:
+            break
+        refresh_client_summaries(ids)
+        total += len(ids)
+        last_id = ids[-1]
+    return total
@@ -1,3 +1,405 @@
-from django.test import TestCase
+import datetime
+import io
+import shutil
+import tempfile
+from decimal import Decimal
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from accounts.models import User
+from fitness_club.pagination import CursorPaginator, InvalidCursor, decode_cursor, encode_cursor
+from .exports import EXPORT_JOB_TIMEOUT, release_stale_jobs, run_export_jobs, start_export_job
+from .forms import ClientForm
+from .models import Client, ExportJob
+from .search import client_tokens
 
-# Create your tests here.
+
+def make_client(number, **fields):
+    fields.setdefault('first_name', 'Иван')
+    fields.setdefault('last_name', 'Иванов')
+    return Client.objects.create(phone=f'+99670000{number:04d}', **fields)
+
+
+class CursorTests(TestCase):
+    """Курсорная пагинация (fitness_club.pagination)"""
+
+    def test_round_trip(self):
+        values = [
+            datetime.datetime(2024, 3, 1, 10, 30, tzinfo=datetime.timezone.utc),
+            datetime.date(2024, 2, 29),
+            Decimal('1500.50'),
+            'Иванов',
+            42,
+            None,
+        ]
+        self.assertEqual(decode_cursor(encode_cursor(values, 'p')), (values, 'p'))
+
+    def test_invalid_cursor(self):
+        for cursor in ['garbage', '!!!', encode_cursor([1], 'x'), encode_cursor([['x', 1]], 'n')]:
+            with self.assertRaises(InvalidCursor):
+                decode_cursor(cursor)
+
+
+class CursorPaginatorTests(TestCase):
+    """Проход по страницам при одинаковых значениях полей сортировки"""
+
+    ordering = ('last_name', 'first_name', 'id')
+
+    def setUp(self):
+        # Семь полных тезок и по одному клиенту до и после них
+        make_client(0, last_name='Абдыкадыров')
+        self.namesakes = [make_client(number).pk for number in range(1, 8)]
+        make_client(8, last_name='Юсупов')
+        self.expected = list(Client.objects.order_by(*self.ordering).values_list('id', flat=True))
+
+    def walk_forward(self, paginator):
+        ids, cursor, pages = [], None, []
+        while True:
+            page = paginator.page(cursor)
+            pages.append(page)
+            ids.extend(client.pk for client in page)
+            if not page.has_next:
+                return ids, pages
+            cursor = page.next_cursor
+
+    def test_forward_over_duplicate_keys(self):
+        ids, pages = self.walk_forward(CursorPaginator(Client.objects.all(), self.ordering, 3))
+        self.assertEqual(ids, self.expected)
+        self.assertEqual(len(pages), 3)
+        self.assertFalse(pages[0].has_previous)
+
+    def test_backward_returns_previous_page(self):
+        paginator = CursorPaginator(Client.objects.all(), self.ordering, 3)
+        _ids, pages = self.walk_forward(paginator)
+        for index in range(len(pages) - 1, 0, -1):
+            previous = paginator.page(pages[index].previous_cursor)
+            self.assertEqual([c.pk for c in previous], [c.pk for c in pages[index - 1]])
+            self.assertEqual(previous.has_previous, index > 1)
+
+    def test_descending_with_ties(self):
+        for pk, paid in zip(self.namesakes, [100, 100, 50, 50, 50, 0, 0]):
+            Client.objects.filter(pk=pk).update(total_paid=paid)
+        ordering = ('-total_paid', 'id')
+        ids, _pages = self.walk_forward(CursorPaginator(Client.objects.all(), ordering, 2))
+        self.assertEqual(ids, list(Client.objects.order_by(*ordering).values_list('id', flat=True)))
+
+    def test_values_rows(self):
+        queryset = Client.objects.values('id', 'last_name', 'first_name')
+        page = CursorPaginator(queryset, self.ordering, 4).page()
+        second = CursorPaginator(queryset, self.ordering, 4).page(page.next_cursor)
+        self.assertEqual([row['id'] for row in second], self.expected[4:8])
+
+    def test_invalid_cursor_returns_first_page(self):
+        paginator = CursorPaginator(Client.objects.all(), self.ordering, 3)
+        first = [client.pk for client in paginator.page()]
+        tampered = [
+            'garbage',
+            encode_cursor(['Иванов', 'Иван'], 'n'),        # не то число полей
+            encode_cursor(['Иванов', 'Иван', 'abc'], 'n'),  # не число вместо id
+        ]
+        for cursor in tampered:
+            with self.assertRaises(InvalidCursor):
+                paginator.page(cursor)
+            self.assertEqual([client.pk for client in paginator.get_page(cursor)], first)
+
+    def test_list_view_with_invalid_cursor(self):
+        user = User.objects.create_user('admin', password='secret')
+        self.client.force_login(user)
+        response = self.client.get(reverse('client_list'), {'cursor': encode_cursor(['x', 'y', 'z'], 'n')})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([c.pk for c in response.context['page_obj']], self.expected[:10])
+
+
+class ExportJobTests(TestCase):
+    """Очередь фоновых выгрузок"""
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        make_client(1)
+
+    def test_start_only_queues(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            job = start_export_job('', None)
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'pending')
+
+    def test_stale_running_job_is_requeued_and_finished(self):
+        now = timezone.now()
+        stale = ExportJob.objects.create(
+            status='running', started_at=now - datetime.timedelta(seconds=EXPORT_JOB_TIMEOUT + 60),
+        )
+        fresh = ExportJob.objects.create(status='running', started_at=now)
+
+        with override_settings(MEDIA_ROOT=self.media_root):
+            processed, released = run_export_jobs()
+
+        self.assertEqual((processed, released), (1, 1))
+        stale.refresh_from_db()
+        fresh.refresh_from_db()
+        self.assertEqual(stale.status, 'done')
+        self.assertEqual(stale.row_count, 1)
+        self.assertIsNotNone(stale.started_at)
+        self.assertEqual(fresh.status, 'running')
+
+    def test_running_job_without_start_time_is_requeued(self):
+        job = ExportJob.objects.create(status='running')
+        self.assertEqual(release_stale_jobs(), 1)
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'pending')
+
+
+class ClientSummaryTests(TestCase):
+    """Сводка по абонементам и платежам на клиенте"""
+
+    def setUp(self):
+        from subscriptions.models import Membership, MembershipPlan
+        self.member = make_client(1)
+        plan = MembershipPlan.objects.create(name='Месяц', price=1500, period_type='months', period_value=1)
+        self.make_membership = lambda: Membership.objects.create(
+            client=self.member, plan=plan, start_date=timezone.localdate(),
+        )
+
+    def test_card_save_keeps_fresh_summary(self):
+        stale = Client.objects.get(pk=self.member.pk)
+        self.make_membership()
+        self.assertTrue(Client.objects.get(pk=self.member.pk).has_active_membership)
+
+        form = ClientForm(instance=stale, data={
+            'first_name': 'Петр', 'last_name': 'Иванов', 'phone': stale.phone, 'status': 'active',
+        })
+        self.assertTrue(form.is_valid(), form.errors)
+        form.save()
+
+        client = Client.objects.get(pk=self.member.pk)
+        self.assertEqual(client.first_name, 'Петр')
+        self.assertTrue(client.has_active_membership)
+        self.assertIsNotNone(client.membership_end_date)
+
+    def test_statistics_use_summary_flag(self):
+        self.make_membership()
+        self.make_membership()
+        make_client(2)
+        self.client.force_login(User.objects.create_user('admin', password='secret'))
+        response = self.client.get(reverse('client_statistics'))
+        self.assertEqual(response.context['clients_with_active_memberships'], 1)
+
+
+def executor_leaves():
+    return MigrationExecutor(connection).loader.graph.leaf_nodes()
+
+
+class BackfillMigrationTests(TransactionTestCase):
+    """Миграции, заполняющие новые поля для уже существующих строк"""
+
+    def migrate(self, *targets):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate(list(targets))
+        return executor.loader.project_state(list(targets)).apps
+
+    def test_client_summary_and_birthday_backfill(self):
+        self.addCleanup(lambda: self.migrate(*executor_leaves()))
+        apps = self.migrate(
+            ('clients', '0007_client_summary'),
+            ('subscriptions', '0007_freezeperiod'),
+            ('payments', '0006_reminder_target_date'),
+        )
+        HistoricalClient = apps.get_model('clients', 'Client')
+        Plan = apps.get_model('subscriptions', 'MembershipPlan')
+        HistoricalMembership = apps.get_model('subscriptions', 'Membership')
+        Payment = apps.get_model('payments', 'Payment')
+
+        member = HistoricalClient.objects.create(
+            first_name='Иван', last_name='Иванов', phone='+996700000001', birth_date=datetime.date(1992, 2, 29),
+        )
+        idle = HistoricalClient.objects.create(first_name='Анна', last_name='Петрова', phone='+996700000002')
+        plan = Plan.objects.create(name='Месяц', price=1500)
+        HistoricalMembership.objects.create(
+            client=member, plan=plan, start_date=datetime.date(2025, 1, 1),
+            end_date=datetime.date(2025, 2, 1), status='active',
+        )
+        paid_at = timezone.now()
+        Payment.objects.create(client=member, amount=Decimal('1500'), payment_date=paid_at, status='completed')
+        Payment.objects.create(client=member, amount=Decimal('700'), status='pending')
+
+        self.migrate(*executor_leaves())
+
+        member = Client.objects.get(pk=member.pk)
+        self.assertTrue(member.has_active_membership)
+        self.assertEqual(member.membership_end_date, datetime.date(2025, 2, 1))
+        self.assertEqual(member.total_paid, Decimal('1500'))
+        self.assertEqual(member.last_payment_date, paid_at)
+        self.assertEqual(member.birth_month_day, 229)
+        idle = Client.objects.get(pk=idle.pk)
+        self.assertFalse(idle.has_active_membership)
+        self.assertEqual(idle.total_paid, 0)
+        self.assertIsNone(idle.birth_month_day)
+
+    def test_search_index_build(self):
+        from .models import ClientSearchToken
+        self.addCleanup(lambda: self.migrate(*executor_leaves()))
+        apps = self.migrate(('clients', '0003_clientsearchtoken'))
+        HistoricalClient = apps.get_model('clients', 'Client')
+        member = HistoricalClient.objects.create(
+            first_name='Иван', last_name='Иванов', phone='+996700000001', email='ivan@example.com',
+        )
+
+        self.migrate(*executor_leaves())
+
+        tokens = set(ClientSearchToken.objects.filter(client_id=member.pk).values_list('kind', 'token'))
+        self.assertTrue(tokens)
+        self.assertEqual(tokens, set(client_tokens(Client.objects.get(pk=member.pk))))
+
+    def test_daily_rollups_backfill(self):
+        from payments.models import DailyRevenue
+        from subscriptions.models import DailyMembershipCounts
+        from .models import DailyClientCounts
+        self.addCleanup(lambda: self.migrate(*executor_leaves()))
+        apps = self.migrate(
+            ('clients', '0011_backfill_client_summary'),
+            ('subscriptions', '0007_freezeperiod'),
+            ('payments', '0007_reminder_per_payment_constraint'),
+        )
+        HistoricalClient = apps.get_model('clients', 'Client')
+        Plan = apps.get_model('subscriptions', 'MembershipPlan')
+        HistoricalMembership = apps.get_model('subscriptions', 'Membership')
+        Payment = apps.get_model('payments', 'Payment')
+
+        # 20:00 UTC 1 марта - уже 2 марта в Бишкеке
+        registered = datetime.datetime(2025, 3, 1, 20, 0, tzinfo=datetime.timezone.utc)
+        members = [
+            HistoricalClient.objects.create(
+                first_name='Иван', last_name='Иванов', phone=f'+99670000000{number}', registration_date=registered,
+            )
+            for number in (1, 2)
+        ]
+        plan = Plan.objects.create(name='Месяц', price=1500)
+        for member in members:
+            HistoricalMembership.objects.create(
+                client=member, plan=plan, start_date=datetime.date(2025, 3, 2),
+                end_date=datetime.date(2025, 4, 2), status='active',
+            )
+            Payment.objects.create(
+                client=member, amount=Decimal('1500'), payment_date=registered,
+                payment_day=datetime.date(2025, 3, 2), status='completed',
+                payment_type='subscription', payment_method='cash',
+            )
+
+        self.migrate(*executor_leaves())
+
+        clients = DailyClientCounts.objects.get()
+        self.assertEqual((clients.date, clients.count), (datetime.date(2025, 3, 2), 2))
+        memberships = DailyMembershipCounts.objects.get()
+        self.assertEqual(
+            (memberships.date, memberships.plan_id, memberships.count), (datetime.date(2025, 3, 2), plan.pk, 2),
+        )
+        revenue = DailyRevenue.objects.get()
+        self.assertEqual((revenue.date, revenue.total, revenue.count), (datetime.date(2025, 3, 2), Decimal('3000'), 2))
+
+
+class ImportClientsTests(TestCase):
+    """Импорт клиентов из CSV/XLSX (clients.importer)"""
+
+    def csv_file(self, text):
+        return io.BytesIO(text.encode('utf-8-sig'))
+
+    def assert_indexed(self, client):
+        from .models import ClientSearchToken
+        tokens = set(ClientSearchToken.objects.filter(client=client).values_list('kind', 'token'))
+        self.assertEqual(tokens, set(client_tokens(client)))
+
+    def test_csv_semicolon_with_russian_headers(self):
+        from .importer import import_clients
+        from .models import DailyClientCounts
+        result = import_clients(self.csv_file(
+            'Фамилия;Имя;Телефон клиента;E-mail;Дата рождения;Статус;Лишняя колонка\n'
+            'Иванов;Иван;0700 123 456;ivan@example.com;29.02.1992;Неактивный;x\n'
+            'Петрова;Анна;+996555000111;;;;\n'
+        ), 'clients.csv')
+
+        self.assertEqual((result.created, result.processed, result.errors), (2, 2, []))
+        client = Client.objects.get(phone='+996700123456')
+        self.assertEqual(
+            (client.last_name, client.email, client.status), ('Иванов', 'ivan@example.com', 'inactive'),
+        )
+        self.assertEqual((client.birth_date, client.birth_month_day), (datetime.date(1992, 2, 29), 229))
+        self.assertEqual(Client.objects.get(phone='+996555000111').status, 'active')
+        for client in Client.objects.all():
+            self.assert_indexed(client)
+        self.assertEqual(DailyClientCounts.objects.get(date=timezone.localdate(), status='active').count, 1)
+        self.assertEqual(DailyClientCounts.objects.get(date=timezone.localdate(), status='inactive').count, 1)
+
+    def test_csv_tab_delimited(self):
+        from .importer import import_clients
+        result = import_clients(self.csv_file(
+            'last_name\tfirst_name\tphone\n'
+            'Иванов\tИван\t996700123456\n'
+        ), 'clients.txt')
+        self.assertEqual(result.created, 1)
+        self.assertEqual(Client.objects.get().first_name, 'Иван')
+
+    def test_xlsx(self):
+        from openpyxl import Workbook
+        from .importer import import_clients
+        workbook = Workbook()
+        sheet = workbook.active
+        sheet.append(['Фамилия', 'Имя', 'Телефон', 'Дата рождения'])
+        sheet.append(['Иванов', 'Иван', 996700123456, datetime.datetime(1990, 5, 17)])
+        sheet.append([None, None, None, None])
+        sheet.append(['Петрова', 'Анна', '0555000111', None])
+        content = io.BytesIO()
+        workbook.save(content)
+        content.seek(0)
+
+        result = import_clients(content, 'clients.xlsx')
+
+        self.assertEqual((result.created, result.processed, result.errors), (2, 2, []))
+        client = Client.objects.get(phone='+996700123456')
+        self.assertEqual((client.birth_date, client.birth_month_day), (datetime.date(1990, 5, 17), 517))
+        self.assert_indexed(client)
+
+    def test_duplicates_and_row_errors(self):
+        from .importer import import_clients
+        make_client(1)  # +996700000001 уже есть в базе
+        result = import_clients(self.csv_file(
+            'last_name,first_name,phone,email\n'
+            'Иванов,Иван,0700000002,\n'
+            'Иванов,Иван,0700000001,\n'
+            'Сидоров,Петр,700000002,\n'
+            ',Олег,0700000003,\n'
+            'Ким,Алина,0700000004,not-an-email\n'
+            ',,,\n'
+            'Ли,Вера,0700000005,\n'
+        ), 'clients.csv', batch_size=2)
+
+        self.assertEqual((result.created, result.processed), (2, 6))
+        self.assertEqual(
+            set(Client.objects.values_list('phone', flat=True)),
+            {'+996700000001', '+996700000002', '+996700000005'},
+        )
+        errors = {row: (phone, message) for row, phone, message in result.errors}
+        self.assertEqual(sorted(errors), [3, 4, 5, 6])
+        # В отчете телефон - как в файле
+        self.assertEqual(errors[3], ('0700000001', 'Клиент с таким телефоном уже существует'))
+        self.assertEqual(errors[4], ('700000002', 'Телефон повторяется в файле'))
+        self.assertIn('Фамилия', errors[5][1])
+        self.assertIn('Email', errors[6][1])
+
+        report = io.StringIO()
+        result.write_report(report)
+        self.assertEqual(len(report.getvalue().splitlines()), 5)
+
+    def test_dry_run_and_bad_files(self):
+        from .importer import import_clients
+        result = import_clients(self.csv_file('phone,last_name,first_name\n0700000002,Иванов,Иван\n'),
+                                'clients.csv', dry_run=True)
+        self.assertEqual((result.processed, result.errors), (1, []))
+        self.assertFalse(Client.objects.exists())
+
+        with self.assertRaises(ValueError):
+            import_clients(self.csv_file('last_name,first_name\nИванов,Иван\n'), 'clients.csv')
+        with self.assertRaises(ValueError):
+            import_clients(io.BytesIO(b''), 'clients.pdf')
@@ -3,10 +3,16 @@ from . import views
 
 urlpatterns = [
     path('', views.client_list, name='client_list'),
+    path('autocomplete/', views.client_autocomplete, name='client_autocomplete'),
     path('statistics/', views.client_statistics, name='client_statistics'),
     path('create/', views.client_create, name='client_create'),
     path('<int:pk>/', views.client_detail, name='client_detail'),
     path('<int:pk>/update/', views.client_update, name='client_update'),
     path('<int:pk>/delete/', views.client_delete, name='client_delete'),
+    path('<int:pk>/photo/<str:variant>/', views.client_photo, name='client_photo'),
     path('export/pdf/', views.export_clients_pdf, name='export_clients_pdf'),
+    path('export/csv/', views.export_clients_data, {'fmt': 'csv'}, name='export_clients_csv'),
+    path('export/ndjson/', views.export_clients_data, {'fmt': 'ndjson'}, name='export_clients_ndjson'),
+    path('export/jobs/<int:pk>/', views.export_job_detail, name='export_job_detail'),
+    path('export/jobs/<int:pk>/download/', views.export_job_download, name='export_job_download'),
 ]
\ No newline at end of file
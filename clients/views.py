@@ -1,60 +1,96 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.core.paginator import Paginator
-from django.db.models import Q
-from .models import Client
-from .forms import ClientForm, ClientSearchForm
+from django.core.exceptions import PermissionDenied
+from django.db.models import Q, Sum
+from django.utils import timezone
+from datetime import timedelta
+from .models import Client, DailyClientCounts, ExportJob
+from .exports import BACKGROUND_THRESHOLD, write_clients_pdf, start_export_job
+from .forms import ClientForm, ClientSearchForm, filter_clients
+from .search import search_clients
+from fitness_club.pagination import paginate
+from fitness_club.exports import stream_export
 from subscriptions.models import Membership
 
 @login_required
 def client_list(request):
     """Список всех клиентов"""
     form = ClientSearchForm(request.GET or None)
-    clients = Client.objects.all().order_by('last_name', 'first_name')
-    
-
-    if form.is_valid():
-        search = form.cleaned_data.get('search')
-        status = form.cleaned_data.get('status')
-        
-        if search:
-            clients = clients.filter(
-                Q(first_name__icontains=search) |
-                Q(last_name__icontains=search) |
-                Q(middle_name__icontains=search) |
-                Q(phone__icontains=search) |
-                Q(email__icontains=search)
-            )
-        
-        if status:
-            clients = clients.filter(status=status)
-    
-    paginator = Paginator(clients, 10)  
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    clients = filter_clients(Client.objects.all(), form)
+    ordering = ('last_name', 'first_name', 'id')
+    if form.is_valid() and form.cleaned_data.get('order') == 'total_paid':
+        ordering = ('-total_paid', 'id')
+    if form.is_valid() and form.cleaned_data.get('search'):
+        ordering = ('-exact_match',) + ordering
+    
+    page_obj = paginate(request, clients, ordering, 10)
+    total_clients, total_exact = page_obj.paginator.estimated_count()
     
     context = {
         'page_obj': page_obj,
         'form': form,
-        'total_clients': clients.count(),
+        'total_clients': total_clients,
+        'total_exact': total_exact,
     }
     return render(request, 'clients/client_list.html', context)
 
 @login_required
 def client_detail(request, pk):
     """Детальная информация о клиенте"""
-    client = get_object_or_404(Client, pk=pk)
+    from django.db.models import Count, DecimalField, IntegerField, OuterRef, Prefetch, Subquery
+    from django.db.models.functions import Coalesce
+    from payments.models import Payment
+    from subscriptions.models import Visit
+    
+    def count_of(queryset):
+        """Подзапрос COUNT по клиенту (без JOIN и размножения строк)"""
+        return Coalesce(Subquery(
+            queryset.filter(client=OuterRef('pk')).order_by()
+            .values('client').annotate(total=Count('id')).values('total'),
+            output_field=IntegerField(),
+        ), 0)
+    
+    # Клиент со счетчиками одним запросом, абонементы с тарифами - вторым
+    client = get_object_or_404(
+        Client.objects.annotate(
+            payments_count=count_of(Payment.objects.all()),
+            completed_payments_total=Coalesce(Subquery(
+                Payment.objects.filter(client=OuterRef('pk'), status='completed').order_by()
+                .values('client').annotate(total=Sum('amount')).values('total'),
+            ), 0, output_field=DecimalField()),
+            visits_count=count_of(Visit.objects.filter(direction='in')),
+        ).prefetch_related(Prefetch(
+            'memberships',
+            queryset=Membership.objects.select_related('plan').order_by('-start_date', '-id'),
+        )),
+        pk=pk,
+    )
     
-    active_memberships = client.memberships.filter(status='active')
-    expired_memberships = client.memberships.filter(status='expired')
-    all_memberships = client.memberships.all().order_by('-start_date')
+    # Разбивка абонементов по статусам в памяти
+    all_memberships = list(client.memberships.all())
+    active_memberships = [m for m in all_memberships if m.status == 'active']
+    expired_memberships = [m for m in all_memberships if m.status == 'expired']
+    
+    # История платежей и посещений постранично (свои курсоры у каждого списка)
+    payments_page = paginate(
+        request,
+        Payment.objects.filter(client=client).select_related('membership_plan'),
+        ('-payment_date', '-id'), 10, param='payments_cursor',
+    )
+    visits_page = paginate(
+        request,
+        Visit.objects.filter(client=client),
+        ('-timestamp', '-id'), 10, param='visits_cursor',
+    )
     
     context = {
         'client': client,
         'active_memberships': active_memberships,
         'expired_memberships': expired_memberships,
         'all_memberships': all_memberships,
+        'payments_page': payments_page,
+        'visits_page': visits_page,
     }
     return render(request, 'clients/client_detail.html', context)
 
@@ -107,73 +143,139 @@ def client_delete(request, pk):
     context = {'client': client}
     return render(request, 'clients/client_confirm_delete.html', context)
 
+# Копии фото адресуются с ?v=<версия>, поэтому их можно кэшировать надолго
+PHOTO_CACHE_SECONDS = 60 * 60 * 24 * 365
+
 @login_required
-def client_statistics(request):
-    """Статистика по клиентам"""
-    total_clients = Client.objects.count()
-    active_clients = Client.objects.filter(status='active').count()
-    inactive_clients = Client.objects.filter(status='inactive').count()
-    suspended_clients = Client.objects.filter(status='suspended').count()
+def client_photo(request, pk, variant):
+    """Уменьшенная копия фото клиента (WebP, если браузер его понимает)"""
+    from django.http import FileResponse, Http404
+    from django.utils.cache import patch_cache_control, patch_vary_headers
+    from .photos import PHOTO_VARIANTS, PHOTO_FORMATS, get_variant
     
+    if variant not in PHOTO_VARIANTS:
+        raise Http404('Неизвестный размер фото')
+    photo = get_object_or_404(Client.objects.only('photo'), pk=pk).photo
+    if not photo:
+        raise Http404('Фото не загружено')
+    
+    fmt = 'webp' if 'image/webp' in request.headers.get('Accept', '') else 'jpeg'
+    try:
+        path = get_variant(photo.name, variant, fmt, photo.storage)
+    except (OSError, ValueError):
+        raise Http404('Не удалось обработать фото')
+    
+    response = FileResponse(photo.storage.open(path, 'rb'), content_type=PHOTO_FORMATS[fmt][1])
+    patch_cache_control(response, private=True, max_age=PHOTO_CACHE_SECONDS, immutable=True)
+    patch_vary_headers(response, ['Accept'])
+    return response
+
+# Сколько вариантов отдавать в автодополнение
+AUTOCOMPLETE_LIMIT = 20
 
-    clients_with_active_memberships = Client.objects.filter(
-        memberships__status='active'
-    ).distinct().count()
+@login_required
+def client_autocomplete(request):
+    """JSON-поиск активных клиентов для полей выбора клиента"""
+    from django.http import JsonResponse
     
+    query = request.GET.get('q', '').strip()
+    clients = Client.objects.filter(status='active')
+    if query:
+        clients = search_clients(query, clients)
+    else:
+        clients = clients.order_by('last_name', 'first_name', 'id')
+    
+    rows = clients.values_list('id', 'last_name', 'first_name', 'middle_name', 'phone')[:AUTOCOMPLETE_LIMIT]
+    results = [
+        {
+            'id': pk,
+            'text': ' '.join(part for part in (last_name, first_name, middle_name) if part) + f' ({phone})',
+        }
+        for pk, last_name, first_name, middle_name, phone in rows
+    ]
+    return JsonResponse({'results': results})
 
-    from django.utils import timezone
-    from datetime import timedelta
+@login_required
+def client_statistics(request):
+    """Статистика по клиентам"""
+    thirty_days_ago = timezone.localdate() - timedelta(days=30)
     
-    thirty_days_ago = timezone.now() - timedelta(days=30)
-    new_clients = Client.objects.filter(
-        registration_date__gte=thirty_days_ago
-    ).count()
+    totals = DailyClientCounts.objects.aggregate(
+        total_clients=Sum('count'),
+        active_clients=Sum('count', filter=Q(status='active')),
+        inactive_clients=Sum('count', filter=Q(status='inactive')),
+        suspended_clients=Sum('count', filter=Q(status='suspended')),
+        new_clients=Sum('count', filter=Q(date__gte=thirty_days_ago)),
+    )
+    
+
+    clients_with_active_memberships = Client.objects.filter(has_active_membership=True).count()
     
     context = {
-        'total_clients': total_clients,
-        'active_clients': active_clients,
-        'inactive_clients': inactive_clients,
-        'suspended_clients': suspended_clients,
+        'total_clients': totals['total_clients'] or 0,
+        'active_clients': totals['active_clients'] or 0,
+        'inactive_clients': totals['inactive_clients'] or 0,
+        'suspended_clients': totals['suspended_clients'] or 0,
         'clients_with_active_memberships': clients_with_active_memberships,
-        'new_clients': new_clients,
+        'new_clients': totals['new_clients'] or 0,
     }
     return render(request, 'clients/client_statistics.html', context)
 
 @login_required
 def export_clients_pdf(request):
-    """Экспорт клиентов в PDF"""
-    from django.http import HttpResponse
-    import io
-    from reportlab.pdfgen import canvas
-    from reportlab.lib.pagesizes import A4
-    
-    # Создаем PDF
-    buffer = io.BytesIO()
-    p = canvas.Canvas(buffer, pagesize=A4)
-    
-    # Заголовок
-    p.setFont("Helvetica-Bold", 16)
-    p.drawString(50, 800, "Список клиентов фитнес-клуба")
-    
-    # Данные
-    p.setFont("Helvetica", 10)
-    y = 750
-    clients = Client.objects.all()
-    
-    for client in clients:
-        if y < 50:
-            p.showPage()
-            p.setFont("Helvetica", 10)
-            y = 750
-        
-        p.drawString(50, y, f"{client.get_full_name()}")
-        p.drawString(200, y, f"{client.phone}")
-        p.drawString(300, y, f"{client.email or '-'}")
-        y -= 20
-    
-    p.save()
+    """Экспорт клиентов в PDF (большие выгрузки формируются в фоне)"""
+    import tempfile
+    from django.http import FileResponse
+    
+    form = ClientSearchForm(request.GET or None)
+    clients = filter_clients(Client.objects.all(), form)
     
+    # Считаем не дальше порога: точное число здесь не нужно
+    if clients.order_by()[:BACKGROUND_THRESHOLD + 1].count() > BACKGROUND_THRESHOLD:
+        job = start_export_job(request.GET.urlencode(), request.user)
+        messages.info(request, 'Клиентов много, PDF формируется в фоне. Файл появится на этой странице.')
+        return redirect('export_job_detail', pk=job.pk)
+    
+    buffer = tempfile.TemporaryFile()
+    write_clients_pdf(clients, buffer)
     buffer.seek(0)
-    response = HttpResponse(buffer, content_type='application/pdf')
-    response['Content-Disposition'] = 'attachment; filename="clients.pdf"'
-    return response
\ No newline at end of file
+    return FileResponse(buffer, as_attachment=True, filename='clients.pdf', content_type='application/pdf')
+
+def _get_export_job(request, pk):
+    """Выгрузка, доступная пользователю: своя или любая для менеджера"""
+    job = get_object_or_404(ExportJob, pk=pk)
+    if job.created_by_id != request.user.pk and not request.user.is_manager:
+        raise PermissionDenied
+    return job
+
+@login_required
+def export_job_detail(request, pk):
+    """Статус фоновой выгрузки"""
+    job = _get_export_job(request, pk)
+    
+    context = {'job': job}
+    return render(request, 'clients/export_job_detail.html', context)
+
+@login_required
+def export_job_download(request, pk):
+    """Скачать готовый файл фоновой выгрузки"""
+    from django.http import FileResponse, Http404
+    
+    job = _get_export_job(request, pk)
+    if job.status != 'done' or not job.file:
+        raise Http404('Файл еще не готов')
+    
+    return FileResponse(job.file.open('rb'), as_attachment=True, filename=f'clients_{job.pk}.pdf')
+
+# Колонки машиночитаемой выгрузки клиентов
+CLIENT_EXPORT_COLUMNS = [
+    'id', 'last_name', 'first_name', 'middle_name', 'phone', 'email',
+    'birth_date', 'status', 'registration_date',
+]
+
+@login_required
+def export_clients_data(request, fmt):
+    """Потоковая выгрузка клиентов в CSV/NDJSON (с учетом фильтров списка)"""
+    form = ClientSearchForm(request.GET or None)
+    clients = filter_clients(Client.objects.all(), form).order_by('id')
+    return stream_export(clients, CLIENT_EXPORT_COLUMNS, fmt, 'clients')
\ No newline at end of file
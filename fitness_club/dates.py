@@ -0,0 +1,19 @@
+import datetime
+from django.utils import timezone
+
+
+def local_day(value):
+    """Локальная (Asia/Bishkek) дата для datetime из базы"""
+    if timezone.is_naive(value):
+        return value.date()
+    return timezone.localdate(value)
+
+
+def local_day_start(day):
+    """Начало локального дня как aware datetime"""
+    return timezone.make_aware(datetime.datetime.combine(day, datetime.time.min))
+
+
+def local_day_range(first_day, last_day):
+    """Полуинтервал [начало first_day, начало дня после last_day)"""
+    return local_day_start(first_day), local_day_start(last_day + datetime.timedelta(days=1))
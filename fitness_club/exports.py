@@ -0,0 +1,60 @@
+import csv
+import datetime
+import json
+from decimal import Decimal
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+
+CHUNK_SIZE = 2000
+
+
+class Echo:
+    """Псевдо-файл для csv.writer: write() просто возвращает строку"""
+
+    def write(self, value):
+        return value
+
+
+def _plain(value):
+    """Значение ячейки в виде, пригодном для CSV/JSON"""
+    if isinstance(value, datetime.datetime):
+        if timezone.is_aware(value):
+            value = timezone.localtime(value)
+        return value.isoformat()
+    if isinstance(value, datetime.date):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    return value
+
+
+def _csv_lines(rows, columns):
+    writer = csv.writer(Echo())
+    # BOM, чтобы Excel правильно открыл UTF-8 с кириллицей
+    yield '\ufeff' + writer.writerow(columns)
+    for row in rows:
+        yield writer.writerow(['' if value is None else _plain(value) for value in row])
+
+
+def _ndjson_lines(rows, columns):
+    for row in rows:
+        record = {column: _plain(value) for column, value in zip(columns, row)}
+        yield json.dumps(record, ensure_ascii=False) + '\n'
+
+
+def stream_export(queryset, columns, fmt, filename):
+    """
+    Потоковая выгрузка queryset в CSV или NDJSON (JSON lines).
+    columns - поля для values_list, они же заголовки колонок/ключи объектов.
+    Строки читаются из базы порциями по CHUNK_SIZE и сразу отдаются клиенту.
+    """
+    rows = queryset.values_list(*columns).iterator(chunk_size=CHUNK_SIZE)
+    if fmt == 'csv':
+        lines = _csv_lines(rows, columns)
+        content_type = 'text/csv; charset=utf-8'
+    else:
+        lines = _ndjson_lines(rows, columns)
+        content_type = 'application/x-ndjson; charset=utf-8'
+    response = StreamingHttpResponse(lines, content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="{filename}.{fmt}"'
+    return response
@@ -0,0 +1,187 @@
+import base64
+import binascii
+import datetime
+import json
+from decimal import Decimal
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def _dump_value(value):
+    """Значение поля сортировки в JSON-совместимом виде (с тегом типа)"""
+    if isinstance(value, datetime.datetime):
+        return ['dt', value.isoformat()]
+    if isinstance(value, datetime.date):
+        return ['d', value.isoformat()]
+    if isinstance(value, Decimal):
+        return ['n', str(value)]
+    return value
+
+
+def _load_value(value):
+    if isinstance(value, list):
+        tag, raw = value
+        if tag == 'dt':
+            return datetime.datetime.fromisoformat(raw)
+        if tag == 'd':
+            return datetime.date.fromisoformat(raw)
+        if tag == 'n':
+            return Decimal(raw)
+        raise InvalidCursor(tag)
+    return value
+
+
+def encode_cursor(values, direction):
+    payload = json.dumps({'v': [_dump_value(v) for v in values], 'd': direction}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        values = [_load_value(v) for v in payload['v']]
+        direction = payload['d']
+    except (ValueError, KeyError, TypeError, binascii.Error) as exc:
+        raise InvalidCursor(str(exc))
+    if direction not in ('n', 'p'):
+        raise InvalidCursor(direction)
+    return values, direction
+
+
+class CursorPage:
+    """Страница курсорной пагинации"""
+
+    def __init__(self, object_list, paginator, has_next, has_previous):
+        self.object_list = object_list
+        self.paginator = paginator
+        self.has_next = has_next
+        self.has_previous = has_previous
+        # Остальные GET-параметры (фильтры) для ссылок на соседние страницы
+        self.base_query = ''
+        # Имя GET-параметра курсора (разное, если на странице несколько списков)
+        self.cursor_param = 'cursor'
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __bool__(self):
+        return bool(self.object_list)
+
+    def has_other_pages(self):
+        return self.has_next or self.has_previous
+
+    @property
+    def next_cursor(self):
+        if not self.has_next:
+            return None
+        return encode_cursor(self.paginator.key(self.object_list[-1]), 'n')
+
+    @property
+    def previous_cursor(self):
+        if not self.has_previous:
+            return None
+        return encode_cursor(self.paginator.key(self.object_list[0]), 'p')
+
+
+class CursorPaginator:
+    """
+    Keyset-пагинация: страница выбирается условием по полям сортировки
+    последней (или первой) записи, без OFFSET и без COUNT(*).
+
+    ordering должен однозначно задавать порядок, поэтому последним полем
+    обычно идет id, например ('last_name', 'first_name', 'id').
+    """
+
+    def __init__(self, queryset, ordering, per_page):
+        self.queryset = queryset
+        self.ordering = list(ordering)
+        self.per_page = per_page
+        self.fields = [field.lstrip('-') for field in self.ordering]
+        self.descending = [field.startswith('-') for field in self.ordering]
+
+    def key(self, obj):
+        # Строки могут быть и объектами моделей, и словарями из values()
+        if isinstance(obj, dict):
+            return [obj[field] for field in self.fields]
+        return [getattr(obj, field) for field in self.fields]
+
+    def _seek(self, values, forward):
+        """Условие «строго после» (forward) или «строго до» ключа values"""
+        condition = Q()
+        for position, field in enumerate(self.fields):
+            lookup = 'lt' if self.descending[position] == forward else 'gt'
+            step = Q(**{f'{field}__{lookup}': values[position]})
+            for previous in range(position):
+                step &= Q(**{self.fields[previous]: values[previous]})
+            condition |= step
+        return condition
+
+    def _reversed_ordering(self):
+        return [field[1:] if field.startswith('-') else f'-{field}' for field in self.ordering]
+
+    def _filter(self, queryset, values, forward):
+        # Значения из курсора приходят от клиента: неподходящий тип поля
+        # (подмененный курсор) - такая же ошибка, как битый курсор
+        try:
+            return queryset.filter(self._seek(values, forward))
+        except (ValueError, TypeError, ValidationError) as exc:
+            raise InvalidCursor(str(exc))
+
+    def page(self, cursor=None):
+        if cursor:
+            values, direction = decode_cursor(cursor)
+            if len(values) != len(self.fields):
+                raise InvalidCursor('cursor does not match ordering')
+        else:
+            values, direction = None, 'n'
+
+        if direction == 'n':
+            queryset = self.queryset.order_by(*self.ordering)
+            if values is not None:
+                queryset = self._filter(queryset, values, forward=True)
+            rows = list(queryset[:self.per_page + 1])
+            has_more = len(rows) > self.per_page
+            return CursorPage(rows[:self.per_page], self, has_next=has_more, has_previous=values is not None)
+
+        queryset = self.queryset.order_by(*self._reversed_ordering())
+        queryset = self._filter(queryset, values, forward=False)
+        rows = list(queryset[:self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page][::-1]
+        return CursorPage(rows, self, has_next=True, has_previous=has_more)
+
+    def get_page(self, cursor=None):
+        """Как page(), но при битом курсоре возвращает первую страницу"""
+        try:
+            return self.page(cursor)
+        except InvalidCursor:
+            return self.page(None)
+
+    def estimated_count(self, limit=1000):
+        """
+        Количество записей, но не больше limit+1: COUNT по подзапросу с LIMIT
+        останавливается, не дочитывая таблицу. Возвращает (count, exact).
+        """
+        count = self.queryset.order_by()[:limit + 1].count()
+        if count > limit:
+            return limit, False
+        return count, True
+
+
+def paginate(request, queryset, ordering, per_page, param='cursor'):
+    """Страница по параметру ?cursor= с сохранением остальных GET-параметров"""
+    page = CursorPaginator(queryset, ordering, per_page).get_page(request.GET.get(param))
+    params = request.GET.copy()
+    params.pop(param, None)
+    params.pop('page', None)
+    page.base_query = params.urlencode()
+    page.cursor_param = param
+    return page
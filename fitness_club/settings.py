@@ -105,4 +105,59 @@ AUTHENTICATION_BACKENDS = [
 ]
 
 SESSION_COOKIE_AGE = 86400  
-SESSION_SAVE_EVERY_REQUEST = True
\ No newline at end of file
+SESSION_SAVE_EVERY_REQUEST = True
+
+# Общий для всех процессов кэш: показатели дашборда, счетчики абонементов и
+# версия справочника тарифов сбрасываются сигналами, и сброс должен быть виден
+# всем воркерам (LocMemCache у каждого процесса свой). Таблицу кэша создает
+# миграция accounts 0002_create_cache_table (обычный migrate); при смене
+# LOCATION ее можно создать вручную: python manage.py createcachetable
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'fitness_club_cache',
+    }
+}
+
+# Время жизни кэша показателей дашборда (в секундах)
+DASHBOARD_CACHE_TIMEOUT = 60
+
+# Выгрузки клиентов больше этого числа строк формируются в фоне: задачи
+# выполняет manage.py run_export_jobs --loop (отдельный процесс). Выгрузка,
+# которая формируется дольше EXPORT_JOB_TIMEOUT секунд, считается зависшей
+# (обработчик перезапустили) и возвращается в очередь
+CLIENT_EXPORT_BACKGROUND_THRESHOLD = 20000
+EXPORT_JOB_TIMEOUT = 30 * 60
+
+# За сколько дней до окончания продлеваются абонементы с автопродлением
+MEMBERSHIP_RENEWAL_WINDOW_DAYS = 3
+
+# Почасовая загрузка: сколько проходов копить в памяти процесса и как часто
+# сбрасывать счетчики (сек). Журнал посещений пишется сразу; при аварийной
+# остановке теряются только счетчики последних секунд (их восстанавливает
+# manage.py backfill_rollups по журналу)
+VISIT_BUFFER_SIZE = 100
+VISIT_FLUSH_INTERVAL = 5
+
+# Сколько входов в час клуб принимает комфортно (для расчета загруженности)
+CLUB_HOURLY_CAPACITY = 60
+
+# Отправка напоминаний (payments.dispatch): HTTP-шлюзы каналов, лимиты
+# сообщений в секунду и число потоков. Напоминание по каналу без шлюза
+# получает статус 'failed' («канал не настроен»), а не 'sent'.
+REMINDER_HTTP_ENDPOINTS = {
+    # 'sms': 'https://sms-gateway.example/send',
+}
+# Только для разработки: каналы без шлюза пишут сообщения в лог и
+# считаются отправленными
+REMINDER_LOG_ONLY = DEBUG
+REMINDER_RATE_LIMITS = {
+    'email': 50,
+    'sms': 20,
+}
+REMINDER_DISPATCH_WORKERS = 8
+
+# Генерация напоминаний (payments.reminders): за сколько дней напоминать
+# об окончании абонемента и о сроке оплаты
+REMINDER_EXPIRY_DAYS = 7
+REMINDER_PAYMENT_DUE_DAYS = 3
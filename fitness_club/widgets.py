@@ -0,0 +1,48 @@
+from django import forms
+from django.core.exceptions import ValidationError
+from django.urls import reverse
+
+
+class AutocompleteSelect(forms.Select):
+    """
+    Выпадающий список для ModelChoiceField, в который выводится только
+    выбранное значение. Остальные варианты подгружает скрипт
+    includes/autocomplete_js.html из JSON-адреса url_name по мере ввода.
+
+    forward - id другого поля формы, значение которого передается вместе
+    с запросом (например, абонементы выбранного клиента).
+    """
+
+    def __init__(self, url_name, forward=None, attrs=None):
+        super().__init__(attrs)
+        self.url_name = url_name
+        self.forward = forward
+
+    def get_context(self, name, value, attrs):
+        context = super().get_context(name, value, attrs)
+        widget_attrs = context['widget']['attrs']
+        widget_attrs['data-autocomplete-url'] = reverse(self.url_name)
+        if self.forward:
+            widget_attrs['data-autocomplete-forward'] = self.forward
+        return context
+
+    def optgroups(self, name, value, attrs=None):
+        field = self.choices.field
+        options = []
+        if field.empty_label is not None:
+            options.append(('', field.empty_label))
+
+        selected = [v for v in value if v not in field.empty_values]
+        if selected:
+            try:
+                objects = list(field.queryset.filter(pk__in=selected))
+            except (ValueError, TypeError, ValidationError):
+                objects = []
+            options += [(obj.pk, field.label_from_instance(obj)) for obj in objects]
+
+        # Подменяем варианты только на время отрисовки
+        choices, self.choices = self.choices, options
+        try:
+            return super().optgroups(name, value, attrs)
+        finally:
+            self.choices = choices
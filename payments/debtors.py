@@ -0,0 +1,63 @@
+from django.db.models import Count, Exists, Min, OuterRef, Sum
+from django.utils import timezone
+from subscriptions.models import Membership
+
+DEBTOR_COLUMNS = [
+    'client_id', 'client__last_name', 'client__first_name', 'client__middle_name',
+    'client__phone', 'client__email', 'oldest_end_date', 'overdue_count', 'outstanding',
+]
+
+
+def lapsed_memberships(today=None):
+    """Истекшие абонементы, после которых у клиента не было нового"""
+    today = today or timezone.localdate()
+    successors = Membership.objects.filter(
+        client=OuterRef('client'),
+        start_date__gt=OuterRef('start_date'),
+    )
+    return Membership.objects.filter(
+        status='expired',
+        end_date__lt=today,
+    ).exclude(Exists(successors))
+
+
+def overdue_memberships(today=None):
+    """
+    Все истекшие абонементы должников. Должник - клиент, последний абонемент
+    которого истек и не продлен (lapsed_memberships); в долг идут все его
+    истекшие абонементы, а не только последний.
+    """
+    today = today or timezone.localdate()
+    return Membership.objects.filter(
+        status='expired',
+        end_date__lt=today,
+    ).filter(Exists(lapsed_memberships(today).filter(client=OuterRef('client'))))
+
+
+def debtors(today=None):
+    """
+    Отчет по должникам, посчитанный в базе: одна строка (словарь) на клиента
+    с самой ранней датой окончания, числом просроченных абонементов и суммой
+    к оплате по их тарифам. Порядок для keyset-пагинации:
+    ('oldest_end_date', 'client_id') - сначала самые давние долги; условие
+    по oldest_end_date уходит в HAVING.
+    """
+    return (
+        overdue_memberships(today)
+        .values(*DEBTOR_COLUMNS[:6])
+        .annotate(
+            oldest_end_date=Min('end_date'),
+            overdue_count=Count('id'),
+            outstanding=Sum('plan__price'),
+        )
+    )
+
+
+def debtors_totals(today=None):
+    """Число должников и общая сумма долга одним запросом"""
+    totals = overdue_memberships(today).aggregate(
+        clients=Count('client', distinct=True),
+        outstanding=Sum('plan__price'),
+    )
+    totals['outstanding'] = totals['outstanding'] or 0
+    return totals
@@ -0,0 +1,198 @@
+import datetime
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from .models import Reminder
+from .senders import SendError, get_rate_limiters, get_sender
+
+logger = logging.getLogger(__name__)
+
+DISPATCH_BATCH_SIZE = 500
+DISPATCH_WORKERS = getattr(settings, 'REMINDER_DISPATCH_WORKERS', 8)
+
+# Повторы: через 1, 2, 4, ... минут, но не позже чем через 6 часов
+MAX_ATTEMPTS = getattr(settings, 'REMINDER_MAX_ATTEMPTS', 5)
+RETRY_BASE_SECONDS = 60
+RETRY_MAX_SECONDS = 6 * 60 * 60
+
+# Напоминания, зависшие в 'sending' дольше этого (обработчик упал), возвращаются в очередь
+STALE_CLAIM_SECONDS = 15 * 60
+
+RESULT_FIELDS = [
+    'send_status', 'sent_at', 'error_message', 'attempts',
+    'next_attempt_at', 'claimed_at', 'updated_at',
+]
+
+
+def due_reminders(now=None):
+    """Напоминания, которые пора отправить (включая повторы после ошибок)"""
+    now = now or timezone.now()
+    return Reminder.objects.filter(send_status='pending', send_date__lte=now).filter(
+        Q(next_attempt_at__isnull=True) | Q(next_attempt_at__lte=now)
+    )
+
+
+def release_stale_claims(now=None):
+    """Вернуть в очередь напоминания, взятые упавшим обработчиком"""
+    now = now or timezone.now()
+    return Reminder.objects.filter(
+        send_status='sending',
+        claimed_at__lt=now - datetime.timedelta(seconds=STALE_CLAIM_SECONDS),
+    ).update(send_status='pending', claimed_at=None, updated_at=now)
+
+
+def claim_reminders(batch_size=DISPATCH_BATCH_SIZE, now=None):
+    """
+    Взять пачку напоминаний в отправку: перевести их из 'pending' в 'sending'.
+
+    На PostgreSQL строки блокируются с SKIP LOCKED, и параллельные
+    обработчики берут разные пачки. Переход статуса с условием
+    send_status='pending' и отметка claimed_at=now гарантируют, что
+    напоминание достанется только одному обработчику и на других базах.
+    """
+    now = now or timezone.now()
+    with transaction.atomic():
+        ids = list(
+            due_reminders(now).select_for_update(skip_locked=True)
+            .order_by('send_date', 'id').values_list('id', flat=True)[:batch_size]
+        )
+        if not ids:
+            return []
+        Reminder.objects.filter(id__in=ids, send_status='pending').update(
+            send_status='sending', claimed_at=now, updated_at=now,
+        )
+    return list(
+        Reminder.objects.filter(id__in=ids, send_status='sending', claimed_at=now)
+        .select_related('client')
+    )
+
+
+def retry_delay(attempts):
+    """Задержка перед следующей попыткой (экспоненциальная)"""
+    return datetime.timedelta(seconds=min(RETRY_BASE_SECONDS * 2 ** (attempts - 1), RETRY_MAX_SECONDS))
+
+
+def _apply_result(reminder, error, now):
+    """Проставить результат отправки (без сохранения)"""
+    reminder.attempts += 1
+    reminder.claimed_at = None
+    reminder.updated_at = now
+    if error is None:
+        reminder.send_status = 'sent'
+        reminder.sent_at = now
+        reminder.error_message = None
+        reminder.next_attempt_at = None
+    elif error.permanent or reminder.attempts >= MAX_ATTEMPTS:
+        reminder.send_status = 'failed'
+        reminder.error_message = str(error)
+        reminder.next_attempt_at = None
+    else:
+        reminder.send_status = 'pending'
+        reminder.error_message = str(error)
+        reminder.next_attempt_at = now + retry_delay(reminder.attempts)
+
+
+class Dispatcher:
+    """
+    Отправка напоминаний пулом потоков. У каждого потока свои отправители
+    (и соединения) по каналам, они живут до close(); ограничение скорости
+    общее для всех потоков канала. Потоки не обращаются к базе: клиенты
+    загружены заранее, результаты сохраняются одним bulk_update на пачку.
+    """
+
+    def __init__(self, workers=DISPATCH_WORKERS):
+        self.workers = workers
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='reminders')
+        self.limiters = get_rate_limiters()
+        self.local = threading.local()
+        self.senders = []
+        self.senders_lock = threading.Lock()
+
+    def _sender(self, channel):
+        senders = getattr(self.local, 'senders', None)
+        if senders is None:
+            senders = self.local.senders = {}
+        if channel not in senders:
+            senders[channel] = get_sender(channel)
+            with self.senders_lock:
+                self.senders.append(senders[channel])
+        return senders[channel]
+
+    def _send_one(self, reminder):
+        limiter = self.limiters.get(reminder.send_method)
+        if limiter:
+            limiter.wait()
+        try:
+            self._sender(reminder.send_method).send(reminder)
+        except SendError as exc:
+            return exc
+        except Exception as exc:
+            logger.exception('Ошибка отправки напоминания #%s', reminder.pk)
+            return SendError(str(exc))
+        return None
+
+    def send(self, reminders):
+        """Отправить напоминания и сохранить результаты; возвращает сводку"""
+        errors = list(self.executor.map(self._send_one, reminders))
+        now = timezone.now()
+        summary = {'sent': 0, 'retry': 0, 'failed': 0}
+        for reminder, error in zip(reminders, errors):
+            _apply_result(reminder, error, now)
+            key = {'sent': 'sent', 'pending': 'retry', 'failed': 'failed'}[reminder.send_status]
+            summary[key] += 1
+        Reminder.objects.bulk_update(reminders, RESULT_FIELDS, batch_size=500)
+        return summary
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+        for sender in self.senders:
+            try:
+                sender.close()
+            except Exception:
+                logger.exception('Не удалось закрыть соединение канала %s', sender.channel)
+
+
+def dispatch_reminders(batch_size=DISPATCH_BATCH_SIZE, workers=DISPATCH_WORKERS, max_batches=None):
+    """
+    Отправить все напоминания, которые пора отправить: брать пачки, пока
+    очередь не опустеет (или не будет обработано max_batches пачек).
+    Возвращает сводку.
+    """
+    summary = {'sent': 0, 'retry': 0, 'failed': 0, 'released': release_stale_claims()}
+    dispatcher = Dispatcher(workers)
+    try:
+        batches = 0
+        while max_batches is None or batches < max_batches:
+            reminders = claim_reminders(batch_size)
+            if not reminders:
+                break
+            batches += 1
+            for key, count in dispatcher.send(reminders).items():
+                summary[key] += count
+    finally:
+        dispatcher.close()
+    return summary
+
+
+def send_reminder_now(reminder):
+    """Отправить одно напоминание сразу (кнопка «Отправить» в списке)"""
+    now = timezone.now()
+    claimed = Reminder.objects.filter(
+        pk=reminder.pk, send_status__in=['pending', 'failed'],
+    ).update(send_status='sending', claimed_at=now, updated_at=now)
+    if not claimed:
+        return False, 'Напоминание уже отправлено или отправляется'
+
+    reminder = Reminder.objects.select_related('client').get(pk=reminder.pk)
+    dispatcher = Dispatcher(workers=1)
+    try:
+        dispatcher.send([reminder])
+    finally:
+        dispatcher.close()
+    if reminder.send_status == 'sent':
+        return True, 'Напоминание отправлено'
+    return False, f'Ошибка отправки: {reminder.error_message}'
@@ -1,8 +1,16 @@
 from django import forms
 from django.core.validators import MinValueValidator
+from fitness_club.widgets import AutocompleteSelect
+from subscriptions.forms import PlanChoiceField
 from .models import Payment, Reminder
 
 class PaymentForm(forms.ModelForm):
+    # Только активные тарифы, из реестра тарифов в памяти
+    membership_plan = PlanChoiceField(
+        required=False,
+        widget=forms.Select(attrs={'class': 'form-control'})
+    )
+    
     class Meta:
         model = Payment
         fields = [
@@ -12,9 +20,9 @@ class PaymentForm(forms.ModelForm):
             'period_end', 'receipt', 'notes'
         ]
         widgets = {
-            'client': forms.Select(attrs={'class': 'form-control'}),
-            'membership': forms.Select(attrs={'class': 'form-control'}),
-            'membership_plan': forms.Select(attrs={'class': 'form-control'}),
+            'client': AutocompleteSelect('client_autocomplete', attrs={'class': 'form-control'}),
+            'membership': AutocompleteSelect('membership_autocomplete', forward='client',
+                                             attrs={'class': 'form-control'}),
             'amount': forms.NumberInput(attrs={
                 'class': 'form-control',
                 'step': '0.01'
@@ -48,11 +56,10 @@ class PaymentForm(forms.ModelForm):
         
         # Показываем только активные абонементы
         from subscriptions.models import Membership
-        self.fields['membership'].queryset = Membership.objects.filter(status='active')
-        
-        # Показываем только активные тарифы
-        from subscriptions.models import MembershipPlan
-        self.fields['membership_plan'].queryset = MembershipPlan.objects.filter(is_active=True)
+        self.fields['membership'].queryset = Membership.objects.filter(
+            status='active'
+        ).select_related('client', 'plan')
+
 
 class PaymentSearchForm(forms.Form):
     """Форма поиска платежей"""
@@ -100,8 +107,9 @@ class ReminderForm(forms.ModelForm):
             'send_date', 'send_method', 'subject', 'message'
         ]
         widgets = {
-            'client': forms.Select(attrs={'class': 'form-control'}),
-            'membership': forms.Select(attrs={'class': 'form-control'}),
+            'client': AutocompleteSelect('client_autocomplete', attrs={'class': 'form-control'}),
+            'membership': AutocompleteSelect('membership_autocomplete', forward='client',
+                                             attrs={'class': 'form-control'}),
             'reminder_type': forms.Select(attrs={'class': 'form-control'}),
             'send_date': forms.DateTimeInput(attrs={
                 'class': 'form-control',
@@ -0,0 +1,39 @@
+import datetime
+from django.core.management.base import BaseCommand, CommandError
+from payments.reminders import REMINDER_BATCH_SIZE, generate_reminders
+
+
+class Command(BaseCommand):
+    help = (
+        'Создает напоминания об окончании абонементов, о сроке оплаты и поздравления '
+        'с днем рождения. Запускается по расписанию (например, cron каждый час), '
+        'повторный запуск не создает дублей'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', help='Считать сегодняшней эту дату (ГГГГ-ММ-ДД)')
+        parser.add_argument('--batch-size', type=int, default=REMINDER_BATCH_SIZE)
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Только показать, сколько напоминаний будет создано')
+
+    def handle(self, *args, **options):
+        today = None
+        if options['date']:
+            try:
+                today = datetime.date.fromisoformat(options['date'])
+            except ValueError:
+                raise CommandError(f'Неверная дата: {options["date"]}')
+
+        summary = generate_reminders(
+            today=today,
+            batch_size=options['batch_size'],
+            dry_run=options['dry_run'],
+        )
+
+        verb = 'Будет создано' if options['dry_run'] else 'Создано'
+        self.stdout.write(self.style.SUCCESS(
+            f'{verb} напоминаний (на {summary["today"]:%d.%m.%Y}): '
+            f'об окончании абонемента - {summary["subscription_expiry"]}, '
+            f'об оплате - {summary["payment_due"]}, '
+            f'с днем рождения - {summary["birthday"]}'
+        ))
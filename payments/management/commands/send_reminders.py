@@ -0,0 +1,37 @@
+import time
+from django.core.management.base import BaseCommand
+from payments.dispatch import DISPATCH_BATCH_SIZE, DISPATCH_WORKERS, dispatch_reminders
+
+
+class Command(BaseCommand):
+    help = (
+        'Отправляет напоминания, срок которых наступил: пачками, пулом потоков, '
+        'с повторами при ошибках. С --loop работает постоянно как обработчик очереди'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=DISPATCH_BATCH_SIZE)
+        parser.add_argument('--workers', type=int, default=DISPATCH_WORKERS,
+                            help='Количество потоков отправки')
+        parser.add_argument('--loop', action='store_true',
+                            help='Не завершаться, а проверять очередь каждые --interval секунд')
+        parser.add_argument('--interval', type=int, default=30)
+
+    def handle(self, *args, **options):
+        while True:
+            summary = dispatch_reminders(
+                batch_size=options['batch_size'],
+                workers=options['workers'],
+            )
+            if summary['sent'] or summary['retry'] or summary['failed'] or not options['loop']:
+                self.stdout.write(self.style.SUCCESS(
+                    f'Отправлено: {summary["sent"]}, отложено для повтора: {summary["retry"]}, '
+                    f'с ошибкой: {summary["failed"]}'
+                ))
+            if summary['released']:
+                self.stdout.write(self.style.WARNING(
+                    f'  возвращено в очередь зависших: {summary["released"]}'
+                ))
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
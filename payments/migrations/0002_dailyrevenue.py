@@ -0,0 +1,34 @@
+# Generated by Django 4.2 on 2026-10-17 06:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyRevenue',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='Дата')),
+                ('payment_type', models.CharField(choices=[('subscription', 'Оплата абонемента'), ('training', 'Индивидуальная тренировка'), ('locker', 'Аренда шкафчика'), ('other', 'Прочее')], max_length=20, verbose_name='Тип платежа')),
+                ('payment_method', models.CharField(choices=[('cash', 'Наличные'), ('card', 'Банковская карта'), ('transfer', 'Банковский перевод'), ('online', 'Онлайн оплата')], max_length=20, verbose_name='Метод оплаты')),
+                ('status', models.CharField(choices=[('pending', 'Ожидает оплаты'), ('completed', 'Оплачен'), ('cancelled', 'Отменен'), ('refunded', 'Возвращен')], max_length=20, verbose_name='Статус')),
+                ('total', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Сумма')),
+                ('count', models.IntegerField(default=0, verbose_name='Количество')),
+            ],
+            options={
+                'verbose_name': 'Выручка за день',
+                'verbose_name_plural': 'Выручка по дням',
+                'ordering': ['-date'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='dailyrevenue',
+            constraint=models.UniqueConstraint(fields=('date', 'payment_type', 'payment_method', 'status'), name='unique_daily_revenue'),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 4.2 on 2026-10-17 06:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0002_dailyrevenue'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='payment',
+            name='payment_day',
+            field=models.DateField(db_index=True, editable=False, null=True, verbose_name='День оплаты'),
+        ),
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(fields=['status', 'payment_day'], name='payments_pa_status_8f377e_idx'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+from django.db import migrations
+from django.utils import timezone
+
+
+def backfill_payment_day(apps, schema_editor):
+    Payment = apps.get_model('payments', 'Payment')
+    last_id = 0
+    while True:
+        batch = list(
+            Payment.objects.filter(id__gt=last_id)
+            .only('id', 'payment_date')
+            .order_by('id')[:2000]
+        )
+        if not batch:
+            break
+        for payment in batch:
+            payment.payment_day = timezone.localdate(payment.payment_date)
+        Payment.objects.bulk_update(batch, ['payment_day'])
+        last_id = batch[-1].id
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0003_payment_day'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_payment_day, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 4.2 on 2026-10-17 06:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0004_backfill_payment_day'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reminder',
+            name='attempts',
+            field=models.PositiveSmallIntegerField(default=0, verbose_name='Попыток отправки'),
+        ),
+        migrations.AddField(
+            model_name='reminder',
+            name='claimed_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Взято в отправку'),
+        ),
+        migrations.AddField(
+            model_name='reminder',
+            name='next_attempt_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Следующая попытка'),
+        ),
+        migrations.AlterField(
+            model_name='reminder',
+            name='send_status',
+            field=models.CharField(choices=[('pending', 'Ожидает отправки'), ('sending', 'Отправляется'), ('sent', 'Отправлено'), ('failed', 'Ошибка отправки'), ('cancelled', 'Отменено')], default='pending', max_length=20, verbose_name='Статус отправки'),
+        ),
+        migrations.AddIndex(
+            model_name='reminder',
+            index=models.Index(fields=['send_status', 'send_date'], name='payments_re_send_st_c97ab2_idx'),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 4.2 on 2026-10-17 07:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0005_reminder_dispatch'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reminder',
+            name='target_date',
+            field=models.DateField(blank=True, null=True, verbose_name='Дата события'),
+        ),
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(fields=['status', 'period_start'], name='payments_pa_status_a7f1e9_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='reminder',
+            constraint=models.UniqueConstraint(fields=('client', 'reminder_type', 'target_date'), name='unique_reminder_per_event'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 4.2 on 2026-10-17 07:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0006_reminder_target_date'),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name='reminder',
+            name='unique_reminder_per_event',
+        ),
+        migrations.AddConstraint(
+            model_name='reminder',
+            constraint=models.UniqueConstraint(condition=models.Q(('payment__isnull', True)), fields=('client', 'reminder_type', 'target_date'), name='unique_reminder_per_event'),
+        ),
+        migrations.AddConstraint(
+            model_name='reminder',
+            constraint=models.UniqueConstraint(condition=models.Q(('payment__isnull', False)), fields=('payment', 'reminder_type', 'target_date'), name='unique_reminder_per_payment'),
+        ),
+    ]
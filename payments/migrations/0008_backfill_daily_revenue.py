@@ -0,0 +1,37 @@
+from django.db import migrations
+from django.db.models import Count, Sum
+
+
+def backfill_daily_revenue(apps, schema_editor):
+    Payment = apps.get_model('payments', 'Payment')
+    DailyRevenue = apps.get_model('payments', 'DailyRevenue')
+    aggregates = (
+        Payment.objects
+        .values('payment_day', 'payment_type', 'payment_method', 'status')
+        .annotate(total=Sum('amount'), count=Count('id'))
+        .order_by()
+    )
+    DailyRevenue.objects.all().delete()
+    DailyRevenue.objects.bulk_create([
+        DailyRevenue(
+            date=row['payment_day'],
+            payment_type=row['payment_type'],
+            payment_method=row['payment_method'],
+            status=row['status'],
+            total=row['total'] or 0,
+            count=row['count'],
+        )
+        for row in aggregates.iterator()
+        if row['payment_day']
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0007_reminder_per_payment_constraint'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_daily_revenue, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 4.2 on 2026-10-17 07:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0008_backfill_daily_revenue'),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name='reminder',
+            name='unique_reminder_per_event',
+        ),
+        migrations.AddConstraint(
+            model_name='reminder',
+            constraint=models.UniqueConstraint(condition=models.Q(('membership__isnull', True), ('payment__isnull', True)), fields=('client', 'reminder_type', 'target_date'), name='unique_reminder_per_event'),
+        ),
+        migrations.AddConstraint(
+            model_name='reminder',
+            constraint=models.UniqueConstraint(condition=models.Q(('membership__isnull', False), ('payment__isnull', True)), fields=('membership', 'reminder_type', 'target_date'), name='unique_reminder_per_membership'),
+        ),
+    ]
@@ -1,6 +1,7 @@
 from django.db import models
 from django.core.validators import MinValueValidator
 from django.utils import timezone
+from fitness_club.dates import local_day
 import os
 
 def payment_receipt_path(instance, filename):
@@ -75,6 +76,14 @@ class Payment(models.Model):
         default=timezone.now
     )
     
+    # Локальный (Asia/Bishkek) день оплаты, заполняется в save()
+    payment_day = models.DateField(
+        verbose_name='День оплаты',
+        editable=False,
+        db_index=True,
+        null=True
+    )
+    
     payment_type = models.CharField(
         max_length=20,
         verbose_name='Тип платежа',
@@ -136,6 +145,8 @@ class Payment(models.Model):
             models.Index(fields=['client', 'payment_date']),
             models.Index(fields=['status']),
             models.Index(fields=['payment_date']),
+            models.Index(fields=['status', 'payment_day']),
+            models.Index(fields=['status', 'period_start']),
         ]
     
     def __str__(self):
@@ -143,6 +154,11 @@ class Payment(models.Model):
     
     def save(self, *args, **kwargs):
         """Автоматически устанавливаем период действия при сохранении"""
+        self.payment_day = local_day(self.payment_date)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'payment_date' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'payment_day'}
+        
         if not self.period_start and self.membership:
             self.period_start = self.membership.start_date
             self.period_end = self.membership.end_date
@@ -150,20 +166,10 @@ class Payment(models.Model):
         if not self.period_start:
             self.period_start = timezone.now().date()
         
-        if not self.period_end and self.membership_plan:
-            # Рассчитываем дату окончания на основе тарифа
-            from datetime import timedelta
-            
-            if self.membership_plan.period_type == 'days':
-                delta = timedelta(days=self.membership_plan.period_value)
-            elif self.membership_plan.period_type == 'months':
-                delta = timedelta(days=self.membership_plan.period_value * 30)
-            elif self.membership_plan.period_type == 'year':
-                delta = timedelta(days=self.membership_plan.period_value * 365)
-            else:
-                delta = timedelta(days=30)
-            
-            self.period_end = self.period_start + delta
+        if not self.period_end and self.membership_plan_id:
+            # Рассчитываем дату окончания на основе тарифа (тариф - из реестра, без запроса)
+            from subscriptions.plan_cache import plan_for
+            self.period_end = plan_for(self, 'membership_plan').get_end_date(self.period_start)
         
         super().save(*args, **kwargs)
     
@@ -201,6 +207,52 @@ class Payment(models.Model):
             return round(self.amount / self.period_days, 2)
         return self.amount
 
+class DailyRevenue(models.Model):
+    """Сумма и количество платежей за локальный день"""
+
+    date = models.DateField(verbose_name='Дата')
+
+    payment_type = models.CharField(
+        max_length=20,
+        verbose_name='Тип платежа',
+        choices=Payment.PAYMENT_TYPE_CHOICES
+    )
+
+    payment_method = models.CharField(
+        max_length=20,
+        verbose_name='Метод оплаты',
+        choices=Payment.PAYMENT_METHOD_CHOICES
+    )
+
+    status = models.CharField(
+        max_length=20,
+        verbose_name='Статус',
+        choices=Payment.STATUS_CHOICES
+    )
+
+    total = models.DecimalField(
+        max_digits=14,
+        decimal_places=2,
+        verbose_name='Сумма',
+        default=0
+    )
+
+    count = models.IntegerField(verbose_name='Количество', default=0)
+
+    class Meta:
+        verbose_name = 'Выручка за день'
+        verbose_name_plural = 'Выручка по дням'
+        ordering = ['-date']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['date', 'payment_type', 'payment_method', 'status'],
+                name='unique_daily_revenue'
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.date} {self.payment_type}/{self.payment_method} {self.status}: {self.total}'
+
 class Reminder(models.Model):
     """Модель напоминания"""
     
@@ -216,6 +268,7 @@ class Reminder(models.Model):
     # Статусы отправки
     SEND_STATUS_CHOICES = [
         ('pending', 'Ожидает отправки'),
+        ('sending', 'Отправляется'),
         ('sent', 'Отправлено'),
         ('failed', 'Ошибка отправки'),
         ('cancelled', 'Отменено'),
@@ -268,6 +321,14 @@ class Reminder(models.Model):
         verbose_name='Дата отправки'
     )
     
+    # К какой дате относится напоминание (окончание абонемента, день
+    # рождения, срок оплаты); вместе с клиентом и типом исключает дубли
+    target_date = models.DateField(
+        verbose_name='Дата события',
+        blank=True,
+        null=True
+    )
+    
     send_method = models.CharField(
         max_length=20,
         verbose_name='Способ отправки',
@@ -307,6 +368,25 @@ class Reminder(models.Model):
         null=True
     )
     
+    # Повторные попытки (см. payments.dispatch)
+    attempts = models.PositiveSmallIntegerField(
+        verbose_name='Попыток отправки',
+        default=0
+    )
+    
+    next_attempt_at = models.DateTimeField(
+        verbose_name='Следующая попытка',
+        blank=True,
+        null=True
+    )
+    
+    # Когда обработчик взял напоминание в отправку (статус 'sending')
+    claimed_at = models.DateTimeField(
+        verbose_name='Взято в отправку',
+        blank=True,
+        null=True
+    )
+    
     # Автоматические поля
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -319,6 +399,25 @@ class Reminder(models.Model):
             models.Index(fields=['client', 'send_date']),
             models.Index(fields=['send_status']),
             models.Index(fields=['send_date']),
+            models.Index(fields=['send_status', 'send_date']),
+        ]
+        # Одно напоминание на событие: для платежа - на платеж, иначе - на клиента
+        constraints = [
+            models.UniqueConstraint(
+                fields=['client', 'reminder_type', 'target_date'],
+                condition=models.Q(payment__isnull=True, membership__isnull=True),
+                name='unique_reminder_per_event'
+            ),
+            models.UniqueConstraint(
+                fields=['membership', 'reminder_type', 'target_date'],
+                condition=models.Q(payment__isnull=True, membership__isnull=False),
+                name='unique_reminder_per_membership'
+            ),
+            models.UniqueConstraint(
+                fields=['payment', 'reminder_type', 'target_date'],
+                condition=models.Q(payment__isnull=False),
+                name='unique_reminder_per_payment'
+            ),
         ]
     
     def __str__(self):
@@ -0,0 +1,200 @@
+import calendar
+import datetime
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from clients.models import Client, month_day
+from subscriptions.models import Membership
+from .models import Payment, Reminder
+
+REMINDER_BATCH_SIZE = 2000
+
+# За сколько дней напоминать об окончании абонемента и о сроке оплаты
+EXPIRY_REMINDER_DAYS = getattr(settings, 'REMINDER_EXPIRY_DAYS', 7)
+PAYMENT_DUE_REMINDER_DAYS = getattr(settings, 'REMINDER_PAYMENT_DUE_DAYS', 3)
+
+# Поздравления готовим на сегодня и завтра (задача запускается каждый час)
+BIRTHDAY_WINDOW_DAYS = 1
+
+# Во сколько (по местному времени) отправлять напоминания
+SEND_HOUR = 10
+
+MESSAGES = {
+    'subscription_expiry': (
+        'Напоминание об истечении абонемента',
+        '{name}, ваш абонемент «{plan}» истекает {date:%d.%m.%Y}. Продлите его заранее!',
+    ),
+    'birthday': (
+        'С днем рождения!',
+        '{name}, поздравляем вас с днем рождения! Ждем вас в клубе.',
+    ),
+    'payment_due': (
+        'Напоминание об оплате',
+        '{name}, напоминаем об оплате {amount} сом до {date:%d.%m.%Y}.',
+    ),
+}
+
+
+def _send_at(day, now):
+    """Время отправки: SEND_HOUR местного времени в день day, но не раньше now"""
+    moment = timezone.make_aware(datetime.datetime.combine(day, datetime.time(SEND_HOUR)))
+    return max(moment, now)
+
+
+def _birthday_codes(today, days):
+    """ММДД именинников на days дней вперед -> дата дня рождения в этом окне"""
+    codes = {}
+    for offset in range(days + 1):
+        day = today + datetime.timedelta(days=offset)
+        codes[month_day(day)] = day
+        # Родившихся 29 февраля поздравляем 28-го в невисокосный год
+        if day.month == 2 and day.day == 28 and not calendar.isleap(day.year):
+            codes[229] = day
+    return codes
+
+
+def expiry_candidates(today):
+    """Активные непродленные абонементы, истекающие в ближайшие дни"""
+    return Membership.objects.filter(
+        status='active',
+        end_date__gte=today,
+        end_date__lte=today + datetime.timedelta(days=EXPIRY_REMINDER_DAYS),
+        renewal__isnull=True,
+    ).values('id', 'client_id', 'end_date', 'plan__name', 'client__first_name', 'client__email')
+
+
+def birthday_candidates(today):
+    """Активные клиенты, у которых день рождения сегодня или в ближайшие дни"""
+    return Client.objects.filter(
+        status='active',
+        birth_month_day__in=list(_birthday_codes(today, BIRTHDAY_WINDOW_DAYS)),
+    ).values('id', 'first_name', 'email', 'birth_month_day')
+
+
+def payment_due_candidates(today):
+    """Ожидающие оплаты платежи со сроком (началом периода) в ближайшие дни"""
+    return Payment.objects.filter(
+        status='pending',
+        period_start__gte=today,
+        period_start__lte=today + datetime.timedelta(days=PAYMENT_DUE_REMINDER_DAYS),
+    ).values('id', 'client_id', 'membership_id', 'amount', 'period_start',
+             'client__first_name', 'client__email')
+
+
+def _method(email):
+    return 'email' if email else 'sms'
+
+
+def _expiry_reminder(row, now, message):
+    end_date = row['end_date']
+    return Reminder(
+        client_id=row['client_id'],
+        membership_id=row['id'],
+        reminder_type='subscription_expiry',
+        target_date=end_date,
+        send_date=_send_at(end_date - datetime.timedelta(days=EXPIRY_REMINDER_DAYS), now),
+        send_method=_method(row['client__email']),
+        subject=message[0],
+        message=message[1].format(name=row['client__first_name'], plan=row['plan__name'], date=end_date),
+    )
+
+
+def _birthday_reminder(row, now, message, codes):
+    birthday = codes[row['birth_month_day']]
+    return Reminder(
+        client_id=row['id'],
+        reminder_type='birthday',
+        target_date=birthday,
+        send_date=_send_at(birthday, now),
+        send_method=_method(row['email']),
+        subject=message[0],
+        message=message[1].format(name=row['first_name']),
+    )
+
+
+def _payment_due_reminder(row, now, message):
+    due = row['period_start']
+    return Reminder(
+        client_id=row['client_id'],
+        membership_id=row['membership_id'],
+        payment_id=row['id'],
+        reminder_type='payment_due',
+        target_date=due,
+        send_date=_send_at(due - datetime.timedelta(days=PAYMENT_DUE_REMINDER_DAYS), now),
+        send_method=_method(row['client__email']),
+        subject=message[0],
+        message=message[1].format(name=row['client__first_name'], amount=row['amount'], date=due),
+    )
+
+
+def _save_new(reminders, reminder_type, key_field, dry_run):
+    """
+    Сохранить напоминания, которых еще нет: уже созданные отсеиваются одним
+    запросом на пачку по ключу (key_field, target_date), а гонку с
+    параллельным запуском решают уникальные индексы и ignore_conflicts.
+    key_field - 'payment_id' для платежей, 'membership_id' для окончания
+    абонемента (у клиента их может быть несколько с одной датой),
+    'client_id' для поздравлений.
+    """
+    if not reminders:
+        return 0
+    existing = set(
+        Reminder.objects.filter(
+            reminder_type=reminder_type,
+            **{f'{key_field}__in': {getattr(reminder, key_field) for reminder in reminders}},
+            target_date__in={reminder.target_date for reminder in reminders},
+        ).values_list(key_field, 'target_date')
+    )
+    new, keys = [], set()
+    for reminder in reminders:
+        key = (getattr(reminder, key_field), reminder.target_date)
+        if key not in existing and key not in keys:
+            keys.add(key)
+            new.append(reminder)
+    if new and not dry_run:
+        with transaction.atomic():
+            Reminder.objects.bulk_create(new, batch_size=1000, ignore_conflicts=True)
+    return len(new)
+
+
+def _generate(reminder_type, candidates, build, batch_size, dry_run, key_field='client_id'):
+    """Пройти кандидатов пачками по id и создать для них напоминания"""
+    created = 0
+    last_id = 0
+    while True:
+        rows = list(candidates.filter(id__gt=last_id).order_by('id')[:batch_size])
+        if not rows:
+            break
+        last_id = rows[-1]['id']
+        created += _save_new([build(row) for row in rows], reminder_type, key_field, dry_run)
+    return created
+
+
+def generate_reminders(today=None, batch_size=REMINDER_BATCH_SIZE, dry_run=False):
+    """
+    Создает напоминания об окончании абонементов, о сроке оплаты и
+    поздравления с днем рождения. Кандидаты выбираются по индексам
+    (end_date, period_start, birth_month_day), тексты - из MESSAGES.
+    Повторный запуск не создает дублей. Возвращает сводку: число новых по типам.
+    """
+    today = today or timezone.localdate()
+    now = timezone.now()
+    codes = _birthday_codes(today, BIRTHDAY_WINDOW_DAYS)
+    summary = {'today': today}
+
+    summary['subscription_expiry'] = _generate(
+        'subscription_expiry', expiry_candidates(today),
+        lambda row: _expiry_reminder(row, now, MESSAGES['subscription_expiry']),
+        batch_size, dry_run, key_field='membership_id',
+    )
+    summary['payment_due'] = _generate(
+        'payment_due', payment_due_candidates(today),
+        lambda row: _payment_due_reminder(row, now, MESSAGES['payment_due']),
+        batch_size, dry_run, key_field='payment_id',
+    )
+    summary['birthday'] = _generate(
+        'birthday', birthday_candidates(today),
+        lambda row: _birthday_reminder(row, now, MESSAGES['birthday'], codes),
+        batch_size, dry_run,
+    )
+    return summary
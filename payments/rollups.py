@@ -0,0 +1,53 @@
+from django.db import transaction
+from django.db.models import Count, Sum
+from .models import Payment, DailyRevenue
+
+
+def _revenue_rows(payments):
+    """Строки DailyRevenue по выборке платежей"""
+    aggregates = (
+        payments
+        .values('payment_day', 'payment_type', 'payment_method', 'status')
+        .annotate(total=Sum('amount'), count=Count('id'))
+        .order_by()
+    )
+    return [
+        DailyRevenue(
+            date=row['payment_day'],
+            payment_type=row['payment_type'],
+            payment_method=row['payment_method'],
+            status=row['status'],
+            total=row['total'] or 0,
+            count=row['count'],
+        )
+        for row in aggregates.iterator()
+    ]
+
+
+def refresh_revenue_days(days):
+    """Пересчитать DailyRevenue за указанные дни"""
+    days = {day for day in days if day}
+    if not days:
+        return
+    rows = _revenue_rows(Payment.objects.filter(payment_day__in=days))
+    with transaction.atomic():
+        DailyRevenue.objects.filter(date__in=days).delete()
+        DailyRevenue.objects.bulk_create(rows)
+
+
+def rebuild_revenue(first_day=None, last_day=None):
+    """Пересобрать DailyRevenue целиком или за диапазон дат"""
+    payments = Payment.objects.all()
+    stale = DailyRevenue.objects.all()
+    if first_day:
+        payments = payments.filter(payment_day__gte=first_day)
+        stale = stale.filter(date__gte=first_day)
+    if last_day:
+        payments = payments.filter(payment_day__lte=last_day)
+        stale = stale.filter(date__lte=last_day)
+
+    rows = _revenue_rows(payments)
+    with transaction.atomic():
+        stale.delete()
+        DailyRevenue.objects.bulk_create(rows, batch_size=1000)
+    return len(rows)
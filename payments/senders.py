@@ -0,0 +1,217 @@
+import http.client
+import json
+import logging
+import threading
+import time
+from urllib.parse import urlsplit
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+# Канал -> класс отправителя. Канал без своего адреса в
+# REMINDER_HTTP_ENDPOINTS не настроен: напоминание получает постоянную
+# ошибку. Писать такие сообщения в лог можно только явно - REMINDER_LOG_ONLY.
+DEFAULT_SENDERS = {
+    'email': 'payments.senders.EmailSender',
+    'sms': 'payments.senders.HttpSender',
+    'push': 'payments.senders.HttpSender',
+    'whatsapp': 'payments.senders.HttpSender',
+    'telegram': 'payments.senders.HttpSender',
+}
+
+# Сообщений в секунду на канал (ограничения провайдеров)
+DEFAULT_RATE_LIMITS = {
+    'email': 50,
+    'sms': 20,
+    'push': 100,
+    'whatsapp': 20,
+    'telegram': 30,
+}
+
+
+class SendError(Exception):
+    """Ошибка отправки; permanent=True - повторять бессмысленно"""
+
+    def __init__(self, message, permanent=False):
+        super().__init__(message)
+        self.permanent = permanent
+
+
+class BaseSender:
+    """
+    Отправитель одного канала. Экземпляр живет в одном потоке обработчика
+    и переиспользует соединение между сообщениями: оно открывается при
+    первой отправке (и заново после сетевой ошибки), close() - в конце работы.
+    """
+
+    def __init__(self, channel):
+        self.channel = channel
+
+    def open(self):
+        pass
+
+    def close(self):
+        pass
+
+    def send(self, reminder):
+        raise NotImplementedError
+
+
+class LogSender(BaseSender):
+    """Пишет сообщение в лог вместо отправки"""
+
+    def send(self, reminder):
+        logger.info('Напоминание #%s (%s) для клиента %s: %s',
+                    reminder.pk, self.channel, reminder.client_id, reminder.message)
+
+
+class UnconfiguredSender(BaseSender):
+    """Канал без шлюза: напоминание не отправлено и не должно считаться отправленным"""
+
+    def send(self, reminder):
+        raise SendError(f'Канал {self.channel} не настроен (нет шлюза в REMINDER_HTTP_ENDPOINTS)',
+                        permanent=True)
+
+
+class EmailSender(BaseSender):
+    """Email через EMAIL_BACKEND Django с одним SMTP-соединением на поток"""
+
+    connection = None
+
+    def open(self):
+        self.connection = get_connection(fail_silently=False)
+        self.connection.open()
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+    def send(self, reminder):
+        if not reminder.client.email:
+            raise SendError('У клиента не указан email', permanent=True)
+        try:
+            if self.connection is None:
+                self.open()
+            EmailMessage(
+                subject=reminder.subject or reminder.get_reminder_type_display(),
+                body=reminder.message,
+                to=[reminder.client.email],
+                connection=self.connection,
+            ).send()
+        except Exception as exc:
+            # Соединение могло оборваться: следующее сообщение откроет новое
+            self.close()
+            raise SendError(str(exc))
+
+
+class HttpSender(BaseSender):
+    """
+    SMS, WhatsApp, Telegram и push через HTTP-шлюз: POST JSON
+    {"id", "channel", "to", "subject", "text"} на адрес из
+    REMINDER_HTTP_ENDPOINTS[канал]. Соединение keep-alive на поток; если
+    сервер его закрыл, запрос один раз повторяется на новом соединении.
+    Ответ 4xx считается постоянной ошибкой, 5xx и сетевые ошибки - временной.
+    """
+
+    timeout = 10
+    connection = None
+
+    def __init__(self, channel):
+        super().__init__(channel)
+        self.url = urlsplit(getattr(settings, 'REMINDER_HTTP_ENDPOINTS', {})[channel])
+
+    def open(self):
+        connection_class = (
+            http.client.HTTPSConnection if self.url.scheme == 'https' else http.client.HTTPConnection
+        )
+        self.connection = connection_class(self.url.netloc, timeout=self.timeout)
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+    def recipient(self, reminder):
+        if self.channel == 'push':
+            return str(reminder.client_id)
+        return reminder.client.phone
+
+    def _post(self, body):
+        if self.connection is None:
+            self.open()
+        self.connection.request('POST', self.url.path or '/', body=body, headers={
+            'Content-Type': 'application/json; charset=utf-8',
+        })
+        response = self.connection.getresponse()
+        response.read()
+        return response
+
+    def send(self, reminder):
+        body = json.dumps({
+            'id': reminder.pk,
+            'channel': self.channel,
+            'to': self.recipient(reminder),
+            'subject': reminder.subject or '',
+            'text': reminder.message,
+        }, ensure_ascii=False).encode()
+        reused = self.connection is not None
+        try:
+            try:
+                response = self._post(body)
+            except (ConnectionResetError, BrokenPipeError):
+                # Сервер закрыл простаивавшее keep-alive соединение (RemoteDisconnected -
+                # тоже ConnectionResetError): одна попытка на новом, не в счет повторов
+                self.close()
+                if not reused:
+                    raise
+                response = self._post(body)
+        except (OSError, http.client.HTTPException) as exc:
+            self.close()
+            raise SendError(str(exc))
+        if response.status >= 400:
+            raise SendError(f'HTTP {response.status}', permanent=response.status < 500)
+
+
+def get_sender(channel):
+    """
+    Новый отправитель для канала (каждому потоку - свой). Для канала без
+    отправителя или без адреса шлюза - LogSender при REMINDER_LOG_ONLY
+    (разработка), иначе UnconfiguredSender.
+    """
+    senders = {**DEFAULT_SENDERS, **getattr(settings, 'REMINDER_SENDERS', {})}
+    path = senders.get(channel)
+    sender_class = import_string(path) if path else None
+    if sender_class is HttpSender and channel not in getattr(settings, 'REMINDER_HTTP_ENDPOINTS', {}):
+        sender_class = None
+    if sender_class is None:
+        if getattr(settings, 'REMINDER_LOG_ONLY', False):
+            return LogSender(channel)
+        return UnconfiguredSender(channel)
+    return sender_class(channel)
+
+
+class RateLimiter:
+    """Не больше rate сообщений в секунду на все потоки канала"""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate else 0
+        self.lock = threading.Lock()
+        self.next_slot = time.monotonic()
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self.lock:
+            now = time.monotonic()
+            slot = max(self.next_slot, now)
+            self.next_slot = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+def get_rate_limiters():
+    rates = {**DEFAULT_RATE_LIMITS, **getattr(settings, 'REMINDER_RATE_LIMITS', {})}
+    return {channel: RateLimiter(rate) for channel, rate in rates.items()}
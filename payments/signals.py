@@ -0,0 +1,37 @@
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+from clients.summary import refresh_client_summaries
+from .models import Payment
+from .rollups import refresh_revenue_days
+
+
+@receiver(pre_save, sender=Payment)
+def remember_payment_day(sender, instance, **kwargs):
+    """Запоминаем прежние день оплаты и клиента, чтобы пересчитать и их"""
+    instance._previous_payment_day = None
+    instance._previous_client_id = None
+    if instance.pk:
+        previous = (
+            Payment.objects.filter(pk=instance.pk)
+            .values_list('payment_day', 'client_id').first()
+        )
+        if previous:
+            instance._previous_payment_day, instance._previous_client_id = previous
+
+
+@receiver(post_save, sender=Payment)
+@receiver(post_delete, sender=Payment)
+def update_revenue_rollups(sender, instance, **kwargs):
+    refresh_revenue_days({
+        instance.payment_day,
+        getattr(instance, '_previous_payment_day', None),
+    })
+
+
+@receiver(post_save, sender=Payment)
+@receiver(post_delete, sender=Payment)
+def update_client_summary(sender, instance, **kwargs):
+    refresh_client_summaries({
+        instance.client_id,
+        getattr(instance, '_previous_client_id', None),
+    })
@@ -1,3 +1,348 @@
-from django.test import TestCase
+import datetime
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from decimal import Decimal
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from clients.models import Client
+from .dispatch import MAX_ATTEMPTS, dispatch_reminders, retry_delay
+from .models import Payment, Reminder
+from .senders import BaseSender, HttpSender, SendError
 
-# Create your tests here.
+
+class FlakySender(BaseSender):
+    """Отправитель для тестов: ошибка из errors по номеру напоминания"""
+
+    errors = {}
+
+    def send(self, reminder):
+        error = self.errors.get(reminder.pk)
+        if error:
+            raise error
+
+
+class GatewayHandler(BaseHTTPRequestHandler):
+    """HTTP-шлюз для тестов: отвечает и закрывает keep-alive соединение без предупреждения"""
+
+    protocol_version = 'HTTP/1.1'
+    status = 200
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers['Content-Length']))
+        self.server.received.append(json.loads(body))
+        self.send_response(self.status)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+        self.close_connection = self.server.drop_connections
+
+    def log_message(self, *args):
+        pass
+
+
+class GatewayTestCase(TestCase):
+
+    def setUp(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), GatewayHandler)
+        self.server.received = []
+        self.server.drop_connections = True
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        self.member = Client.objects.create(first_name='Иван', last_name='Иванов', phone='+996700000001')
+
+    def sender(self):
+        url = f'http://127.0.0.1:{self.server.server_port}/send'
+        with override_settings(REMINDER_HTTP_ENDPOINTS={'sms': url}):
+            sender = HttpSender('sms')
+        self.addCleanup(sender.close)
+        return sender
+
+    def reminder(self, **fields):
+        fields.setdefault('send_date', timezone.now())
+        return Reminder.objects.create(client=self.member, send_method='sms', message='Тест', **fields)
+
+
+class HttpSenderTests(GatewayTestCase):
+    """Повторное соединение после разрыва keep-alive"""
+
+    def test_reconnects_after_server_closed_connection(self):
+        sender = self.sender()
+        first, second = self.reminder(), self.reminder()
+        sender.send(first)
+        # Сервер закрыл соединение после ответа; второе сообщение уходит по новому
+        sender.send(second)
+        self.assertEqual([row['id'] for row in self.server.received], [first.pk, second.pk])
+        self.assertEqual(self.server.received[1]['to'], self.member.phone)
+
+    def test_client_error_is_permanent(self):
+        self.server.RequestHandlerClass = type('Rejecting', (GatewayHandler,), {'status': 400})
+        with self.assertRaises(SendError) as raised:
+            self.sender().send(self.reminder())
+        self.assertTrue(raised.exception.permanent)
+
+    def test_unreachable_gateway_is_temporary(self):
+        sender = self.sender()
+        self.server.shutdown()
+        self.server.server_close()
+        with self.assertRaises(SendError) as raised:
+            sender.send(self.reminder())
+        self.assertFalse(raised.exception.permanent)
+
+
+@override_settings(REMINDER_SENDERS={'sms': 'payments.tests.FlakySender'})
+class DispatchTests(GatewayTestCase):
+    """Повторы с экспоненциальной задержкой и финальный статус 'failed'"""
+
+    def setUp(self):
+        super().setUp()
+        FlakySender.errors = {}
+        self.addCleanup(setattr, FlakySender, 'errors', {})
+
+    def test_retry_delay_is_exponential_and_capped(self):
+        self.assertEqual(retry_delay(1), datetime.timedelta(minutes=1))
+        self.assertEqual(retry_delay(3), datetime.timedelta(minutes=4))
+        self.assertEqual(retry_delay(20), datetime.timedelta(hours=6))
+
+    def test_temporary_error_is_retried_until_failed(self):
+        reminder = self.reminder()
+        FlakySender.errors[reminder.pk] = SendError('HTTP 503')
+
+        for attempt in range(1, MAX_ATTEMPTS):
+            before = timezone.now()
+            summary = dispatch_reminders(workers=1)
+            self.assertEqual(summary['retry'], 1)
+            reminder.refresh_from_db()
+            self.assertEqual((reminder.send_status, reminder.attempts), ('pending', attempt))
+            self.assertGreaterEqual(reminder.next_attempt_at, before + retry_delay(attempt))
+            # До следующей попытки напоминание не берется
+            self.assertEqual(dispatch_reminders(workers=1)['retry'], 0)
+            Reminder.objects.filter(pk=reminder.pk).update(next_attempt_at=timezone.now())
+
+        summary = dispatch_reminders(workers=1)
+        self.assertEqual(summary['failed'], 1)
+        reminder.refresh_from_db()
+        self.assertEqual((reminder.send_status, reminder.attempts), ('failed', MAX_ATTEMPTS))
+        self.assertEqual(reminder.error_message, 'HTTP 503')
+        self.assertIsNone(reminder.next_attempt_at)
+
+    def test_permanent_error_fails_at_once_and_others_are_sent(self):
+        rejected, delivered = self.reminder(), self.reminder()
+        FlakySender.errors[rejected.pk] = SendError('HTTP 400', permanent=True)
+
+        summary = dispatch_reminders(workers=2)
+
+        self.assertEqual((summary['sent'], summary['failed']), (1, 1))
+        rejected.refresh_from_db()
+        delivered.refresh_from_db()
+        self.assertEqual((rejected.send_status, rejected.attempts), ('failed', 1))
+        self.assertEqual(delivered.send_status, 'sent')
+        self.assertIsNotNone(delivered.sent_at)
+
+
+@override_settings(REMINDER_HTTP_ENDPOINTS={})
+class UnconfiguredChannelTests(GatewayTestCase):
+    """Канал без шлюза не отмечает напоминания отправленными"""
+
+    @override_settings(REMINDER_LOG_ONLY=False)
+    def test_reminder_fails(self):
+        from .dispatch import send_reminder_now
+        queued, manual = self.reminder(), self.reminder()
+
+        summary = dispatch_reminders(workers=1, max_batches=1)
+
+        queued.refresh_from_db()
+        self.assertEqual((queued.send_status, queued.attempts), ('failed', 1))
+        self.assertIn('не настроен', queued.error_message)
+        self.assertEqual(summary['sent'], 0)
+        ok, message = send_reminder_now(manual)
+        self.assertFalse(ok)
+        self.assertIn('не настроен', message)
+
+    @override_settings(REMINDER_LOG_ONLY=True)
+    def test_log_only_for_development(self):
+        reminder = self.reminder()
+        with self.assertLogs('payments.senders', 'INFO'):
+            dispatch_reminders(workers=1)
+        reminder.refresh_from_db()
+        self.assertEqual(reminder.send_status, 'sent')
+
+
+class GenerateRemindersTests(TestCase):
+    """Пакетная генерация напоминаний без дублей"""
+
+    def setUp(self):
+        from subscriptions.models import Membership, MembershipPlan
+        self.today = timezone.localdate()
+        self.member = Client.objects.create(
+            first_name='Иван', last_name='Иванов', phone='+996700000001', email='ivan@example.com',
+            birth_date=datetime.date(1992, self.today.month, self.today.day),
+        )
+        plan = MembershipPlan.objects.create(name='Месяц', price=1500, period_type='months', period_value=1)
+        self.membership = Membership.objects.create(
+            client=self.member, plan=plan, start_date=self.today - datetime.timedelta(days=25),
+            end_date=self.today + datetime.timedelta(days=5),
+        )
+
+    def pending_payment(self, amount):
+        return Payment.objects.create(
+            client=self.member, membership=self.membership, amount=amount, status='pending',
+            period_start=self.today + datetime.timedelta(days=2),
+        )
+
+    def test_payments_with_same_due_date_get_own_reminders(self):
+        from .reminders import generate_reminders
+        first, second = self.pending_payment(1500), self.pending_payment(700)
+
+        summary = generate_reminders(self.today)
+
+        self.assertEqual(
+            (summary['subscription_expiry'], summary['payment_due'], summary['birthday']), (1, 2, 1),
+        )
+        due = Reminder.objects.filter(reminder_type='payment_due')
+        self.assertEqual(set(due.values_list('payment_id', flat=True)), {first.pk, second.pk})
+        self.assertIn('700', due.get(payment=second).message)
+        expiry = Reminder.objects.get(reminder_type='subscription_expiry')
+        self.assertEqual((expiry.target_date, expiry.send_method), (self.membership.end_date, 'email'))
+
+    def test_rerun_creates_nothing(self):
+        from .reminders import generate_reminders
+        self.pending_payment(1500)
+        self.pending_payment(700)
+        generate_reminders(self.today)
+        summary = generate_reminders(self.today)
+        self.assertEqual(
+            (summary['subscription_expiry'], summary['payment_due'], summary['birthday']), (0, 0, 0),
+        )
+        self.assertEqual(Reminder.objects.count(), 4)
+
+    def test_memberships_ending_same_day_get_own_reminders(self):
+        from subscriptions.models import Membership
+        from .reminders import generate_reminders
+        second = Membership.objects.create(
+            client=self.member, plan=self.membership.plan, start_date=self.membership.start_date,
+            end_date=self.membership.end_date,
+        )
+
+        self.assertEqual(generate_reminders(self.today)['subscription_expiry'], 2)
+        self.assertEqual(generate_reminders(self.today)['subscription_expiry'], 0)
+        expiry = Reminder.objects.filter(reminder_type='subscription_expiry')
+        self.assertEqual(set(expiry.values_list('membership_id', flat=True)), {self.membership.pk, second.pk})
+
+    def test_dry_run_writes_nothing(self):
+        from .reminders import generate_reminders
+        self.pending_payment(1500)
+        self.assertEqual(generate_reminders(self.today, dry_run=True)['payment_due'], 1)
+        self.assertFalse(Reminder.objects.exists())
+
+    def test_leap_day_birthday_in_common_year(self):
+        from .reminders import _birthday_codes
+        codes = _birthday_codes(datetime.date(2025, 2, 28), 1)
+        self.assertEqual(codes[229], datetime.date(2025, 2, 28))
+        self.assertEqual(_birthday_codes(datetime.date(2025, 12, 31), 1)[101], datetime.date(2026, 1, 1))
+
+
+class DebtorsTests(TestCase):
+    """Отчет по должникам: группировка по клиенту и постраничный проход"""
+
+    def setUp(self):
+        from subscriptions.models import MembershipPlan
+        self.today = timezone.localdate()
+        self.month = MembershipPlan.objects.create(name='Месяц', price=1000, period_type='months', period_value=1)
+        self.year = MembershipPlan.objects.create(name='Год', price=9000, period_type='year', period_value=1)
+
+    def member(self, number):
+        return Client.objects.create(first_name='Иван', last_name='Иванов', phone=f'+99670000{number:04d}')
+
+    def membership(self, client, plan, ended_days_ago, status='expired'):
+        from subscriptions.models import Membership
+        end_date = self.today - datetime.timedelta(days=ended_days_ago)
+        return Membership.objects.create(
+            client=client, plan=plan, status=status,
+            start_date=end_date - datetime.timedelta(days=30), end_date=end_date,
+        )
+
+    def test_groups_all_overdue_memberships_of_client(self):
+        from .debtors import debtors, debtors_totals
+        twice = self.member(1)
+        self.membership(twice, self.month, 90)
+        self.membership(twice, self.year, 10)
+        once = self.member(2)
+        self.membership(once, self.month, 40)
+        # Старый абонемент истек, но клиент продлился - не должник
+        renewed = self.member(3)
+        self.membership(renewed, self.month, 60)
+        self.membership(renewed, self.month, -20, status='active')
+
+        rows = {row['client_id']: row for row in debtors(self.today)}
+
+        self.assertEqual(set(rows), {twice.pk, once.pk})
+        self.assertEqual(
+            (rows[twice.pk]['overdue_count'], rows[twice.pk]['outstanding'], rows[twice.pk]['oldest_end_date']),
+            (2, 10000, self.today - datetime.timedelta(days=90)),
+        )
+        self.assertEqual((rows[once.pk]['overdue_count'], rows[once.pk]['outstanding']), (1, 1000))
+        self.assertEqual(debtors_totals(self.today), {'clients': 2, 'outstanding': 11000})
+
+    def test_keyset_pages_over_aggregated_rows(self):
+        from fitness_club.pagination import CursorPaginator
+        from .debtors import debtors
+        # Одинаковые самые ранние даты у нескольких клиентов
+        for number, days in enumerate([50, 50, 50, 20, 20, 5], start=1):
+            client = self.member(number)
+            self.membership(client, self.month, days)
+            self.membership(client, self.month, days - 1)
+        ordering = ('oldest_end_date', 'client_id')
+        expected = [row['client_id'] for row in debtors(self.today).order_by(*ordering)]
+        self.assertEqual(len(expected), 6)
+
+        paginator = CursorPaginator(debtors(self.today), ordering, 2)
+        ids, pages, cursor = [], [], None
+        while True:
+            page = paginator.page(cursor)
+            pages.append(page)
+            ids.extend(row['client_id'] for row in page)
+            if not page.has_next:
+                break
+            cursor = page.next_cursor
+        self.assertEqual(ids, expected)
+        self.assertEqual(len(pages), 3)
+        self.assertTrue(all(row['overdue_count'] == 2 for row in pages[1]))
+
+        previous = paginator.page(pages[2].previous_cursor)
+        self.assertEqual([row['client_id'] for row in previous], expected[2:4])
+
+
+class PaymentDayBackfillTests(TransactionTestCase):
+    """Миграция 0004_backfill_payment_day: местный день оплаты для старых платежей"""
+
+    def migrate(self, *targets):
+        executor = MigrationExecutor(connection)
+        executor.migrate(list(targets))
+        return executor.loader.project_state(list(targets)).apps
+
+    def test_backfill_uses_local_day(self):
+        leaves = MigrationExecutor(connection).loader.graph.leaf_nodes()
+        self.addCleanup(lambda: self.migrate(*leaves))
+        apps = self.migrate(
+            ('payments', '0003_payment_day'), *[node for node in leaves if node[0] != 'payments']
+        )
+        HistoricalClient = apps.get_model('clients', 'Client')
+        HistoricalPayment = apps.get_model('payments', 'Payment')
+        member = HistoricalClient.objects.create(first_name='Иван', last_name='Иванов', phone='+996700000001')
+        # 20:00 UTC - уже следующий день в Бишкеке (UTC+6)
+        late = HistoricalPayment.objects.create(
+            client=member, amount=Decimal('1500'),
+            payment_date=datetime.datetime(2025, 1, 1, 20, 0, tzinfo=datetime.timezone.utc),
+        )
+        early = HistoricalPayment.objects.create(
+            client=member, amount=Decimal('700'),
+            payment_date=datetime.datetime(2025, 1, 1, 5, 0, tzinfo=datetime.timezone.utc),
+        )
+
+        self.migrate(*leaves)
+
+        self.assertEqual(Payment.objects.get(pk=late.pk).payment_day, datetime.date(2025, 1, 2))
+        self.assertEqual(Payment.objects.get(pk=early.pk).payment_day, datetime.date(2025, 1, 1))
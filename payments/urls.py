@@ -11,6 +11,8 @@ urlpatterns = [
     path('<int:pk>/delete/', views.payment_delete, name='payment_delete'),
     path('statistics/', views.payment_statistics, name='payment_statistics'),
     path('export/excel/', views.export_payments_excel, name='export_payments_excel'),
+    path('export/csv/', views.export_payments_data, {'fmt': 'csv'}, name='export_payments_csv'),
+    path('export/ndjson/', views.export_payments_data, {'fmt': 'ndjson'}, name='export_payments_ndjson'),
     
     # Напоминания
     path('reminders/', views.reminder_list, name='reminder_list'),
@@ -19,4 +21,6 @@ urlpatterns = [
     
     # Должники
     path('debtors/', views.debtors_list, name='debtors_list'),
+    path('debtors/export/csv/', views.export_debtors_data, {'fmt': 'csv'}, name='export_debtors_csv'),
+    path('debtors/export/ndjson/', views.export_debtors_data, {'fmt': 'ndjson'}, name='export_debtors_ndjson'),
 ]
\ No newline at end of file
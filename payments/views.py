@@ -1,64 +1,70 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.core.paginator import Paginator
-from django.db.models import Q, Sum
+from django.db.models import Q, Sum, Count
+from django.db.models.functions import TruncMonth
 from django.utils import timezone
-import datetime
-from .models import Payment, Reminder
+from .models import Payment, Reminder, DailyRevenue
 from .forms import PaymentForm, PaymentSearchForm, ReminderForm
 from clients.models import Client
+from clients.search import filter_by_search
+from fitness_club.pagination import paginate
+from fitness_club.exports import stream_export
 from subscriptions.models import Membership
 
+def filter_payments(payments, form):
+    """Применить фильтры PaymentSearchForm к выборке платежей"""
+    if not form.is_valid():
+        return payments
+    
+    search = form.cleaned_data.get('search')
+    status = form.cleaned_data.get('status')
+    payment_type = form.cleaned_data.get('payment_type')
+    start_date = form.cleaned_data.get('start_date')
+    end_date = form.cleaned_data.get('end_date')
+    
+    if search:
+        payments = filter_by_search(payments, search, 'client_id')
+    
+    if status:
+        payments = payments.filter(status=status)
+    
+    if payment_type:
+        payments = payments.filter(payment_type=payment_type)
+    
+    if start_date:
+        payments = payments.filter(payment_day__gte=start_date)
+    
+    if end_date:
+        payments = payments.filter(payment_day__lte=end_date)
+    
+    return payments
+
 @login_required
 def payment_list(request):
     """Список всех платежей"""
     form = PaymentSearchForm(request.GET or None)
-    payments = Payment.objects.all().select_related('client', 'membership', 'membership_plan').order_by('-payment_date')
-    
-   
-    if form.is_valid():
-        search = form.cleaned_data.get('search')
-        status = form.cleaned_data.get('status')
-        payment_type = form.cleaned_data.get('payment_type')
-        start_date = form.cleaned_data.get('start_date')
-        end_date = form.cleaned_data.get('end_date')
-        
-        if search:
-            payments = payments.filter(
-                Q(client__first_name__icontains=search) |
-                Q(client__last_name__icontains=search) |
-                Q(client__phone__icontains=search)
-            )
-        
-        if status:
-            payments = payments.filter(status=status)
-        
-        if payment_type:
-            payments = payments.filter(payment_type=payment_type)
-        
-        if start_date:
-            payments = payments.filter(payment_date__date__gte=start_date)
-        
-        if end_date:
-            payments = payments.filter(payment_date__date__lte=end_date)
+    payments = filter_payments(
+        Payment.objects.all().select_related('client', 'membership', 'membership_plan'),
+        form
+    )
     
 
-    total_amount = payments.filter(status='completed').aggregate(total=Sum('amount'))['total'] or 0
-    total_count = payments.count()
-    completed_count = payments.filter(status='completed').count()
+    totals = payments.aggregate(
+        total_amount=Sum('amount', filter=Q(status='completed')),
+        total_count=Count('id'),
+        completed_count=Count('id', filter=Q(status='completed')),
+    )
     
 
-    paginator = Paginator(payments, 15)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    page_obj = paginate(request, payments, ('-payment_date', '-id'), 15)
     
     context = {
         'page_obj': page_obj,
         'form': form,
-        'total_amount': total_amount,
-        'total_count': total_count,
-        'completed_count': completed_count,
+        'total_amount': totals['total_amount'] or 0,
+        'total_count': totals['total_count'],
+        'completed_count': totals['completed_count'],
     }
     return render(request, 'payments/payment_list.html', context)
 
@@ -81,21 +87,7 @@ def payment_create(request):
             payment = form.save()
             messages.success(request, f'Платеж на сумму {payment.amount} руб. создан!')
             
-            if payment.status == 'completed' and payment.membership:
-
-                reminder_date = payment.period_end - datetime.timedelta(days=7)
-                if reminder_date > timezone.now().date():
-                    Reminder.objects.create(
-                        client=payment.client,
-                        membership=payment.membership,
-                        payment=payment,
-                        reminder_type='subscription_expiry',
-                        send_date=reminder_date,
-                        send_method='email',
-                        subject=f'Напоминание об истечении абонемента',
-                        message=f'Уважаемый {payment.client.get_full_name()}, ваш абонемент истекает {payment.period_end}.'
-                    )
-            
+            # Напоминание об окончании абонемента создаст generate_reminders
             return redirect('payment_detail', pk=payment.pk)
     else:
         form = PaymentForm()
@@ -140,55 +132,50 @@ def payment_delete(request, pk):
 @login_required
 def payment_statistics(request):
     """Статистика по платежам"""
-    today = timezone.now().date()
+    today = timezone.localdate()
     
-    total_payments = Payment.objects.filter(status='completed').aggregate(total=Sum('amount'))['total'] or 0
-    total_count = Payment.objects.count()
+    revenue = DailyRevenue.objects.all()
+    completed = revenue.filter(status='completed')
+    
+    totals = revenue.aggregate(
+        total_payments=Sum('total', filter=Q(status='completed')),
+        total_count=Sum('count'),
+        today_payments=Sum('total', filter=Q(status='completed', date=today)),
+        month_payments=Sum('total', filter=Q(status='completed', date__gte=today.replace(day=1))),
+    )
     
 
-    from django.db.models.functions import TruncMonth
-    monthly_stats = Payment.objects.filter(status='completed').annotate(
-        month=TruncMonth('payment_date')
+    monthly_stats = completed.annotate(
+        month=TruncMonth('date')
     ).values('month').annotate(
-        total=Sum('amount'),
-        count=models.Count('id')
+        total=Sum('total'),
+        count=Sum('count')
     ).order_by('-month')[:12]
     
 
-    type_stats = Payment.objects.filter(status='completed').values(
+    type_stats = completed.values(
         'payment_type'
     ).annotate(
-        total=Sum('amount'),
-        count=models.Count('id')
+        total=Sum('total'),
+        count=Sum('count')
     ).order_by('-total')
     
 
-    method_stats = Payment.objects.filter(status='completed').values(
+    method_stats = completed.values(
         'payment_method'
     ).annotate(
-        total=Sum('amount'),
-        count=models.Count('id')
+        total=Sum('total'),
+        count=Sum('count')
     ).order_by('-total')
     
-    today_payments = Payment.objects.filter(
-        status='completed',
-        payment_date__date=today
-    ).aggregate(total=Sum('amount'))['total'] or 0
-    
-    month_start = today.replace(day=1)
-    month_payments = Payment.objects.filter(
-        status='completed',
-        payment_date__date__gte=month_start
-    ).aggregate(total=Sum('amount'))['total'] or 0
-    
     context = {
-        'total_payments': total_payments,
-        'total_count': total_count,
+        'total_payments': totals['total_payments'] or 0,
+        'total_count': totals['total_count'] or 0,
         'monthly_stats': monthly_stats,
         'type_stats': type_stats,
         'method_stats': method_stats,
-        'today_payments': today_payments,
-        'month_payments': month_payments,
+        'today_payments': totals['today_payments'] or 0,
+        'month_payments': totals['month_payments'] or 0,
         'today': today,
     }
     return render(request, 'payments/payment_statistics.html', context)
@@ -231,44 +218,44 @@ def reminder_create(request):
 @login_required
 def reminder_send_now(request, pk):
     """Отправка напоминания сейчас"""
+    from .dispatch import send_reminder_now
     reminder = get_object_or_404(Reminder, pk=pk)
     
-    reminder.mark_as_sent()
-    messages.success(request, 'Напоминание отправлено!')
+    ok, message = send_reminder_now(reminder)
+    if ok:
+        messages.success(request, 'Напоминание отправлено!')
+    else:
+        messages.error(request, message)
     
     return redirect('reminder_list')
 
 @login_required
 def debtors_list(request):
     """Список должников"""
-
-    today = timezone.now().date()
-    expired_memberships = Membership.objects.filter(
-        status='active',
-        end_date__lt=today
-    ).select_related('client')
+    from .debtors import debtors, debtors_totals
     
-
-    debtors = {}
-    for membership in expired_memberships:
-        client = membership.client
-        if client not in debtors:
-            debtors[client] = []
-        debtors[client].append(membership)
-    
- 
-    sorted_debtors = sorted(
-        debtors.items(),
-        key=lambda x: max((today - m.end_date).days for m in x[1]),
-        reverse=True
-    )
+    today = timezone.localdate()
+    # Должник - клиент, последний абонемент которого истек и не продлен.
+    # Группировка и суммы считаются в базе, страница выбирается по ключу
+    page_obj = paginate(request, debtors(today), ('oldest_end_date', 'client_id'), 25)
+    for row in page_obj:
+        row['days_overdue'] = (today - row['oldest_end_date']).days
     
     context = {
-        'debtors': sorted_debtors,
+        'page_obj': page_obj,
+        'totals': debtors_totals(today),
         'today': today,
     }
     return render(request, 'payments/debtors_list.html', context)
 
+@login_required
+def export_debtors_data(request, fmt):
+    """Потоковая выгрузка отчета по должникам в CSV/NDJSON"""
+    from .debtors import DEBTOR_COLUMNS, debtors
+    
+    rows = debtors().order_by('oldest_end_date', 'client_id')
+    return stream_export(rows, DEBTOR_COLUMNS, fmt, 'debtors')
+
 @login_required
 def create_subscription_payment(request, membership_id):
     """Быстрое создание платежа за абонемент"""
@@ -280,8 +267,8 @@ def create_subscription_payment(request, membership_id):
             payment = form.save(commit=False)
             payment.client = membership.client
             payment.membership = membership
-            payment.membership_plan = membership.plan
-            payment.amount = membership.plan.price
+            payment.membership_plan = membership.get_plan()
+            payment.amount = membership.get_plan().price
             payment.payment_type = 'subscription'
             payment.save()
             
@@ -292,8 +279,8 @@ def create_subscription_payment(request, membership_id):
         initial_data = {
             'client': membership.client,
             'membership': membership,
-            'membership_plan': membership.plan,
-            'amount': membership.plan.price,
+            'membership_plan': membership.get_plan(),
+            'amount': membership.get_plan().price,
             'payment_type': 'subscription',
             'payment_date': timezone.now(),
             'period_start': membership.start_date,
@@ -309,37 +296,60 @@ def create_subscription_payment(request, membership_id):
 
 @login_required
 def export_payments_excel(request):
-    """Экспорт платежей в Excel"""
-    from django.http import HttpResponse
-    import io
+    """Экспорт платежей в Excel (с учетом фильтров списка)"""
+    import tempfile
+    from django.http import FileResponse
     from openpyxl import Workbook
     
-    # Создаем Excel
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Платежи"
-    
-    # Заголовки
-    headers = ['ID', 'Дата', 'Клиент', 'Сумма', 'Тип', 'Метод', 'Статус']
-    for col_num, header in enumerate(headers, 1):
-        ws.cell(row=1, column=col_num, value=header)
-    
-    # Данные
-    payments = Payment.objects.all().select_related('client')
-    for row_num, payment in enumerate(payments, 2):
-        ws.cell(row=row_num, column=1, value=payment.id)
-        ws.cell(row=row_num, column=2, value=payment.payment_date.strftime("%d.%m.%Y %H:%M"))
-        ws.cell(row=row_num, column=3, value=payment.client.get_full_name())
-        ws.cell(row=row_num, column=4, value=float(payment.amount))
-        ws.cell(row=row_num, column=5, value=payment.get_payment_type_display_name())
-        ws.cell(row=row_num, column=6, value=payment.get_payment_method_display_name())
-        ws.cell(row=row_num, column=7, value=payment.get_status_display_name())
-    
-    # Сохраняем
-    buffer = io.BytesIO()
-    wb.save(buffer)
-    
-    buffer.seek(0)
-    response = HttpResponse(buffer, content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
-    response['Content-Disposition'] = 'attachment; filename="payments.xlsx"'
-    return response
\ No newline at end of file
+    form = PaymentSearchForm(request.GET or None)
+    payments = filter_payments(Payment.objects.all(), form).order_by('-payment_date', '-id')
+    rows = payments.values_list(
+        'id', 'payment_date', 'client__last_name', 'client__first_name',
+        'client__middle_name', 'amount', 'payment_type', 'payment_method', 'status',
+    )
+    
+    payment_types = dict(Payment.PAYMENT_TYPE_CHOICES)
+    payment_methods = dict(Payment.PAYMENT_METHOD_CHOICES)
+    statuses = dict(Payment.STATUS_CHOICES)
+    
+    # write_only: строки сразу уходят во временный XML, а не копятся в памяти
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Платежи")
+    ws.append(['ID', 'Дата', 'Клиент', 'Сумма', 'Тип', 'Метод', 'Статус'])
+    
+    for (payment_id, payment_date, last_name, first_name, middle_name,
+         amount, payment_type, payment_method, status) in rows.iterator(chunk_size=2000):
+        ws.append([
+            payment_id,
+            timezone.localtime(payment_date).strftime("%d.%m.%Y %H:%M"),
+            ' '.join(part for part in (last_name, first_name, middle_name) if part),
+            float(amount),
+            payment_types.get(payment_type, 'Неизвестно'),
+            payment_methods.get(payment_method, 'Неизвестно'),
+            statuses.get(status, 'Неизвестно'),
+        ])
+    
+    # Файл собирается на диске и отдается по частям
+    output = tempfile.TemporaryFile()
+    wb.save(output)
+    output.seek(0)
+    return FileResponse(
+        output,
+        as_attachment=True,
+        filename='payments.xlsx',
+        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+    )
+
+# Колонки машиночитаемой выгрузки платежей
+PAYMENT_EXPORT_COLUMNS = [
+    'id', 'payment_date', 'payment_day', 'client_id', 'client__last_name',
+    'client__first_name', 'client__phone', 'membership_id', 'membership_plan_id',
+    'amount', 'payment_type', 'payment_method', 'status', 'period_start', 'period_end',
+]
+
+@login_required
+def export_payments_data(request, fmt):
+    """Потоковая выгрузка платежей в CSV/NDJSON (с учетом фильтров списка)"""
+    form = PaymentSearchForm(request.GET or None)
+    payments = filter_payments(Payment.objects.all(), form).order_by('id')
+    return stream_export(payments, PAYMENT_EXPORT_COLUMNS, fmt, 'payments')
\ No newline at end of file
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import MembershipPlan, Membership
+from .models import MembershipPlan, Membership, FreezePeriod
 
 @admin.register(MembershipPlan)
 class MembershipPlanAdmin(admin.ModelAdmin):
@@ -29,12 +29,19 @@ class MembershipPlanAdmin(admin.ModelAdmin):
         }),
     )
 
+class FreezePeriodInline(admin.TabularInline):
+    model = FreezePeriod
+    extra = 0
+    fields = ('start_date', 'frozen_until', 'unfrozen_on', 'days')
+    readonly_fields = ('unfrozen_on', 'days')
+
 @admin.register(Membership)
 class MembershipAdmin(admin.ModelAdmin):
     list_display = ('client', 'plan', 'start_date', 'end_date', 'status', 'remaining_visits')
     list_filter = ('status', 'plan', 'start_date')
     search_fields = ('client__first_name', 'client__last_name', 'client__phone')
     readonly_fields = ('created_at', 'updated_at')
+    inlines = [FreezePeriodInline]
     fieldsets = (
         ('Основная информация', {
             'fields': ('client', 'plan')
@@ -3,4 +3,7 @@ from django.apps import AppConfig
 class SubscriptionsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'subscriptions'
-    verbose_name = 'Абонементы'
\ No newline at end of file
+    verbose_name = 'Абонементы'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,62 @@
+from collections import namedtuple
+from django.db.models import Q
+from django.utils import timezone
+from clients.models import Client
+from clients.search import normalize_phone
+from .models import Membership
+from .visits import register_visit
+
+CheckInResult = namedtuple('CheckInResult', ['ok', 'client', 'membership', 'remaining', 'reason'])
+
+
+def current_memberships(identifier, today):
+    """
+    Действующие абонементы клиента по телефону или номеру карты -
+    один запрос: подзапрос по уникальным индексам phone/card_number
+    и индекс (client, status) у абонементов.
+    """
+    identifier = identifier.strip()
+    clients = Client.objects.filter(
+        Q(phone=normalize_phone(identifier)) | Q(card_number=identifier)
+    ).values('id')
+    return list(
+        Membership.objects.filter(
+            Q(end_date__isnull=True) | Q(end_date__gte=today),
+            client_id__in=clients,
+            status='active',
+            start_date__lte=today,
+        ).select_related('client', 'plan').order_by('end_date', 'id')
+    )
+
+
+def check_in(identifier, moment=None):
+    """
+    Вход на ресепшене/турникете по телефону или карте: находит клиента и
+    подходящий абонемент (с учетом времени доступа по тарифу), списывает
+    посещение и записывает его в журнал в одной транзакции.
+    """
+    moment = moment or timezone.now()
+    today = timezone.localdate(moment)
+    if not identifier or not identifier.strip():
+        return CheckInResult(False, None, None, None, 'client_not_found')
+
+    memberships = current_memberships(identifier, today)
+    if not memberships:
+        # Дополнительный запрос только при отказе: уточняем причину
+        exists = Client.objects.filter(
+            Q(phone=normalize_phone(identifier)) | Q(card_number=identifier.strip())
+        ).first()
+        reason = 'no_membership' if exists else 'client_not_found'
+        return CheckInResult(False, exists, None, None, reason)
+
+    client = memberships[0].client
+    with_visits = [m for m in memberships if m.remaining_visits is None or m.remaining_visits > 0]
+    allowed = [m for m in with_visits if m.plan.is_access_allowed(moment)]
+    if not allowed:
+        reason = 'access_time' if with_visits else 'no_visits'
+        return CheckInResult(False, client, memberships[0], None, reason)
+
+    # Из подходящих берем тот, что заканчивается раньше
+    membership = allowed[0]
+    result = register_visit(membership.pk, today, buffered=False)
+    return CheckInResult(result.ok, client, membership, result.remaining, result.reason)
@@ -0,0 +1,52 @@
+import datetime
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Q
+from django.utils import timezone
+
+MEMBERSHIP_COUNTS_CACHE_KEY = 'memberships:counts'
+# Сбрасывается сигналами; рассчитано на общий кэш из settings.CACHES
+MEMBERSHIP_COUNTS_CACHE_TIMEOUT = getattr(settings, 'MEMBERSHIP_COUNTS_CACHE_TIMEOUT', 300)
+
+# Сколько дней до окончания считается «скоро истекает»
+EXPIRING_SOON_DAYS = 7
+
+
+def count_memberships(memberships, today=None):
+    """
+    Счетчики боковой панели списка абонементов одним запросом
+    (условная агрегация по уже отфильтрованной выборке).
+    """
+    today = today or timezone.localdate()
+    week_later = today + datetime.timedelta(days=EXPIRING_SOON_DAYS)
+    return memberships.order_by().aggregate(
+        total=Count('id'),
+        active=Count('id', filter=Q(status='active')),
+        expiring_soon=Count('id', filter=Q(
+            status='active',
+            end_date__range=[today, week_later],
+        )),
+        expired=Count('id', filter=Q(status='expired')),
+    )
+
+
+def get_membership_counts(memberships, filtered, today=None):
+    """
+    Счетчики для списка абонементов. Без фильтров результат берется из кэша
+    (сбрасывается при изменении абонементов), с фильтрами считается заново.
+    """
+    today = today or timezone.localdate()
+    if filtered:
+        return count_memberships(memberships, today)
+
+    counts = cache.get(MEMBERSHIP_COUNTS_CACHE_KEY)
+    if counts is None or counts['today'] != today:
+        counts = count_memberships(memberships, today)
+        counts['today'] = today
+        cache.set(MEMBERSHIP_COUNTS_CACHE_KEY, counts, MEMBERSHIP_COUNTS_CACHE_TIMEOUT)
+    return counts
+
+
+def invalidate_membership_counts():
+    """Сбросить кэш счетчиков списка абонементов"""
+    cache.delete(MEMBERSHIP_COUNTS_CACHE_KEY)
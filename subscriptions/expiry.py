@@ -0,0 +1,59 @@
+from collections import Counter
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from .models import Membership
+from .rollups import memberships_changed
+
+EXPIRY_BATCH_SIZE = 1000
+
+
+def overdue_memberships(today=None):
+    """Активные абонементы, срок или посещения которых закончились"""
+    today = today or timezone.localdate()
+    return Membership.objects.filter(status='active').filter(
+        Q(end_date__lt=today) | Q(remaining_visits__lte=0)
+    )
+
+
+def expire_memberships(today=None, batch_size=EXPIRY_BATCH_SIZE, dry_run=False):
+    """
+    Переводит просроченные активные абонементы в статус 'expired'.
+
+    Работает пачками по batch_size: одна выборка id и один UPDATE на пачку,
+    каждая пачка в своей транзакции. UPDATE повторно проверяет статус,
+    поэтому повторный или параллельный запуск ничего не ломает.
+    Возвращает сводку: сколько абонементов истекло, по причинам и тарифам.
+    """
+    today = today or timezone.localdate()
+    overdue = overdue_memberships(today)
+    summary = {'expired': 0, 'by_reason': Counter(), 'by_plan': Counter(), 'today': today}
+    last_id = 0
+
+    while True:
+        batch = list(
+            overdue.filter(id__gt=last_id)
+            .order_by('id')
+            .values_list('id', 'start_date', 'end_date', 'plan__name', 'client_id')[:batch_size]
+        )
+        if not batch:
+            break
+        last_id = batch[-1][0]
+        ids = [row[0] for row in batch]
+
+        if dry_run:
+            updated = len(ids)
+        else:
+            with transaction.atomic():
+                updated = Membership.objects.filter(id__in=ids, status='active').update(
+                    status='expired', updated_at=timezone.now()
+                )
+                memberships_changed({row[1] for row in batch}, {row[4] for row in batch})
+
+        summary['expired'] += updated
+        for _id, _start_date, end_date, plan_name, _client_id in batch:
+            reason = 'date' if end_date and end_date < today else 'visits'
+            summary['by_reason'][reason] += 1
+            summary['by_plan'][plan_name] += 1
+
+    return summary
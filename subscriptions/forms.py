@@ -1,6 +1,52 @@
 from django import forms
 from django.core.validators import MinValueValidator
+from fitness_club.widgets import AutocompleteSelect
 from .models import MembershipPlan, Membership
+from .plan_cache import plan_registry
+
+
+class PlanChoiceIterator:
+    """Варианты активных тарифов из реестра; читаются только при отрисовке"""
+
+    def __init__(self, field):
+        self.field = field
+
+    def __iter__(self):
+        if self.field.empty_label is not None:
+            yield ('', self.field.empty_label)
+        for plan in plan_registry.active():
+            yield (plan.pk, self.field.label_from_instance(plan))
+
+    def __len__(self):
+        return len(plan_registry.active()) + (self.field.empty_label is not None)
+
+
+class PlanChoiceField(forms.ModelChoiceField):
+    """Выбор активного тарифа без запросов к базе (варианты и проверка - по реестру)"""
+
+    def __init__(self, **kwargs):
+        kwargs.setdefault('label', 'Тарифный план')
+        super().__init__(MembershipPlan.objects.filter(is_active=True), **kwargs)
+
+    def _get_choices(self):
+        return PlanChoiceIterator(self)
+
+    choices = property(_get_choices, forms.ChoiceField._set_choices)
+
+    def to_python(self, value):
+        if value in self.empty_values:
+            return None
+        try:
+            plan = plan_registry.get(int(value))
+        except (TypeError, ValueError):
+            plan = None
+        if plan is None or not plan.is_active:
+            raise forms.ValidationError(
+                self.error_messages['invalid_choice'],
+                code='invalid_choice',
+                params={'value': value},
+            )
+        return plan
 
 class MembershipPlanForm(forms.ModelForm):
     class Meta:
@@ -51,6 +97,8 @@ class MembershipPlanForm(forms.ModelForm):
         return visit_limit
 
 class MembershipForm(forms.ModelForm):
+    plan = PlanChoiceField(widget=forms.Select(attrs={'class': 'form-control'}))
+    
     class Meta:
         model = Membership
         fields = [
@@ -58,8 +106,7 @@ class MembershipForm(forms.ModelForm):
             'auto_renewal', 'notes'
         ]
         widgets = {
-            'client': forms.Select(attrs={'class': 'form-control'}),
-            'plan': forms.Select(attrs={'class': 'form-control'}),
+            'client': AutocompleteSelect('client_autocomplete', attrs={'class': 'form-control'}),
             'start_date': forms.DateInput(attrs={
                 'class': 'form-control',
                 'type': 'date'
@@ -77,8 +124,6 @@ class MembershipForm(forms.ModelForm):
         # Показываем только активных клиентов
         from clients.models import Client
         self.fields['client'].queryset = Client.objects.filter(status='active')
-        # Показываем только активные тарифы
-        self.fields['plan'].queryset = MembershipPlan.objects.filter(is_active=True)
 
 class MembershipUpdateForm(forms.ModelForm):
     class Meta:
@@ -100,6 +145,18 @@ class MembershipUpdateForm(forms.ModelForm):
                 'rows': 3
             }),
         }
+    
+    def clean(self):
+        cleaned_data = super().clean()
+        # Заморозка и разморозка идут через историю заморозок, а не правкой полей
+        was_frozen = self.instance.status == 'frozen'
+        if (cleaned_data.get('status') == 'frozen') != was_frozen or (
+            was_frozen and cleaned_data.get('frozen_until') != self.instance.frozen_until
+        ):
+            self.add_error(
+                'status', 'Для заморозки и разморозки используйте кнопки на странице абонемента'
+            )
+        return cleaned_data
 
 class MembershipSearchForm(forms.Form):
     """Форма поиска абонементов"""
@@ -0,0 +1,196 @@
+import datetime
+from collections import defaultdict
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import F, Sum
+from django.utils import timezone
+from .models import Membership, FreezePeriod
+from .rollups import memberships_changed
+
+UNFREEZE_BATCH_SIZE = 1000
+
+
+def used_freeze_days(membership, exclude_open=False):
+    """Сколько дней заморозки абонемент уже использовал (по истории)"""
+    periods = membership.freeze_periods.all()
+    if exclude_open:
+        periods = periods.filter(unfrozen_on__isnull=False)
+    return sum(period.planned_days() for period in periods)
+
+
+def granted_freeze_days(memberships):
+    """{id абонемента: дней, добавленных к сроку закрытыми заморозками} для пересчета сроков"""
+    return dict(
+        FreezePeriod.objects.filter(membership__in=memberships, unfrozen_on__isnull=False, days__gt=0)
+        .values('membership_id').annotate(total=Sum('days')).order_by()
+        .values_list('membership_id', 'total')
+    )
+
+
+def validate_freeze(membership, until_date, today=None):
+    """Проверка заморозки по тарифу и лимиту дней; ошибки - ValidationError"""
+    today = today or timezone.localdate()
+    plan = membership.get_plan()
+    if not plan.can_freeze:
+        raise ValidationError('Тариф не поддерживает заморозку')
+    if membership.status != 'active':
+        raise ValidationError('Заморозить можно только активный абонемент')
+    if until_date <= today:
+        raise ValidationError('Дата окончания заморозки должна быть позже сегодняшней')
+
+    if plan.max_freeze_days:
+        left = plan.max_freeze_days - used_freeze_days(membership)
+        if (until_date - today).days > left:
+            raise ValidationError(
+                f'Превышен лимит заморозки: осталось {max(left, 0)} из {plan.max_freeze_days} дней'
+            )
+
+
+def freeze_membership(membership, until_date, today=None):
+    """Заморозить абонемент до until_date с записью в историю"""
+    today = today or timezone.localdate()
+    validate_freeze(membership, until_date, today)
+    with transaction.atomic():
+        FreezePeriod.objects.create(
+            membership=membership,
+            start_date=today,
+            frozen_until=until_date,
+        )
+        membership.status = 'frozen'
+        membership.frozen_until = until_date
+        membership.save()
+    return membership
+
+
+def _granted_days(planned, used, plan):
+    """Сколько дней заморозки добавить к сроку с учетом лимита тарифа"""
+    if plan.max_freeze_days:
+        return max(min(planned, plan.max_freeze_days - used), 0)
+    return planned
+
+
+def unfreeze_membership(membership, today=None):
+    """
+    Разморозить абонемент сегодня: срок продлевается на фактические
+    дни заморозки (но не больше лимита тарифа).
+    """
+    today = today or timezone.localdate()
+    with transaction.atomic():
+        period = membership.freeze_periods.filter(unfrozen_on__isnull=True).order_by('-start_date').first()
+        days = 0
+        if period:
+            planned = max((min(today, period.frozen_until) - period.start_date).days, 0)
+            days = _granted_days(planned, used_freeze_days(membership, exclude_open=True), membership.get_plan())
+            period.unfrozen_on = today
+            period.days = days
+            period.save(update_fields=['unfrozen_on', 'days'])
+
+        if days and membership.end_date:
+            membership.end_date += datetime.timedelta(days=days)
+        membership.status = 'active'
+        membership.frozen_until = None
+        membership.save()
+    return days
+
+
+def due_for_unfreeze(today=None):
+    """Замороженные абонементы, срок заморозки которых наступил"""
+    today = today or timezone.localdate()
+    return Membership.objects.filter(status='frozen', frozen_until__lte=today)
+
+
+def _unfreeze_batch(batch, now):
+    """
+    Закрыть заморозки пачки и продлить абонементы.
+
+    Абонементы группируются по числу добавляемых дней, и каждая группа
+    продлевается одним UPDATE end_date = end_date + N дней.
+    """
+    # Абонементы, которые успели разморозить вручную, пропускаем
+    still_frozen = set(
+        Membership.objects.select_for_update()
+        .filter(id__in=[membership.pk for membership in batch], status='frozen')
+        .values_list('id', flat=True)
+    )
+    batch = [membership for membership in batch if membership.pk in still_frozen]
+    membership_ids = [membership.pk for membership in batch]
+    open_periods = {}
+    for period in (FreezePeriod.objects.select_for_update()
+                   .filter(membership_id__in=membership_ids, unfrozen_on__isnull=True)
+                   .order_by('start_date')):
+        open_periods[period.membership_id] = period
+    closed_days = defaultdict(int)
+    for membership_id, days in (FreezePeriod.objects
+                                .filter(membership_id__in=membership_ids, unfrozen_on__isnull=False)
+                                .values_list('membership_id', 'days')):
+        closed_days[membership_id] += days or 0
+
+    by_days = defaultdict(list)
+    new_periods = []
+    summary = {'unfrozen': 0, 'days': 0, 'capped': 0}
+    for membership in batch:
+        period = open_periods.get(membership.pk)
+        if period is None:
+            # Заморозка до появления истории: начало неизвестно, берем дату
+            # последнего изменения абонемента (обычно это и есть заморозка)
+            period = FreezePeriod(
+                membership=membership,
+                start_date=min(timezone.localdate(membership.updated_at), membership.frozen_until),
+                frozen_until=membership.frozen_until,
+            )
+            new_periods.append(period)
+
+        planned = max((membership.frozen_until - period.start_date).days, 0)
+        days = _granted_days(planned, closed_days[membership.pk], membership.get_plan())
+        if days < planned:
+            summary['capped'] += 1
+        period.unfrozen_on = membership.frozen_until
+        period.days = days
+        by_days[days].append(membership.pk)
+        summary['days'] += days
+
+    FreezePeriod.objects.bulk_create(new_periods)
+    FreezePeriod.objects.bulk_update(
+        list(open_periods.values()), ['unfrozen_on', 'days'], batch_size=500
+    )
+    for days, ids in by_days.items():
+        summary['unfrozen'] += Membership.objects.filter(id__in=ids, status='frozen').update(
+            end_date=F('end_date') + datetime.timedelta(days=days),
+            status='active',
+            frozen_until=None,
+            updated_at=now,
+        )
+    return summary
+
+
+def unfreeze_memberships(today=None, batch_size=UNFREEZE_BATCH_SIZE, dry_run=False):
+    """
+    Размораживает все абонементы, у которых наступила дата frozen_until,
+    и продлевает их на дни заморозки (в пределах лимита тарифа).
+    Повторный запуск безопасен. Возвращает сводку.
+    """
+    today = today or timezone.localdate()
+    due = due_for_unfreeze(today).select_related('plan')
+    summary = {'unfrozen': 0, 'days': 0, 'capped': 0, 'today': today}
+    last_id = 0
+
+    while True:
+        batch = list(due.filter(id__gt=last_id).order_by('id')[:batch_size])
+        if not batch:
+            break
+        last_id = batch[-1].pk
+
+        if dry_run:
+            summary['unfrozen'] += len(batch)
+            continue
+
+        with transaction.atomic():
+            result = _unfreeze_batch(batch, timezone.now())
+            memberships_changed(
+                {membership.start_date for membership in batch},
+                {membership.client_id for membership in batch},
+            )
+        for key in ('unfrozen', 'days', 'capped'):
+            summary[key] += result[key]
+
+    return summary
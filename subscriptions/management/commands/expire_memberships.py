@@ -0,0 +1,43 @@
+import datetime
+from django.core.management.base import BaseCommand, CommandError
+from subscriptions.expiry import EXPIRY_BATCH_SIZE, expire_memberships
+
+
+class Command(BaseCommand):
+    help = (
+        'Переводит абонементы с истекшим сроком или без посещений в статус "Истек". '
+        'Запускается по расписанию (например, cron каждую ночь), повторный запуск безопасен. '
+        'Статус "Истек" выставляет только эта команда: список истекших абонементов, '
+        'должники и счетчики дашборда актуальны на момент ее последнего запуска'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', help='Считать сегодняшней эту дату (ГГГГ-ММ-ДД)')
+        parser.add_argument('--batch-size', type=int, default=EXPIRY_BATCH_SIZE)
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Только показать, что изменится')
+
+    def handle(self, *args, **options):
+        today = None
+        if options['date']:
+            try:
+                today = datetime.date.fromisoformat(options['date'])
+            except ValueError:
+                raise CommandError(f'Неверная дата: {options["date"]}')
+
+        summary = expire_memberships(
+            today=today,
+            batch_size=options['batch_size'],
+            dry_run=options['dry_run'],
+        )
+
+        reasons = {'date': 'закончился срок', 'visits': 'закончились посещения'}
+        for reason, count in summary['by_reason'].items():
+            self.stdout.write(f'  {reasons[reason]}: {count}')
+        for plan_name, count in summary['by_plan'].most_common():
+            self.stdout.write(f'  {plan_name}: {count}')
+
+        verb = 'Будет переведено' if options['dry_run'] else 'Переведено'
+        self.stdout.write(self.style.SUCCESS(
+            f'{verb} в "Истек": {summary["expired"]} (на {summary["today"]:%d.%m.%Y})'
+        ))
@@ -0,0 +1,63 @@
+from django.core.management.base import BaseCommand
+from subscriptions.models import Membership
+from subscriptions.freezes import granted_freeze_days
+from subscriptions.periods import recalculate_end_dates
+
+
+def _date(value):
+    return f'{value:%d.%m.%Y}' if value else '-'
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает даты окончания абонементов по календарным месяцам и годам '
+        'одним пакетным проходом (без save() на каждую запись). Переписываются только '
+        'даты, посчитанные прежним способом (месяц = 30 дней); измененные вручную или '
+        'заданные при импорте выводятся списком и меняются только с --force '
+        '(например, --id 12 --id 15 --force). После пересчета стоит запустить expire_memberships'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--plan', type=int, action='append',
+                            help='Только абонементы этого тарифа (можно несколько раз)')
+        parser.add_argument('--status', action='append',
+                            help='Только абонементы с этим статусом (можно несколько раз)')
+        parser.add_argument('--id', type=int, action='append', dest='ids',
+                            help='Только этот абонемент (можно несколько раз)')
+        parser.add_argument('--force', action='store_true',
+                            help='Переписать и даты, измененные вручную')
+        parser.add_argument('--batch-size', type=int, default=2000)
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Только показать, какие даты изменятся')
+
+    def handle(self, *args, **options):
+        memberships = Membership.objects.all()
+        if options['plan']:
+            memberships = memberships.filter(plan_id__in=options['plan'])
+        if options['status']:
+            memberships = memberships.filter(status__in=options['status'])
+        if options['ids']:
+            memberships = memberships.filter(id__in=options['ids'])
+
+        # Дни, на которые сроки уже продлены заморозками, сохраняются
+        summary = recalculate_end_dates(
+            memberships,
+            freeze_days=granted_freeze_days(memberships),
+            batch_size=options['batch_size'],
+            dry_run=options['dry_run'],
+            force=options['force'],
+        )
+
+        if options['dry_run'] or options['verbosity'] > 1:
+            for pk, old_end, new_end in summary['changed']:
+                self.stdout.write(f'  #{pk}: {_date(old_end)} -> {_date(new_end)}')
+        if summary['skipped']:
+            self.stdout.write(self.style.WARNING(
+                f'Пропущено дат, измененных вручную: {len(summary["skipped"])} '
+                f'(переписать: --id ... --force)'
+            ))
+            for pk, old_end, new_end in summary['skipped']:
+                self.stdout.write(f'  #{pk}: {_date(old_end)} (по тарифу {_date(new_end)})')
+
+        verb = 'Изменится' if options['dry_run'] else 'Изменено'
+        self.stdout.write(self.style.SUCCESS(f'{verb} дат окончания: {len(summary["changed"])}'))
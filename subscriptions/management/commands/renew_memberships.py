@@ -0,0 +1,40 @@
+import datetime
+from django.core.management.base import BaseCommand, CommandError
+from subscriptions.renewals import RENEWAL_BATCH_SIZE, RENEWAL_WINDOW_DAYS, renew_memberships
+
+
+class Command(BaseCommand):
+    help = (
+        'Продлевает абонементы с автопродлением, которые скоро заканчиваются, '
+        'и создает для них платежи, ожидающие оплаты. Повторный запуск безопасен'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', help='Считать сегодняшней эту дату (ГГГГ-ММ-ДД)')
+        parser.add_argument('--window', type=int, default=RENEWAL_WINDOW_DAYS,
+                            help='За сколько дней до окончания продлевать')
+        parser.add_argument('--batch-size', type=int, default=RENEWAL_BATCH_SIZE)
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Только показать, что будет продлено')
+
+    def handle(self, *args, **options):
+        today = None
+        if options['date']:
+            try:
+                today = datetime.date.fromisoformat(options['date'])
+            except ValueError:
+                raise CommandError(f'Неверная дата: {options["date"]}')
+
+        summary = renew_memberships(
+            today=today,
+            window_days=options['window'],
+            batch_size=options['batch_size'],
+            dry_run=options['dry_run'],
+        )
+
+        if summary['skipped']:
+            self.stdout.write(f'Уже продлены другим запуском: {summary["skipped"]}')
+        verb = 'Будет продлено' if options['dry_run'] else 'Продлено'
+        self.stdout.write(self.style.SUCCESS(
+            f'{verb} абонементов: {summary["renewed"]}, к оплате: {summary["amount"]} сом'
+        ))
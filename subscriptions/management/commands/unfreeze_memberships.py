@@ -0,0 +1,46 @@
+import datetime
+from django.core.management.base import BaseCommand, CommandError
+from subscriptions.freezes import UNFREEZE_BATCH_SIZE, unfreeze_memberships
+
+
+class Command(BaseCommand):
+    help = (
+        'Размораживает абонементы, у которых наступила дата "Заморожен до", и продлевает '
+        'их на дни заморозки. Запускается по расписанию (например, cron каждую ночь), '
+        'повторный запуск безопасен'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', help='Считать сегодняшней эту дату (ГГГГ-ММ-ДД)')
+        parser.add_argument('--batch-size', type=int, default=UNFREEZE_BATCH_SIZE)
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Только показать, сколько абонементов будет разморожено')
+
+    def handle(self, *args, **options):
+        today = None
+        if options['date']:
+            try:
+                today = datetime.date.fromisoformat(options['date'])
+            except ValueError:
+                raise CommandError(f'Неверная дата: {options["date"]}')
+
+        summary = unfreeze_memberships(
+            today=today,
+            batch_size=options['batch_size'],
+            dry_run=options['dry_run'],
+        )
+
+        if options['dry_run']:
+            self.stdout.write(self.style.SUCCESS(
+                f'Будет разморожено: {summary["unfrozen"]} (на {summary["today"]:%d.%m.%Y})'
+            ))
+            return
+
+        if summary['capped']:
+            self.stdout.write(self.style.WARNING(
+                f'  продление ограничено лимитом тарифа: {summary["capped"]}'
+            ))
+        self.stdout.write(self.style.SUCCESS(
+            f'Разморожено: {summary["unfrozen"]}, добавлено дней: {summary["days"]} '
+            f'(на {summary["today"]:%d.%m.%Y})'
+        ))
@@ -0,0 +1,33 @@
+# Generated by Django 4.2 on 2026-10-17 06:33
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('subscriptions', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyMembershipCounts',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='Дата начала')),
+                ('status', models.CharField(choices=[('active', 'Активный'), ('expired', 'Истек'), ('frozen', 'Заморожен'), ('cancelled', 'Отменен')], max_length=20, verbose_name='Статус')),
+                ('count', models.IntegerField(default=0, verbose_name='Количество')),
+                ('plan', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_counts', to='subscriptions.membershipplan', verbose_name='Тарифный план')),
+            ],
+            options={
+                'verbose_name': 'Абонементы за день',
+                'verbose_name_plural': 'Абонементы по дням',
+                'ordering': ['-date'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='dailymembershipcounts',
+            constraint=models.UniqueConstraint(fields=('date', 'plan', 'status'), name='unique_daily_membership_counts'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2 on 2026-10-17 06:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('subscriptions', '0002_dailymembershipcounts'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='membership',
+            index=models.Index(fields=['start_date'], name='subscriptio_start_d_a555b3_idx'),
+        ),
+    ]
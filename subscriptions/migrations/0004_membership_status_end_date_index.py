@@ -0,0 +1,17 @@
+# Generated by Django 4.2 on 2026-10-17 06:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('subscriptions', '0003_membership_start_date_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='membership',
+            index=models.Index(fields=['status', 'end_date'], name='subscriptio_status_3f2f74_idx'),
+        ),
+    ]
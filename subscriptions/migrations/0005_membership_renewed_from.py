@@ -0,0 +1,19 @@
+# Generated by Django 4.2 on 2026-10-17 06:45
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('subscriptions', '0004_membership_status_end_date_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='membership',
+            name='renewed_from',
+            field=models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='renewal', to='subscriptions.membership', verbose_name='Продление абонемента'),
+        ),
+    ]
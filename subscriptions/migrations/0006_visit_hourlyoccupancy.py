@@ -0,0 +1,58 @@
+# Generated by Django 4.2 on 2026-10-17 06:46
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clients', '0005_exportjob'),
+        ('subscriptions', '0005_membership_renewed_from'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HourlyOccupancy',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='Дата')),
+                ('hour', models.PositiveSmallIntegerField(verbose_name='Час')),
+                ('entries', models.IntegerField(default=0, verbose_name='Входов')),
+                ('exits', models.IntegerField(default=0, verbose_name='Выходов')),
+            ],
+            options={
+                'verbose_name': 'Посещаемость за час',
+                'verbose_name_plural': 'Посещаемость по часам',
+                'ordering': ['-date', 'hour'],
+            },
+        ),
+        migrations.CreateModel(
+            name='Visit',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('timestamp', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Время')),
+                ('direction', models.CharField(choices=[('in', 'Вход'), ('out', 'Выход')], default='in', max_length=3, verbose_name='Направление')),
+                ('client', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='visits', to='clients.client', verbose_name='Клиент')),
+                ('membership', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='visits', to='subscriptions.membership', verbose_name='Абонемент')),
+            ],
+            options={
+                'verbose_name': 'Посещение',
+                'verbose_name_plural': 'Посещения',
+                'ordering': ['-timestamp'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='hourlyoccupancy',
+            constraint=models.UniqueConstraint(fields=('date', 'hour'), name='unique_hourly_occupancy'),
+        ),
+        migrations.AddIndex(
+            model_name='visit',
+            index=models.Index(fields=['timestamp'], name='subscriptio_timesta_c04e20_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='visit',
+            index=models.Index(fields=['client', 'timestamp'], name='subscriptio_client__e206cb_idx'),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 4.2 on 2026-10-17 06:53
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('subscriptions', '0006_visit_hourlyoccupancy'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FreezePeriod',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('start_date', models.DateField(verbose_name='Начало заморозки')),
+                ('frozen_until', models.DateField(verbose_name='Заморожен до')),
+                ('unfrozen_on', models.DateField(blank=True, null=True, verbose_name='Разморожен')),
+                ('days', models.PositiveIntegerField(blank=True, null=True, verbose_name='Дней заморозки')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Дата создания')),
+                ('membership', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='freeze_periods', to='subscriptions.membership', verbose_name='Абонемент')),
+            ],
+            options={
+                'verbose_name': 'Заморозка',
+                'verbose_name_plural': 'Заморозки',
+                'ordering': ['-start_date'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='freezeperiod',
+            index=models.Index(fields=['membership', 'unfrozen_on'], name='subscriptio_members_4339ec_idx'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+from django.db import migrations
+from django.db.models import Count
+
+
+def backfill_daily_membership_counts(apps, schema_editor):
+    Membership = apps.get_model('subscriptions', 'Membership')
+    DailyMembershipCounts = apps.get_model('subscriptions', 'DailyMembershipCounts')
+    aggregates = (
+        Membership.objects
+        .values('start_date', 'plan_id', 'status')
+        .annotate(count=Count('id'))
+        .order_by()
+    )
+    DailyMembershipCounts.objects.all().delete()
+    DailyMembershipCounts.objects.bulk_create([
+        DailyMembershipCounts(
+            date=row['start_date'],
+            plan_id=row['plan_id'],
+            status=row['status'],
+            count=row['count'],
+        )
+        for row in aggregates.iterator()
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('subscriptions', '0007_freezeperiod'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_daily_membership_counts, migrations.RunPython.noop),
+    ]
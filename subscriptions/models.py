@@ -1,4 +1,5 @@
 from django.db import models
+from decimal import Decimal
 from django.core.validators import MinValueValidator
 from django.utils import timezone
 
@@ -116,6 +117,11 @@ class MembershipPlan(models.Model):
     def __str__(self):
         return f'{self.name} - {self.price} руб.'
     
+    def get_end_date(self, start_date, freeze_days=0):
+        """Дата окончания абонемента по этому тарифу, начатого start_date"""
+        from .periods import add_period
+        return add_period(start_date, self.period_type, self.period_value, freeze_days)
+    
     def get_period_display_text(self):
         """Текстовое представление периода"""
         period_texts = {
@@ -129,6 +135,17 @@ class MembershipPlan(models.Model):
         """Безлимитный ли тариф"""
         return self.visit_limit is None
     
+    def is_access_allowed(self, moment=None):
+        """Разрешен ли вход по тарифу в указанный момент (по местному времени)"""
+        moment = timezone.localtime(moment)
+        if self.access_time == 'day':
+            return 6 <= moment.hour < 18
+        if self.access_time == 'night':
+            return moment.hour >= 18 or moment.hour < 6
+        if self.access_time == 'weekend':
+            return moment.weekday() >= 5
+        return True
+    
     def get_access_time_display_text(self):
         """Текстовое представление времени доступа"""
         access_texts = {
@@ -142,23 +159,21 @@ class MembershipPlan(models.Model):
     @property
     def price_per_day(self):
         """Стоимость за день (для сравнения тарифов)"""
-        if self.period_type == 'days':
-            days = self.period_value
-        elif self.period_type == 'months':
-            days = self.period_value * 30  # приблизительно
-        elif self.period_type == 'year':
-            days = self.period_value * 365
-        else:
-            days = 1
+        from .periods import average_period_days
+        days = average_period_days(self.period_type, self.period_value)
         
         if days > 0:
-            return round(self.price / days, 2)
+            return round(self.price / Decimal(str(days)), 2)
         return self.price
     
     @classmethod
     def get_active_plans(cls):
-        """Получить все активные тарифы"""
-        return cls.objects.filter(is_active=True).order_by('display_order', 'name')
+        """
+        Все активные тарифы из реестра тарифов в памяти. Возвращает список,
+        а не QuerySet: фильтровать и считать его нужно средствами Python.
+        """
+        from .plan_cache import plan_registry
+        return plan_registry.active()
 
 
 class Membership(models.Model):
@@ -225,6 +240,16 @@ class Membership(models.Model):
         null=True
     )
     
+    # Абонемент, продлением которого является этот (автопродление)
+    renewed_from = models.OneToOneField(
+        'self',
+        on_delete=models.SET_NULL,
+        verbose_name='Продление абонемента',
+        blank=True,
+        null=True,
+        related_name='renewal'
+    )
+    
     # Примечания
     notes = models.TextField(
         verbose_name='Примечания',
@@ -244,32 +269,28 @@ class Membership(models.Model):
             models.Index(fields=['client', 'status']),
             models.Index(fields=['end_date']),
             models.Index(fields=['status']),
+            models.Index(fields=['start_date']),
+            models.Index(fields=['status', 'end_date']),
         ]
     
     def __str__(self):
-        return f'{self.client} - {self.plan.name} ({self.status})'
+        return f'{self.client} - {self.get_plan().name} ({self.status})'
+    
+    def get_plan(self):
+        """Тарифный план без запроса к базе (из реестра тарифов)"""
+        from .plan_cache import plan_for
+        return plan_for(self)
     
     def save(self, *args, **kwargs):
         """Автоматически устанавливаем дату окончания при сохранении"""
-        if not self.end_date and self.plan:
+        plan = self.get_plan()
+        if not self.end_date and plan:
             # Рассчитываем дату окончания на основе тарифа
-            from datetime import timedelta
-            
-            if self.plan.period_type == 'days':
-                delta = timedelta(days=self.plan.period_value)
-            elif self.plan.period_type == 'months':
-                # Приблизительно 30 дней в месяце
-                delta = timedelta(days=self.plan.period_value * 30)
-            elif self.plan.period_type == 'year':
-                delta = timedelta(days=self.plan.period_value * 365)
-            else:
-                delta = timedelta(days=30)
-            
-            self.end_date = self.start_date + delta
+            self.end_date = plan.get_end_date(self.start_date)
         
         # Устанавливаем количество посещений, если тариф ограниченный
-        if not self.remaining_visits and self.plan.visit_limit:
-            self.remaining_visits = self.plan.visit_limit
+        if not self.remaining_visits and plan.visit_limit:
+            self.remaining_visits = plan.visit_limit
         
         super().save(*args, **kwargs)
     
@@ -298,40 +319,204 @@ class Membership(models.Model):
             return False
         if self.remaining_visits is not None and self.remaining_visits <= 0:
             return False
+        if not self.get_plan().is_access_allowed():
+            return False
         return True
     
     def use_visit(self):
-        """Использовать одно посещение"""
-        if self.remaining_visits is not None and self.remaining_visits > 0:
-            self.remaining_visits -= 1
+        """Использовать одно посещение (атомарно, см. subscriptions.visits)"""
+        if self.remaining_visits is None:
+            return False
+        from .visits import register_visit
+        result = register_visit(self.pk)
+        if result.ok:
+            self.remaining_visits = result.remaining
             if self.remaining_visits <= 0:
                 self.status = 'expired'
-            self.save()
-            return True
-        return False
+        return result.ok
     
     def freeze(self, until_date):
         """Заморозить абонемент"""
-        if not self.plan.can_freeze:
-            return False, "Тариф не поддерживает заморозку"
-        
-        self.status = 'frozen'
-        self.frozen_until = until_date
-        self.save()
+        from django.core.exceptions import ValidationError
+        from .freezes import freeze_membership
+        try:
+            freeze_membership(self, until_date)
+        except ValidationError as exc:
+            return False, exc.messages[0]
         return True, "Абонемент заморожен"
     
     def unfreeze(self):
-        """Разморозить абонемент"""
+        """Разморозить абонемент (срок продлевается на дни заморозки)"""
         if self.status != 'frozen':
             return False, "Абонемент не заморожен"
         
-        self.status = 'active'
-        self.frozen_until = None
-        self.save()
+        from .freezes import unfreeze_membership
+        unfreeze_membership(self)
         return True, "Абонемент разморожен"
     
     @property
     def is_about_to_expire(self):
         """Абонемент скоро истекает (менее 7 дней)"""
         days_left = self.days_remaining()
-        return days_left is not None and 0 < days_left <= 7
\ No newline at end of file
+        return days_left is not None and 0 < days_left <= 7
+
+class DailyMembershipCounts(models.Model):
+    """Количество абонементов по дате начала, тарифу и статусу"""
+
+    date = models.DateField(verbose_name='Дата начала')
+
+    plan = models.ForeignKey(
+        'MembershipPlan',
+        on_delete=models.CASCADE,
+        verbose_name='Тарифный план',
+        related_name='daily_counts'
+    )
+
+    status = models.CharField(
+        max_length=20,
+        verbose_name='Статус',
+        choices=Membership.STATUS_CHOICES
+    )
+
+    count = models.IntegerField(verbose_name='Количество', default=0)
+
+    class Meta:
+        verbose_name = 'Абонементы за день'
+        verbose_name_plural = 'Абонементы по дням'
+        ordering = ['-date']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['date', 'plan', 'status'],
+                name='unique_daily_membership_counts'
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.date} {self.plan_id} {self.status}: {self.count}'
+
+
+class FreezePeriod(models.Model):
+    """История заморозок абонемента (для учета лимита и продления срока)"""
+
+    membership = models.ForeignKey(
+        'Membership',
+        on_delete=models.CASCADE,
+        verbose_name='Абонемент',
+        related_name='freeze_periods'
+    )
+
+    start_date = models.DateField(verbose_name='Начало заморозки')
+
+    frozen_until = models.DateField(verbose_name='Заморожен до')
+
+    # Фактическая дата разморозки (пусто, пока заморозка действует)
+    unfrozen_on = models.DateField(
+        verbose_name='Разморожен',
+        blank=True,
+        null=True
+    )
+
+    # На сколько дней продлен абонемент (заполняется при разморозке)
+    days = models.PositiveIntegerField(
+        verbose_name='Дней заморозки',
+        blank=True,
+        null=True
+    )
+
+    created_at = models.DateTimeField(
+        verbose_name='Дата создания',
+        auto_now_add=True
+    )
+
+    class Meta:
+        verbose_name = 'Заморозка'
+        verbose_name_plural = 'Заморозки'
+        ordering = ['-start_date']
+        indexes = [
+            models.Index(fields=['membership', 'unfrozen_on']),
+        ]
+
+    def __str__(self):
+        return f'{self.membership_id}: {self.start_date:%d.%m.%Y} - {self.frozen_until:%d.%m.%Y}'
+
+    @property
+    def is_open(self):
+        return self.unfrozen_on is None
+
+    def planned_days(self):
+        """Длительность заморозки: фактическая или запланированная"""
+        if self.days is not None:
+            return self.days
+        return max((self.frozen_until - self.start_date).days, 0)
+
+
+class Visit(models.Model):
+    """Журнал проходов через турникет (только добавление)"""
+
+    DIRECTION_CHOICES = [
+        ('in', 'Вход'),
+        ('out', 'Выход'),
+    ]
+
+    client = models.ForeignKey(
+        'clients.Client',
+        on_delete=models.CASCADE,
+        verbose_name='Клиент',
+        related_name='visits'
+    )
+
+    membership = models.ForeignKey(
+        'Membership',
+        on_delete=models.SET_NULL,
+        verbose_name='Абонемент',
+        blank=True,
+        null=True,
+        related_name='visits'
+    )
+
+    timestamp = models.DateTimeField(verbose_name='Время', default=timezone.now)
+
+    direction = models.CharField(
+        max_length=3,
+        verbose_name='Направление',
+        choices=DIRECTION_CHOICES,
+        default='in'
+    )
+
+    class Meta:
+        verbose_name = 'Посещение'
+        verbose_name_plural = 'Посещения'
+        ordering = ['-timestamp']
+        indexes = [
+            models.Index(fields=['timestamp']),
+            models.Index(fields=['client', 'timestamp']),
+        ]
+
+    def __str__(self):
+        return f'{self.client_id} {self.get_direction_display()} {self.timestamp:%d.%m.%Y %H:%M}'
+
+
+class HourlyOccupancy(models.Model):
+    """Количество входов и выходов за час (по местному времени)"""
+
+    date = models.DateField(verbose_name='Дата')
+
+    hour = models.PositiveSmallIntegerField(verbose_name='Час')
+
+    entries = models.IntegerField(verbose_name='Входов', default=0)
+
+    exits = models.IntegerField(verbose_name='Выходов', default=0)
+
+    class Meta:
+        verbose_name = 'Посещаемость за час'
+        verbose_name_plural = 'Посещаемость по часам'
+        ordering = ['-date', 'hour']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['date', 'hour'],
+                name='unique_hourly_occupancy'
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.date} {self.hour}:00: {self.entries}/{self.exits}'
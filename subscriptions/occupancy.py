@@ -0,0 +1,105 @@
+from collections import Counter
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import ExtractHour, TruncDate
+from fitness_club.dates import local_day_range
+from .models import HourlyOccupancy, Visit
+
+
+def hour_key(timestamp):
+    """(местная дата, час) для времени прохода"""
+    from django.utils import timezone
+    local = timezone.localtime(timestamp) if timezone.is_aware(timestamp) else timestamp
+    return local.date(), local.hour
+
+
+def visit_counts(visits):
+    """Счетчик проходов по ((местная дата, час), направление)"""
+    counts = Counter()
+    for visit in visits:
+        counts[hour_key(visit.timestamp), visit.direction] += 1
+    return counts
+
+
+def add_counts_to_occupancy(counts):
+    """Прибавить счетчики visit_counts() к почасовым строкам"""
+    keys = {key for key, _direction in counts}
+    if not keys:
+        return
+
+    with transaction.atomic():
+        # Недостающие строки создаем пустыми, затем прибавляем через F()
+        HourlyOccupancy.objects.bulk_create(
+            [HourlyOccupancy(date=day, hour=hour) for day, hour in keys],
+            ignore_conflicts=True,
+        )
+        for day, hour in keys:
+            HourlyOccupancy.objects.filter(date=day, hour=hour).update(
+                entries=F('entries') + counts[(day, hour), 'in'],
+                exits=F('exits') + counts[(day, hour), 'out'],
+            )
+
+
+def add_visits_to_occupancy(visits):
+    """
+    Прибавить новые проходы к почасовым счетчикам. Читается только
+    переданный список, журнал посещений не сканируется.
+    """
+    add_counts_to_occupancy(visit_counts(visits))
+
+
+def rebuild_occupancy(first_day=None, last_day=None):
+    """Пересобрать HourlyOccupancy по журналу посещений (целиком или за период)"""
+    visits = Visit.objects.all()
+    rows = HourlyOccupancy.objects.all()
+    if first_day or last_day:
+        start, end = local_day_range(first_day or last_day, last_day or first_day)
+        if first_day:
+            visits = visits.filter(timestamp__gte=start)
+            rows = rows.filter(date__gte=first_day)
+        if last_day:
+            visits = visits.filter(timestamp__lt=end)
+            rows = rows.filter(date__lte=last_day)
+
+    # TruncDate/ExtractHour считают в текущем часовом поясе (TIME_ZONE)
+    aggregates = (
+        visits
+        .annotate(day=TruncDate('timestamp'), hour=ExtractHour('timestamp'))
+        .values('day', 'hour')
+        .annotate(
+            entries=Count('id', filter=Q(direction='in')),
+            exits=Count('id', filter=Q(direction='out')),
+        )
+        .order_by()
+    )
+    occupancy = [
+        HourlyOccupancy(date=row['day'], hour=row['hour'], entries=row['entries'], exits=row['exits'])
+        for row in aggregates.iterator()
+    ]
+    with transaction.atomic():
+        rows.delete()
+        HourlyOccupancy.objects.bulk_create(occupancy, batch_size=1000)
+    return len(occupancy)
+
+
+def hourly_profile(first_day, last_day):
+    """Среднее число входов по часам суток за период"""
+    days = (last_day - first_day).days + 1
+    totals = dict(
+        HourlyOccupancy.objects.filter(date__range=[first_day, last_day])
+        .values('hour').annotate(total=Sum('entries')).order_by()
+        .values_list('hour', 'total')
+    )
+    return [round(totals.get(hour, 0) / days, 1) for hour in range(24)]
+
+
+def weekday_profile(first_day, last_day):
+    """Всего входов по дням недели за период (понедельник - первый)"""
+    totals = [0] * 7
+    for day, entries in (
+        HourlyOccupancy.objects.filter(date__range=[first_day, last_day])
+        .values('date').annotate(total=Sum('entries')).order_by()
+        .values_list('date', 'total')
+    ):
+        totals[day.weekday()] += entries
+    return totals
@@ -0,0 +1,144 @@
+import calendar
+import datetime
+from django.db import transaction
+
+# Средняя длина месяца и года по григорианскому календарю (для цены за день)
+DAYS_IN_YEAR = 365.2425
+DAYS_IN_MONTH = DAYS_IN_YEAR / 12
+
+
+def add_months(day, months):
+    """
+    Сдвиг даты на months календарных месяцев. Если такого числа в
+    месяце нет (31 января + 1 месяц), берется последний день месяца.
+    """
+    month_index = day.month - 1 + months
+    year = day.year + month_index // 12
+    month = month_index % 12 + 1
+    return day.replace(year=year, month=month, day=min(day.day, calendar.monthrange(year, month)[1]))
+
+
+def add_period(start_date, period_type, period_value, freeze_days=0):
+    """Дата окончания периода, начатого start_date, с учетом дней заморозки"""
+    if period_type == 'days':
+        end_date = start_date + datetime.timedelta(days=period_value)
+    elif period_type == 'months':
+        end_date = add_months(start_date, period_value)
+    elif period_type == 'year':
+        end_date = add_months(start_date, period_value * 12)
+    else:
+        end_date = add_months(start_date, 1)
+    if freeze_days:
+        end_date += datetime.timedelta(days=freeze_days)
+    return end_date
+
+
+def legacy_end_date(start_date, period_type, period_value, freeze_days=0):
+    """
+    Дата окончания по прежнему расчету (месяц = 30 дней, год = 365): по
+    ней пересчет отличает вычисленные даты от заданных вручную
+    """
+    if period_type == 'days':
+        days = period_value
+    elif period_type == 'months':
+        days = period_value * 30
+    elif period_type == 'year':
+        days = period_value * 365
+    else:
+        days = 30
+    return start_date + datetime.timedelta(days=days + (freeze_days or 0))
+
+
+def end_dates(start_dates, period_type, period_value, freeze_days=None):
+    """
+    Даты окончания для массива дат начала одним вызовом (для пакетных
+    продлений, импорта и пересчетов). freeze_days - массив той же длины
+    или None.
+    """
+    if period_type == 'days':
+        delta = datetime.timedelta(days=period_value)
+        result = [start + delta for start in start_dates]
+    else:
+        months = period_value * 12 if period_type == 'year' else (period_value if period_type == 'months' else 1)
+        # Разные даты начала в одном месяце часто совпадают - считаем каждую один раз
+        cache = {}
+        result = []
+        for start in start_dates:
+            if start not in cache:
+                cache[start] = add_months(start, months)
+            result.append(cache[start])
+    if freeze_days is not None:
+        result = [end + datetime.timedelta(days=extra or 0) for end, extra in zip(result, freeze_days)]
+    return result
+
+
+def average_period_days(period_type, period_value):
+    """Средняя длина периода в днях (для сравнения тарифов)"""
+    if period_type == 'days':
+        return period_value
+    if period_type == 'months':
+        return period_value * DAYS_IN_MONTH
+    if period_type == 'year':
+        return period_value * DAYS_IN_YEAR
+    return 1
+
+
+def recalculate_end_dates(queryset, freeze_days=None, batch_size=2000, dry_run=False, force=False):
+    """
+    Пересчитать end_date абонементов queryset по их тарифам одним проходом:
+    данные читаются пачками через values_list, даты считаются массивом на
+    каждый тариф, изменившиеся строки сохраняются через bulk_update.
+    freeze_days - словарь {id абонемента: дней заморозки}.
+
+    Переписываются только даты, совпадающие с прежним расчетом
+    (legacy_end_date) и пустые. Даты, измененные вручную или заданные при импорте,
+    пропускаются, пока не передан force=True.
+    Возвращает {'changed': [...], 'skipped': [...]} - списки (id, дата, новая дата).
+    """
+    from .models import Membership
+    from .rollups import memberships_changed
+    from .plan_cache import get_plan
+
+    freeze_days = freeze_days or {}
+    summary = {'changed': [], 'skipped': []}
+    last_id = 0
+    while True:
+        rows = list(
+            queryset.filter(id__gt=last_id).order_by('id')
+            .values_list('id', 'plan_id', 'start_date', 'end_date', 'client_id')[:batch_size]
+        )
+        if not rows:
+            break
+        last_id = rows[-1][0]
+
+        by_plan = {}
+        for row in rows:
+            by_plan.setdefault(row[1], []).append(row)
+
+        updates = []
+        for plan_id, plan_rows in by_plan.items():
+            plan = get_plan(plan_id)
+            new_dates = end_dates(
+                [row[2] for row in plan_rows],
+                plan.period_type,
+                plan.period_value,
+                [freeze_days.get(row[0], 0) for row in plan_rows],
+            )
+            for (pk, _plan_id, start, old_end, client_id), new_end in zip(plan_rows, new_dates):
+                if new_end == old_end:
+                    continue
+                computed = old_end is None or old_end == legacy_end_date(
+                    start, plan.period_type, plan.period_value, freeze_days.get(pk, 0)
+                )
+                if not computed and not force:
+                    summary['skipped'].append((pk, old_end, new_end))
+                    continue
+                summary['changed'].append((pk, old_end, new_end))
+                updates.append(Membership(pk=pk, client_id=client_id, end_date=new_end))
+
+        if updates and not dry_run:
+            with transaction.atomic():
+                Membership.objects.bulk_update(updates, ['end_date'], batch_size=500)
+                memberships_changed(client_ids={membership.client_id for membership in updates})
+
+    return summary
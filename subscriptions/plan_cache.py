@@ -0,0 +1,104 @@
+import threading
+import time
+import uuid
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+# Версия справочника тарифов в общем кэше: меняется при сохранении/удалении тарифа.
+# Чтобы изменения видели все процессы, CACHES должен быть общим для них
+# (в settings - кэш в базе данных; подойдут и Redis, Memcached, но не LocMemCache).
+PLAN_CACHE_VERSION_KEY = 'subscriptions:plans:version'
+
+# Как часто (в секундах) процесс сверяет свою копию с версией в кэше
+PLAN_CACHE_CHECK_INTERVAL = getattr(settings, 'PLAN_CACHE_CHECK_INTERVAL', 5)
+
+
+class PlanRegistry:
+    """
+    Все тарифы в памяти процесса. Тарифов немного, поэтому они читаются
+    одним запросом и отдаются по id без обращения к базе. Экземпляры общие
+    для всех запросов процесса - их нельзя изменять.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._plans = None
+        self._version = None
+        self._checked_at = 0
+
+    def _load(self, version):
+        from .models import MembershipPlan
+        plans = {plan.pk: plan for plan in MembershipPlan.objects.all()}
+        with self._lock:
+            self._plans = plans
+            self._version = version
+            self._checked_at = time.monotonic()
+        return plans
+
+    def _current(self):
+        now = time.monotonic()
+        if self._plans is not None and now - self._checked_at < PLAN_CACHE_CHECK_INTERVAL:
+            return self._plans
+
+        version = cache.get(PLAN_CACHE_VERSION_KEY)
+        if version is None:
+            version = uuid.uuid4().hex
+            # add() не перезапишет версию, которую успел записать другой процесс
+            if not cache.add(PLAN_CACHE_VERSION_KEY, version, None):
+                version = cache.get(PLAN_CACHE_VERSION_KEY, version)
+        if self._plans is None or version != self._version:
+            return self._load(version)
+        self._checked_at = now
+        return self._plans
+
+    def get(self, plan_id):
+        """Тариф по id (None, если такого нет)"""
+        if plan_id is None:
+            return None
+        plans = self._current()
+        if plan_id not in plans:
+            # Тариф мог появиться в другом процессе, а версия еще не сверялась
+            plans = self._load(self._version)
+        return plans.get(plan_id)
+
+    def all(self):
+        """Все тарифы в порядке отображения"""
+        return sorted(self._current().values(), key=lambda plan: (plan.display_order, plan.name))
+
+    def active(self):
+        return [plan for plan in self.all() if plan.is_active]
+
+    def clear(self):
+        """Сбросить копию этого процесса"""
+        with self._lock:
+            self._plans = None
+            self._version = None
+
+
+plan_registry = PlanRegistry()
+
+
+def get_plan(plan_id):
+    return plan_registry.get(plan_id)
+
+
+def plan_for(instance, field='plan'):
+    """
+    Тариф, на который ссылается instance.<field>. Если объект уже загружен
+    (select_related или присвоен явно), берем его, иначе - из реестра.
+    """
+    descriptor = instance._meta.get_field(field)
+    if descriptor.is_cached(instance):
+        return getattr(instance, field)
+    return get_plan(getattr(instance, descriptor.attname))
+
+
+def _bump_version():
+    cache.set(PLAN_CACHE_VERSION_KEY, uuid.uuid4().hex, None)
+    plan_registry.clear()
+
+
+def invalidate_plans():
+    """Сменить версию справочника (после коммита транзакции) во всех процессах"""
+    transaction.on_commit(_bump_version)
@@ -0,0 +1,138 @@
+import datetime
+from decimal import Decimal
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+from fitness_club.dates import local_day
+from .models import Membership
+from .rollups import memberships_changed
+
+# За сколько дней до окончания продлевать абонементы с автопродлением
+RENEWAL_WINDOW_DAYS = getattr(settings, 'MEMBERSHIP_RENEWAL_WINDOW_DAYS', 3)
+RENEWAL_BATCH_SIZE = 500
+
+
+def renewal_candidates(today=None, window_days=RENEWAL_WINDOW_DAYS):
+    """
+    Абонементы с автопродлением, которые заканчиваются в ближайшие
+    window_days дней (или закончились не раньше, чем window_days дней назад),
+    еще не продлены и у клиента нет более позднего абонемента.
+    """
+    today = today or timezone.localdate()
+    successors = Membership.objects.filter(
+        client=OuterRef('client'),
+        start_date__gt=OuterRef('start_date'),
+    )
+    return Membership.objects.filter(
+        auto_renewal=True,
+        status__in=['active', 'expired'],
+        end_date__gte=today - datetime.timedelta(days=window_days),
+        end_date__lte=today + datetime.timedelta(days=window_days),
+        plan__is_active=True,
+        renewal__isnull=True,
+    ).exclude(Exists(successors))
+
+
+def _renew_batch(memberships, now):
+    """Создать продления и ожидающие оплаты платежи для пачки абонементов"""
+    from payments.models import Payment
+    from payments.rollups import refresh_revenue_days
+
+    from .periods import end_dates
+
+    # Даты окончания считаем массивом на каждый тариф пачки
+    start_dates = [membership.end_date + datetime.timedelta(days=1) for membership in memberships]
+    by_plan = {}
+    for index, membership in enumerate(memberships):
+        by_plan.setdefault(membership.plan_id, []).append(index)
+    new_end_dates = [None] * len(memberships)
+    for indexes in by_plan.values():
+        plan = memberships[indexes[0]].plan
+        dates = end_dates([start_dates[i] for i in indexes], plan.period_type, plan.period_value)
+        for i, end_date in zip(indexes, dates):
+            new_end_dates[i] = end_date
+
+    renewals = []
+    for membership, start_date, end_date in zip(memberships, start_dates, new_end_dates):
+        plan = membership.plan
+        renewals.append(Membership(
+            client_id=membership.client_id,
+            plan=plan,
+            start_date=start_date,
+            end_date=end_date,
+            remaining_visits=plan.visit_limit,
+            status='active',
+            auto_renewal=True,
+            renewed_from=membership,
+            notes=f'Автопродление абонемента #{membership.pk}',
+        ))
+
+    with transaction.atomic():
+        # Повторная проверка внутри транзакции: параллельный запуск мог успеть раньше
+        already_renewed = set(
+            Membership.objects.filter(renewed_from__in=[m.pk for m in memberships])
+            .values_list('renewed_from_id', flat=True)
+        )
+        renewals = [r for r in renewals if r.renewed_from_id not in already_renewed]
+        if not renewals:
+            return [], []
+        created = Membership.objects.bulk_create(renewals)
+
+        # bulk_create не вызывает save(): день и период платежа заполняем сами
+        payments = Payment.objects.bulk_create([
+            Payment(
+                client_id=renewal.client_id,
+                membership=renewal,
+                membership_plan=renewal.plan,
+                amount=renewal.plan.price,
+                payment_date=now,
+                payment_day=local_day(now),
+                payment_type='subscription',
+                status='pending',
+                period_start=renewal.start_date,
+                period_end=renewal.end_date,
+                notes='Автопродление',
+            )
+            for renewal in created
+        ])
+
+        refresh_revenue_days({local_day(now)})
+        memberships_changed(
+            {renewal.start_date for renewal in created},
+            {renewal.client_id for renewal in created},
+        )
+    return created, payments
+
+
+def renew_memberships(today=None, window_days=RENEWAL_WINDOW_DAYS,
+                      batch_size=RENEWAL_BATCH_SIZE, dry_run=False):
+    """
+    Продлевает абонементы с автопродлением: новый абонемент начинается на
+    следующий день после окончания текущего, к нему создается платеж со
+    статусом 'pending'. Каждая пачка сохраняется одним bulk_create в своей
+    транзакции. Продленный абонемент связан с новым через renewed_from
+    (уникальная связь), поэтому повторный запуск не создает дублей.
+    """
+    candidates = renewal_candidates(today, window_days).select_related('plan')
+    now = timezone.now()
+    summary = {'renewed': 0, 'amount': Decimal('0'), 'skipped': 0}
+    last_id = 0
+
+    while True:
+        batch = list(candidates.filter(id__gt=last_id).order_by('id')[:batch_size])
+        if not batch:
+            break
+        last_id = batch[-1].pk
+
+        if dry_run:
+            summary['renewed'] += len(batch)
+            summary['amount'] += sum(membership.plan.price for membership in batch)
+            continue
+
+        created, payments = _renew_batch(batch, now)
+        summary['renewed'] += len(created)
+        summary['skipped'] += len(batch) - len(created)
+        summary['amount'] += sum(payment.amount for payment in payments)
+
+    return summary
@@ -0,0 +1,66 @@
+from django.db import transaction
+from django.db.models import Count
+from accounts.metrics import invalidate_dashboard_metrics
+from clients.summary import refresh_client_summaries
+from .counts import invalidate_membership_counts
+from .models import Membership, DailyMembershipCounts
+
+
+def _membership_rows(queryset):
+    aggregates = (
+        queryset
+        .values('start_date', 'plan_id', 'status')
+        .annotate(count=Count('id'))
+        .order_by()
+    )
+    return [
+        DailyMembershipCounts(
+            date=row['start_date'],
+            plan_id=row['plan_id'],
+            status=row['status'],
+            count=row['count'],
+        )
+        for row in aggregates.iterator()
+    ]
+
+
+def refresh_membership_days(days):
+    """Пересчитать DailyMembershipCounts за указанные даты начала"""
+    days = {day for day in days if day}
+    if not days:
+        return
+    rows = _membership_rows(Membership.objects.filter(start_date__in=days))
+    with transaction.atomic():
+        DailyMembershipCounts.objects.filter(date__in=days).delete()
+        DailyMembershipCounts.objects.bulk_create(rows)
+
+
+def memberships_changed(start_dates=(), client_ids=()):
+    """
+    Обновить все, что зависит от абонементов, после пакетных операций
+    (update(), bulk_create() и bulk_update() сигналы не вызывают): дни
+    DailyMembershipCounts и сводки клиентов пересчитываются сразу, в текущей
+    транзакции, а кэши дашборда и счетчиков абонементов сбрасываются после коммита.
+    """
+    refresh_membership_days(start_dates)
+    refresh_client_summaries(client_ids)
+    transaction.on_commit(invalidate_dashboard_metrics)
+    transaction.on_commit(invalidate_membership_counts)
+
+
+def rebuild_membership_counts(first_day=None, last_day=None):
+    """Пересобрать DailyMembershipCounts целиком или за диапазон дат"""
+    memberships = Membership.objects.all()
+    counts = DailyMembershipCounts.objects.all()
+    if first_day:
+        memberships = memberships.filter(start_date__gte=first_day)
+        counts = counts.filter(date__gte=first_day)
+    if last_day:
+        memberships = memberships.filter(start_date__lte=last_day)
+        counts = counts.filter(date__lte=last_day)
+
+    rows = _membership_rows(memberships)
+    with transaction.atomic():
+        counts.delete()
+        DailyMembershipCounts.objects.bulk_create(rows, batch_size=1000)
+    return len(rows)
@@ -0,0 +1,47 @@
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+from clients.summary import refresh_client_summaries
+from .models import Membership, MembershipPlan
+from .counts import invalidate_membership_counts
+from .plan_cache import invalidate_plans
+from .rollups import refresh_membership_days
+
+
+@receiver(pre_save, sender=Membership)
+def remember_start_date(sender, instance, **kwargs):
+    """Запоминаем прежние дату начала и клиента, чтобы пересчитать и их"""
+    instance._previous_start_date = None
+    instance._previous_client_id = None
+    if instance.pk:
+        previous = (
+            Membership.objects.filter(pk=instance.pk)
+            .values_list('start_date', 'client_id').first()
+        )
+        if previous:
+            instance._previous_start_date, instance._previous_client_id = previous
+
+
+@receiver(post_save, sender=Membership)
+@receiver(post_delete, sender=Membership)
+def update_membership_rollups(sender, instance, **kwargs):
+    refresh_membership_days({
+        instance.start_date,
+        getattr(instance, '_previous_start_date', None),
+    })
+    invalidate_membership_counts()
+
+
+@receiver(post_save, sender=Membership)
+@receiver(post_delete, sender=Membership)
+def update_client_summary(sender, instance, **kwargs):
+    refresh_client_summaries({
+        instance.client_id,
+        getattr(instance, '_previous_client_id', None),
+    })
+
+
+@receiver(post_save, sender=MembershipPlan)
+@receiver(post_delete, sender=MembershipPlan)
+def invalidate_plan_registry(sender, **kwargs):
+    """Реестр тарифов в памяти процессов перечитывается после изменения тарифа"""
+    invalidate_plans()
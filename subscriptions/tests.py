@@ -1,3 +1,475 @@
+import datetime
+import io
+from django.db import transaction
 from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from accounts.models import User
+from clients.models import Client
+from .models import FreezePeriod, HourlyOccupancy, Membership, MembershipPlan, Visit
 
-# Create your tests here.
+
+def make_client(number=1):
+    return Client.objects.create(first_name='Иван', last_name='Иванов', phone=f'+99670000{number:04d}')
+
+
+def make_plan(**fields):
+    fields.setdefault('name', 'Месячный безлимит')
+    fields.setdefault('price', 1500)
+    fields.setdefault('period_type', 'months')
+    fields.setdefault('period_value', 1)
+    return MembershipPlan.objects.create(**fields)
+
+
+def make_membership(client, plan, start_date, **fields):
+    return Membership.objects.create(client=client, plan=plan, start_date=start_date, **fields)
+
+
+class MembershipExpiredViewTests(TestCase):
+    """Список истекших абонементов: окно ?days= и курсорная пагинация"""
+
+    def setUp(self):
+        self.client.force_login(User.objects.create_user('admin', password='secret'))
+        self.today = timezone.localdate()
+        client = make_client()
+        plan = make_plan()
+        self.recent = [
+            make_membership(client, plan, self.today - datetime.timedelta(days=40),
+                            end_date=self.today - datetime.timedelta(days=days), status='expired').pk
+            for days in range(1, 26)
+        ]
+        self.old = make_membership(client, plan, self.today - datetime.timedelta(days=100),
+                                   end_date=self.today - datetime.timedelta(days=60), status='expired').pk
+
+    def test_default_window_is_paginated(self):
+        response = self.client.get(reverse('membership_expired'))
+        page = response.context['page_obj']
+        self.assertEqual([m.pk for m in page], self.recent[:20])
+        self.assertTrue(page.has_next)
+
+        response = self.client.get(reverse('membership_expired'), {'cursor': page.next_cursor})
+        self.assertEqual([m.pk for m in response.context['page_obj']], self.recent[20:])
+        self.assertFalse(response.context['page_obj'].has_next)
+
+    def test_window_parameter(self):
+        response = self.client.get(reverse('membership_expired'), {'days': 90})
+        self.assertEqual(response.context['days'], 90)
+        self.assertIn(self.old, [m.pk for m in response.context['page_obj'].paginator.queryset])
+
+        response = self.client.get(reverse('membership_expired'), {'days': 'abc'})
+        self.assertEqual(response.context['days'], 30)
+
+
+class MembershipPlanListViewTests(TestCase):
+    """Список тарифов из реестра в памяти"""
+
+    def test_inactive_plans_are_counted(self):
+        make_plan()
+        make_plan(name='Архивный', is_active=False)
+        self.client.force_login(User.objects.create_user('admin', password='secret'))
+        response = self.client.get(reverse('membership_plan_list'))
+        self.assertContains(response, 'Неактивные тарифы (1)')
+
+
+class RegisterVisitTests(TestCase):
+    """Списание посещений одним условным UPDATE (subscriptions.visits)"""
+
+    def setUp(self):
+        self.today = timezone.localdate()
+        self.member = make_client()
+        self.plan = make_plan(name='2 посещения', visit_limit=2)
+
+    def test_decrement_to_zero_expires(self):
+        from .visits import register_visit
+        membership = make_membership(self.member, self.plan, self.today)
+        before = Membership.objects.get(pk=membership.pk).updated_at
+
+        first = register_visit(membership.pk, buffered=False)
+        self.assertEqual((first.ok, first.remaining), (True, 1))
+        self.assertEqual(Membership.objects.get(pk=membership.pk).status, 'active')
+
+        last = register_visit(membership.pk, buffered=False)
+        self.assertEqual((last.ok, last.remaining), (True, 0))
+        membership.refresh_from_db()
+        self.assertEqual((membership.remaining_visits, membership.status), (0, 'expired'))
+        self.assertGreater(membership.updated_at, before)
+        self.assertEqual(membership.visits.count(), 2)
+
+        refused = register_visit(membership.pk, buffered=False)
+        self.assertEqual((refused.ok, refused.reason), (False, 'no_visits'))
+        membership.refresh_from_db()
+        self.assertEqual(membership.remaining_visits, 0)
+
+    def test_unlimited_membership(self):
+        from .visits import register_visit
+        membership = make_membership(self.member, make_plan(), self.today)
+        result = register_visit(membership.pk, buffered=False)
+        self.assertEqual((result.ok, result.remaining), (True, None))
+        self.assertEqual(Membership.objects.get(pk=membership.pk).status, 'active')
+
+    def test_refusals(self):
+        from .visits import register_visit
+        future = make_membership(self.member, self.plan, self.today + datetime.timedelta(days=1))
+        ended = make_membership(self.member, make_plan(), self.today - datetime.timedelta(days=40),
+                                end_date=self.today - datetime.timedelta(days=1))
+        self.assertEqual(register_visit(future.pk).reason, 'not_started')
+        self.assertEqual(register_visit(ended.pk).reason, 'expired')
+        self.assertEqual(register_visit(0).reason, 'not_found')
+
+
+class VisitLogTests(TestCase):
+    """Журнал посещений пишется сразу, почасовая загрузка - пачками"""
+
+    def setUp(self):
+        self.member = make_client()
+        self.membership = make_membership(self.member, make_plan(), timezone.localdate())
+
+    def test_visit_is_written_before_commit(self):
+        from .visits import register_visit
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            self.assertTrue(register_visit(self.membership.pk).ok)
+            self.assertEqual(Visit.objects.filter(membership=self.membership).count(), 1)
+        self.assertEqual(len(callbacks), 1)
+        self.assertFalse(HourlyOccupancy.objects.exists())
+
+    def test_buffer_adds_counts_in_one_flush(self):
+        from .visit_log import OccupancyBuffer, log_visit
+        buffer = OccupancyBuffer(max_size=10, interval=60)
+        moment = timezone.now()
+        for direction in ('in', 'in', 'out'):
+            buffer.add(log_visit(self.member.pk, self.membership.pk, direction, moment, buffered=False))
+        HourlyOccupancy.objects.all().delete()
+
+        self.assertEqual(len(buffer), 3)
+        self.assertEqual(buffer.flush(), 3)
+        row = HourlyOccupancy.objects.get()
+        self.assertEqual((row.entries, row.exits), (2, 1))
+        self.assertEqual(buffer.flush(), 0)
+
+    def test_buffer_flushes_when_full(self):
+        from .visit_log import OccupancyBuffer
+        buffer = OccupancyBuffer(max_size=2, interval=60)
+        visits = [Visit(client=self.member, timestamp=timezone.now()) for _ in range(2)]
+        buffer.add(visits[0])
+        self.assertFalse(HourlyOccupancy.objects.exists())
+        buffer.add(visits[1])
+        self.assertEqual(HourlyOccupancy.objects.get().entries, 2)
+        self.assertEqual(len(buffer), 0)
+
+
+class PeriodTests(TestCase):
+    """Календарный расчет сроков (subscriptions.periods)"""
+
+    def test_month_end_start(self):
+        from .periods import add_months, add_period, end_dates
+        self.assertEqual(add_months(datetime.date(2025, 1, 31), 1), datetime.date(2025, 2, 28))
+        self.assertEqual(add_months(datetime.date(2024, 1, 31), 1), datetime.date(2024, 2, 29))
+        self.assertEqual(add_months(datetime.date(2025, 1, 31), 3), datetime.date(2025, 4, 30))
+        self.assertEqual(add_months(datetime.date(2025, 11, 30), 2), datetime.date(2026, 1, 30))
+        self.assertEqual(add_period(datetime.date(2025, 1, 31), 'months', 1), datetime.date(2025, 2, 28))
+        self.assertEqual(
+            end_dates([datetime.date(2025, 1, 31), datetime.date(2025, 1, 15)], 'months', 1, [0, 3]),
+            [datetime.date(2025, 2, 28), datetime.date(2025, 2, 18)],
+        )
+
+    def test_leap_day_start(self):
+        from .periods import add_period
+        self.assertEqual(add_period(datetime.date(2024, 2, 29), 'year', 1), datetime.date(2025, 2, 28))
+        self.assertEqual(add_period(datetime.date(2024, 2, 29), 'year', 4), datetime.date(2028, 2, 29))
+        self.assertEqual(add_period(datetime.date(2024, 2, 29), 'days', 365), datetime.date(2025, 2, 28))
+
+
+class RecalculateEndDatesTests(TestCase):
+    """Пересчет сроков не трогает даты, заданные вручную"""
+
+    def setUp(self):
+        self.member = make_client()
+        self.plan = make_plan()
+        self.start = datetime.date(2025, 1, 31)
+        # Посчитана прежним способом (30 дней)
+        self.legacy = make_membership(self.member, self.plan, self.start, end_date=datetime.date(2025, 3, 2))
+        # Продлена администратором вручную
+        self.manual = make_membership(self.member, self.plan, self.start, end_date=datetime.date(2025, 3, 15))
+        # Уже по календарю
+        self.current = make_membership(self.member, self.plan, self.start)
+
+    def end_date(self, membership):
+        return Membership.objects.get(pk=membership.pk).end_date
+
+    def test_rewrites_only_computed_dates(self):
+        from .periods import recalculate_end_dates
+        summary = recalculate_end_dates(Membership.objects.all())
+        self.assertEqual(summary['changed'], [(self.legacy.pk, datetime.date(2025, 3, 2), datetime.date(2025, 2, 28))])
+        self.assertEqual(summary['skipped'], [(self.manual.pk, datetime.date(2025, 3, 15), datetime.date(2025, 2, 28))])
+        self.assertEqual(self.end_date(self.legacy), datetime.date(2025, 2, 28))
+        self.assertEqual(self.end_date(self.manual), datetime.date(2025, 3, 15))
+        self.assertEqual(self.end_date(self.current), datetime.date(2025, 2, 28))
+
+    def test_dry_run_and_force(self):
+        from .periods import recalculate_end_dates
+        summary = recalculate_end_dates(Membership.objects.all(), dry_run=True, force=True)
+        self.assertEqual([row[0] for row in summary['changed']], [self.legacy.pk, self.manual.pk])
+        self.assertEqual(self.end_date(self.manual), datetime.date(2025, 3, 15))
+
+        recalculate_end_dates(Membership.objects.filter(pk=self.manual.pk), force=True)
+        self.assertEqual(self.end_date(self.manual), datetime.date(2025, 2, 28))
+        self.assertEqual(self.end_date(self.legacy), datetime.date(2025, 3, 2))
+
+    def test_command_keeps_freeze_days(self):
+        from django.core.management import call_command
+        # Заморозка на 10 дней: срок продлен при разморозке
+        FreezePeriod.objects.create(
+            membership=self.current, start_date=datetime.date(2025, 2, 1),
+            frozen_until=datetime.date(2025, 2, 11), unfrozen_on=datetime.date(2025, 2, 11), days=10,
+        )
+        Membership.objects.filter(pk=self.current.pk).update(end_date=datetime.date(2025, 3, 10))
+        FreezePeriod.objects.create(
+            membership=self.legacy, start_date=datetime.date(2025, 2, 1),
+            frozen_until=datetime.date(2025, 2, 6), unfrozen_on=datetime.date(2025, 2, 6), days=5,
+        )
+        Membership.objects.filter(pk=self.legacy.pk).update(end_date=datetime.date(2025, 3, 7))
+
+        call_command('recalculate_membership_periods', stdout=io.StringIO())
+
+        self.assertEqual(self.end_date(self.current), datetime.date(2025, 3, 10))
+        self.assertEqual(self.end_date(self.legacy), datetime.date(2025, 3, 5))
+        self.assertEqual(self.end_date(self.manual), datetime.date(2025, 3, 15))
+
+
+class RenewMembershipsTests(TestCase):
+    """Автопродление: окно, защита от повторов, календарные сроки, платеж"""
+
+    def setUp(self):
+        self.today = datetime.date(2025, 1, 29)
+        self.plan = make_plan(price=1500)
+        self.number = 0
+
+    def ending(self, days, **fields):
+        self.number += 1
+        end_date = self.today + datetime.timedelta(days=days)
+        fields.setdefault('auto_renewal', True)
+        fields.setdefault('status', 'active' if days >= 0 else 'expired')
+        return make_membership(make_client(self.number), self.plan, end_date - datetime.timedelta(days=30),
+                               end_date=end_date, **fields)
+
+    def test_window_bounds(self):
+        from .renewals import RENEWAL_WINDOW_DAYS, renew_memberships
+        inside = [self.ending(RENEWAL_WINDOW_DAYS), self.ending(-RENEWAL_WINDOW_DAYS), self.ending(0)]
+        self.ending(RENEWAL_WINDOW_DAYS + 1)
+        self.ending(-RENEWAL_WINDOW_DAYS - 1)
+        self.ending(1, auto_renewal=False)
+        self.ending(1, status='frozen')
+        # У клиента уже есть следующий абонемент
+        taken = self.ending(1)
+        make_membership(taken.client, self.plan, taken.end_date + datetime.timedelta(days=1))
+
+        summary = renew_memberships(self.today)
+
+        self.assertEqual(summary['renewed'], 3)
+        self.assertEqual(
+            set(Membership.objects.filter(renewed_from__isnull=False).values_list('renewed_from_id', flat=True)),
+            {membership.pk for membership in inside},
+        )
+
+    def test_calendar_end_date_and_pending_payment(self):
+        from payments.models import DailyRevenue, Payment
+        from fitness_club.dates import local_day
+        from .models import DailyMembershipCounts
+        from .renewals import renew_memberships
+        current = self.ending(1)  # заканчивается 30 января
+
+        summary = renew_memberships(self.today)
+
+        self.assertEqual((summary['renewed'], summary['amount']), (1, 1500))
+        renewal = Membership.objects.get(renewed_from=current)
+        self.assertEqual(
+            (renewal.start_date, renewal.end_date), (datetime.date(2025, 1, 31), datetime.date(2025, 2, 28)),
+        )
+        self.assertEqual((renewal.status, renewal.auto_renewal, renewal.client_id), ('active', True, current.client_id))
+        payment = Payment.objects.get(membership=renewal)
+        self.assertEqual((payment.status, payment.amount, payment.payment_type), ('pending', 1500, 'subscription'))
+        self.assertEqual((payment.period_start, payment.period_end), (renewal.start_date, renewal.end_date))
+        self.assertEqual(payment.payment_day, local_day(payment.payment_date))
+
+        self.assertEqual(DailyMembershipCounts.objects.get(date=renewal.start_date).count, 1)
+        revenue = DailyRevenue.objects.get(date=payment.payment_day, status='pending')
+        self.assertEqual((revenue.count, revenue.total), (1, 1500))
+        client = Client.objects.get(pk=current.client_id)
+        self.assertEqual(client.membership_end_date, datetime.date(2025, 2, 28))
+        self.assertTrue(client.has_active_membership)
+
+    def test_rerun_creates_nothing(self):
+        from payments.models import Payment
+        from .renewals import _renew_batch, renew_memberships
+        current = self.ending(2)
+        renew_memberships(self.today)
+
+        self.assertEqual(renew_memberships(self.today)['renewed'], 0)
+        # Параллельный запуск, выбравший кандидата до продления
+        stale = Membership.objects.select_related('plan').get(pk=current.pk)
+        self.assertEqual(_renew_batch([stale], timezone.now()), ([], []))
+        self.assertEqual(Membership.objects.filter(renewed_from=current).count(), 1)
+        self.assertEqual(Payment.objects.count(), 1)
+
+    def test_dry_run_writes_nothing(self):
+        from .renewals import renew_memberships
+        self.ending(1)
+        summary = renew_memberships(self.today, dry_run=True)
+        self.assertEqual((summary['renewed'], summary['amount']), (1, 1500))
+        self.assertFalse(Membership.objects.filter(renewed_from__isnull=False).exists())
+
+
+class CheckInTests(TestCase):
+    """Вход по телефону или карте (subscriptions.checkin)"""
+
+    def setUp(self):
+        self.today = timezone.localdate()
+        self.start = self.today - datetime.timedelta(days=5)
+        self.member = Client.objects.create(
+            first_name='Иван', last_name='Иванов', phone='+996700123456', card_number='A-1001',
+        )
+        self.unlimited = make_plan()
+
+    def at(self, hour):
+        return timezone.make_aware(datetime.datetime.combine(self.today, datetime.time(hour)))
+
+    def ending_in(self, days, plan=None, **fields):
+        return make_membership(self.member, plan or self.unlimited, self.start,
+                               end_date=self.today + datetime.timedelta(days=days), **fields)
+
+    def test_phone_forms_and_card(self):
+        from .checkin import check_in
+        membership = self.ending_in(30)
+        for identifier in ['+996700123456', '996700123456', '0700123456', '700123456',
+                           ' +996 (700) 12-34-56 ', 'A-1001', ' A-1001 ']:
+            result = check_in(identifier, self.at(10))
+            self.assertTrue(result.ok, identifier)
+            self.assertEqual((result.client, result.membership), (self.member, membership))
+        self.assertEqual(Visit.objects.filter(membership=membership).count(), 7)
+
+    def test_earliest_ending_allowed_membership(self):
+        from .checkin import check_in
+        limited = make_plan(name='10 посещений', visit_limit=10)
+        used_up = self.ending_in(3, limited)
+        Membership.objects.filter(pk=used_up.pk).update(remaining_visits=0)
+        first = self.ending_in(10, limited)
+        self.ending_in(40)
+
+        result = check_in('0700123456', self.at(10))
+
+        self.assertEqual((result.ok, result.membership, result.remaining), (True, first, 9))
+        self.assertEqual(Membership.objects.get(pk=first.pk).remaining_visits, 9)
+
+    def test_access_time(self):
+        from .checkin import check_in
+        daytime = self.ending_in(10, make_plan(name='Дневной', access_time='day'))
+
+        refused = check_in('A-1001', self.at(20))
+        self.assertEqual((refused.ok, refused.reason, refused.membership), (False, 'access_time', daytime))
+        self.assertFalse(Visit.objects.exists())
+
+        # Более поздний абонемент без ограничения по времени подходит
+        anytime = self.ending_in(40)
+        result = check_in('A-1001', self.at(20))
+        self.assertEqual((result.ok, result.membership), (True, anytime))
+
+    def test_no_visits_left(self):
+        from .checkin import check_in
+        used_up = self.ending_in(10, make_plan(name='10 посещений', visit_limit=10))
+        Membership.objects.filter(pk=used_up.pk).update(remaining_visits=0)
+        result = check_in('+996700123456', self.at(10))
+        self.assertEqual((result.ok, result.reason, result.client), (False, 'no_visits', self.member))
+
+    def test_unknown_client_and_no_membership(self):
+        from .checkin import check_in
+        self.assertEqual(check_in('0555000000', self.at(10)).reason, 'client_not_found')
+        self.assertEqual(check_in('   ', self.at(10)).reason, 'client_not_found')
+        # Абонемент закончился вчера
+        self.ending_in(-1)
+        result = check_in('0700123456', self.at(10))
+        self.assertEqual((result.ok, result.reason, result.client), (False, 'no_membership', self.member))
+
+
+class UnfreezeMembershipsTests(TestCase):
+    """Плановая разморозка (subscriptions.freezes.unfreeze_memberships)"""
+
+    def setUp(self):
+        self.today = timezone.localdate()
+        self.member = make_client()
+        self.plan = make_plan(can_freeze=True, max_freeze_days=14)
+        self.end_date = self.today + datetime.timedelta(days=20)
+
+    def frozen(self, frozen_days, closed_days=0):
+        membership = make_membership(self.member, self.plan, self.today - datetime.timedelta(days=40),
+                                     end_date=self.end_date, status='frozen', frozen_until=self.today)
+        if closed_days:
+            FreezePeriod.objects.create(
+                membership=membership, start_date=self.today - datetime.timedelta(days=35),
+                frozen_until=self.today - datetime.timedelta(days=35 - closed_days),
+                unfrozen_on=self.today - datetime.timedelta(days=35 - closed_days), days=closed_days,
+            )
+        if frozen_days is not None:
+            FreezePeriod.objects.create(
+                membership=membership, start_date=self.today - datetime.timedelta(days=frozen_days),
+                frozen_until=self.today,
+            )
+        return membership
+
+    def test_extends_end_date_by_frozen_days(self):
+        from .freezes import unfreeze_memberships
+        short, longer = self.frozen(3), self.frozen(10)
+
+        summary = unfreeze_memberships(self.today)
+
+        self.assertEqual((summary['unfrozen'], summary['days'], summary['capped']), (2, 13, 0))
+        for membership, days in ((short, 3), (longer, 10)):
+            membership.refresh_from_db()
+            self.assertEqual(membership.end_date, self.end_date + datetime.timedelta(days=days))
+            self.assertEqual((membership.status, membership.frozen_until), ('active', None))
+            period = membership.freeze_periods.get()
+            self.assertEqual((period.unfrozen_on, period.days), (self.today, days))
+        self.assertTrue(Client.objects.get(pk=self.member.pk).has_active_membership)
+
+    def test_capped_at_plan_limit(self):
+        from .freezes import unfreeze_memberships
+        membership = self.frozen(10, closed_days=10)
+
+        summary = unfreeze_memberships(self.today)
+
+        self.assertEqual((summary['days'], summary['capped']), (4, 1))
+        membership.refresh_from_db()
+        self.assertEqual(membership.end_date, self.end_date + datetime.timedelta(days=4))
+        self.assertEqual(membership.freeze_periods.get(unfrozen_on=self.today).days, 4)
+
+    def test_legacy_freeze_without_history(self):
+        from .freezes import unfreeze_memberships
+        membership = self.frozen(None)
+        # Начало заморозки неизвестно: берется дата последнего изменения
+        Membership.objects.filter(pk=membership.pk).update(
+            updated_at=timezone.now() - datetime.timedelta(days=7),
+        )
+
+        unfreeze_memberships(self.today)
+
+        membership.refresh_from_db()
+        self.assertEqual(membership.end_date, self.end_date + datetime.timedelta(days=7))
+        period = membership.freeze_periods.get()
+        self.assertEqual((period.start_date, period.unfrozen_on, period.days),
+                         (self.today - datetime.timedelta(days=7), self.today, 7))
+
+    def test_skips_manually_unfrozen_and_rerun_does_nothing(self):
+        from .freezes import _unfreeze_batch, unfreeze_memberships
+        membership = self.frozen(5)
+        stale = Membership.objects.select_related('plan').get(pk=membership.pk)
+        Membership.objects.filter(pk=membership.pk).update(status='active', frozen_until=None)
+
+        with transaction.atomic():
+            self.assertEqual(_unfreeze_batch([stale], timezone.now())['unfrozen'], 0)
+        self.assertEqual(Membership.objects.get(pk=membership.pk).end_date, self.end_date)
+        self.assertIsNone(membership.freeze_periods.get().unfrozen_on)
+
+        other = self.frozen(5)
+        self.assertEqual(unfreeze_memberships(self.today)['unfrozen'], 1)
+        self.assertEqual(unfreeze_memberships(self.today)['unfrozen'], 0)
+        other.refresh_from_db()
+        self.assertEqual(other.end_date, self.end_date + datetime.timedelta(days=5))
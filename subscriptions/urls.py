@@ -11,14 +11,23 @@ urlpatterns = [
     
     # Абонементы
     path('', views.membership_list, name='membership_list'),
+    path('autocomplete/', views.membership_autocomplete, name='membership_autocomplete'),
     path('create/', views.membership_create, name='membership_create'),
     path('<int:pk>/', views.membership_detail, name='membership_detail'),
     path('<int:pk>/update/', views.membership_update, name='membership_update'),
     path('<int:pk>/delete/', views.membership_delete, name='membership_delete'),
     path('<int:pk>/visit/', views.register_visit, name='register_visit'),
+    path('<int:pk>/freeze/', views.membership_freeze, name='membership_freeze'),
+    path('<int:pk>/unfreeze/', views.membership_unfreeze, name='membership_unfreeze'),
+    path('check-in/', views.check_in, name='check_in'),
     
     # Специальные страницы
     path('expiring/', views.membership_expiring, name='membership_expiring'),
     path('expired/', views.membership_expired, name='membership_expired'),
     path('statistics/', views.membership_statistics, name='membership_statistics'),
+    path('visits/statistics/', views.visit_statistics, name='visit_statistics'),
+    
+    # Выгрузки
+    path('export/csv/', views.export_memberships_data, {'fmt': 'csv'}, name='export_memberships_csv'),
+    path('export/ndjson/', views.export_memberships_data, {'fmt': 'ndjson'}, name='export_memberships_ndjson'),
 ]
\ No newline at end of file
@@ -1,11 +1,14 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.core.paginator import Paginator
-from django.db.models import Q
+from django.db.models import Q, Sum
+from django.db.models.functions import Coalesce
 from django.utils import timezone
 import datetime
-from .models import MembershipPlan, Membership
+from .models import MembershipPlan, Membership, DailyMembershipCounts
+from clients.search import filter_by_search
+from fitness_club.pagination import paginate
+from fitness_club.exports import stream_export
 from .forms import (
     MembershipPlanForm, MembershipForm, 
     MembershipUpdateForm, MembershipSearchForm
@@ -16,11 +19,12 @@ from .forms import (
 @login_required
 def membership_plan_list(request):
     """Список всех тарифных планов"""
-    plans = MembershipPlan.objects.all().order_by('display_order', 'name')
+    from .plan_cache import plan_registry
+    plans = plan_registry.all()
     
     # Разделяем на активные и неактивные
-    active_plans = plans.filter(is_active=True)
-    inactive_plans = plans.filter(is_active=False)
+    active_plans = [plan for plan in plans if plan.is_active]
+    inactive_plans = [plan for plan in plans if not plan.is_active]
     
     context = {
         'active_plans': active_plans,
@@ -99,62 +103,81 @@ def membership_plan_delete(request, pk):
 
 # === АБОНЕМЕНТЫ ===
 
-@login_required
-def membership_list(request):
-    """Список всех абонементов"""
-    form = MembershipSearchForm(request.GET or None)
-    memberships = Membership.objects.all().select_related('client', 'plan').order_by('-start_date')
+def filter_memberships(memberships, form):
+    """Применить фильтры MembershipSearchForm к выборке абонементов"""
+    if not form.is_valid():
+        return memberships
     
-    # Применяем фильтры поиска
-    if form.is_valid():
-        search = form.cleaned_data.get('search')
-        status = form.cleaned_data.get('status')
-        plan = form.cleaned_data.get('plan')
-        
-        if search:
-            memberships = memberships.filter(
-                Q(client__first_name__icontains=search) |
-                Q(client__last_name__icontains=search) |
-                Q(client__phone__icontains=search)
-            )
-        
-        if status:
-            memberships = memberships.filter(status=status)
-        
-        if plan:
-            memberships = memberships.filter(plan=plan)
+    search = form.cleaned_data.get('search')
+    status = form.cleaned_data.get('status')
+    plan = form.cleaned_data.get('plan')
     
-    # Фильтры для боковой панели
-    today = timezone.now().date()
+    if search:
+        memberships = filter_by_search(memberships, search, 'client_id')
     
-    # Активные абонементы
-    active_memberships = memberships.filter(status='active')
+    if status:
+        memberships = memberships.filter(status=status)
     
-    # Скоро истекающие (менее 7 дней)
-    week_later = today + datetime.timedelta(days=7)
-    expiring_soon = active_memberships.filter(
-        end_date__range=[today, week_later]
+    if plan:
+        memberships = memberships.filter(plan=plan)
+    
+    return memberships
+
+@login_required
+def membership_list(request):
+    """Список всех абонементов"""
+    form = MembershipSearchForm(request.GET or None)
+    memberships = filter_memberships(
+        Membership.objects.all().select_related('client', 'plan'),
+        form
     )
     
-    # Просроченные
-    expired = active_memberships.filter(end_date__lt=today)
+    # Счетчики боковой панели одним запросом (без фильтров - из кэша)
+    from .counts import get_membership_counts
+    today = timezone.localdate()
+    filtered = form.is_valid() and any(form.cleaned_data.values())
+    counts = get_membership_counts(memberships, filtered, today)
     
-    # Пагинация
-    paginator = Paginator(memberships, 15)  # 15 абонементов на страницу
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    # Пагинация: 15 абонементов на страницу
+    page_obj = paginate(request, memberships, ('-start_date', '-id'), 15)
     
     context = {
         'page_obj': page_obj,
         'form': form,
-        'total_memberships': memberships.count(),
-        'active_count': active_memberships.count(),
-        'expiring_soon_count': expiring_soon.count(),
-        'expired_count': expired.count(),
+        'total_memberships': counts['total'],
+        'active_count': counts['active'],
+        'expiring_soon_count': counts['expiring_soon'],
+        'expired_count': counts['expired'],
         'today': today,
     }
     return render(request, 'subscriptions/membership_list.html', context)
 
+@login_required
+def membership_autocomplete(request):
+    """JSON-поиск активных абонементов (по клиенту или по имени/телефону)"""
+    from django.http import JsonResponse
+    
+    memberships = Membership.objects.filter(status='active').select_related('client', 'plan')
+    
+    client_id = request.GET.get('client', '')
+    if client_id.isdigit():
+        memberships = memberships.filter(client_id=client_id)
+    
+    query = request.GET.get('q', '').strip()
+    if query:
+        memberships = filter_by_search(memberships, query, 'client_id')
+    
+    memberships = memberships.only(
+        'id', 'status', 'end_date',
+        'client__last_name', 'client__first_name', 'client__middle_name',
+        'plan__name',
+    ).order_by('-start_date', '-id')[:20]
+    results = [
+        {'id': membership.pk, 'text': f'{membership} до {membership.end_date:%d.%m.%Y}'}
+        for membership in memberships
+    ]
+    return JsonResponse({'results': results})
+
 @login_required
 def membership_detail(request, pk):
     """Детальная информация об абонементе"""
@@ -162,6 +185,7 @@ def membership_detail(request, pk):
     
     context = {
         'membership': membership,
+        'freeze_periods': membership.freeze_periods.all(),
     }
     return render(request, 'subscriptions/membership_detail.html', context)
 
@@ -235,16 +259,27 @@ def membership_expiring(request):
 
 @login_required
 def membership_expired(request):
-    """Список просроченных абонементов"""
-    today = timezone.now().date()
+    """
+    Список абонементов, истекших за последние ?days= дней (по умолчанию 30).
+    Статус 'expired' выставляет задача expire_memberships (cron каждую ночь).
+    """
+    try:
+        days = max(1, min(int(request.GET.get('days', 30)), 365))
+    except ValueError:
+        days = 30
+    today = timezone.localdate()
+    first_day = today - datetime.timedelta(days=days)
     
     expired_memberships = Membership.objects.filter(
-        status='active',
-        end_date__lt=today
-    ).select_related('client', 'plan').order_by('end_date')
+        status='expired',
+        end_date__gte=first_day
+    ).select_related('client', 'plan')
+    page_obj = paginate(request, expired_memberships, ('-end_date', '-id'), 20)
     
     context = {
-        'expired_memberships': expired_memberships,
+        'page_obj': page_obj,
+        'days': days,
+        'first_day': first_day,
         'today': today,
     }
     return render(request, 'subscriptions/membership_expired.html', context)
@@ -255,32 +290,108 @@ def register_visit(request, pk):
     membership = get_object_or_404(Membership, pk=pk)
     
     if request.method == 'POST':
-        if membership.can_enter():
-            if membership.use_visit():
-                messages.success(request, 
-                    f'Посещение зарегистрировано для {membership.client.get_full_name()}.')
-            else:
-                messages.warning(request, 
-                    f'Невозможно зарегистрировать посещение. Возможно, лимит исчерпан.')
+        from .visits import REFUSAL_MESSAGES, register_visit as register
+        
+        if not membership.plan.is_access_allowed():
+            messages.error(request, 
+                f'{REFUSAL_MESSAGES["access_time"]} Посещение не зарегистрировано.')
+            return redirect('membership_detail', pk=membership.pk)
+        
+        result = register(membership.pk)
+        if result.ok:
+            remaining = '' if result.remaining is None else f' Осталось посещений: {result.remaining}.'
+            messages.success(request, 
+                f'Посещение зарегистрировано для {membership.client.get_full_name()}.{remaining}')
         else:
             messages.error(request, 
-                f'Абонемент не активен или истек. Посещение не зарегистрировано.')
+                f'{REFUSAL_MESSAGES[result.reason]} Посещение не зарегистрировано.')
         
         return redirect('membership_detail', pk=membership.pk)
     
     context = {'membership': membership}
     return render(request, 'subscriptions/register_visit.html', context)
 
+@login_required
+def membership_freeze(request, pk):
+    """Заморозка абонемента до указанной даты"""
+    membership = get_object_or_404(Membership, pk=pk)
+    
+    if request.method == 'POST':
+        from django.core.exceptions import ValidationError
+        from .freezes import freeze_membership
+        
+        try:
+            until_date = datetime.date.fromisoformat(request.POST.get('frozen_until', ''))
+            freeze_membership(membership, until_date)
+        except ValueError:
+            messages.error(request, 'Укажите дату окончания заморозки.')
+        except ValidationError as exc:
+            messages.error(request, exc.messages[0])
+        else:
+            messages.success(request, f'Абонемент заморожен до {until_date:%d.%m.%Y}.')
+    
+    return redirect('membership_detail', pk=membership.pk)
+
+@login_required
+def membership_unfreeze(request, pk):
+    """Досрочная разморозка абонемента"""
+    membership = get_object_or_404(Membership, pk=pk)
+    
+    if request.method == 'POST':
+        if membership.status != 'frozen':
+            messages.error(request, 'Абонемент не заморожен.')
+        else:
+            from .freezes import unfreeze_membership
+            days = unfreeze_membership(membership)
+            messages.success(request, f'Абонемент разморожен, срок продлен на {days} дн.')
+    
+    return redirect('membership_detail', pk=membership.pk)
+
+@login_required
+def check_in(request):
+    """Вход клиента по телефону или номеру карты (ресепшен, турникет)"""
+    from django.http import JsonResponse
+    from .checkin import check_in as do_check_in
+    from .visits import REFUSAL_MESSAGES
+    
+    result = None
+    identifier = ''
+    if request.method == 'POST':
+        identifier = request.POST.get('identifier', '')
+        result = do_check_in(identifier)
+        
+        if 'application/json' in request.headers.get('Accept', ''):
+            return JsonResponse({
+                'ok': result.ok,
+                'reason': result.reason,
+                'message': REFUSAL_MESSAGES.get(result.reason, ''),
+                'client': result.client.get_full_name() if result.client else None,
+                'plan': result.membership.plan.name if result.membership else None,
+                'remaining_visits': result.remaining,
+            }, status=200 if result.ok else 403)
+    
+    context = {
+        'result': result,
+        'identifier': identifier,
+        'message': REFUSAL_MESSAGES.get(result.reason, '') if result else '',
+    }
+    return render(request, 'subscriptions/check_in.html', context)
+
 @login_required
 def membership_statistics(request):
     """Статистика по абонементам"""
-    today = timezone.now().date()
+    today = timezone.localdate()
+    thirty_days_ago = today - datetime.timedelta(days=30)
     
-    # Общая статистика
-    total_memberships = Membership.objects.count()
-    active_memberships = Membership.objects.filter(status='active').count()
-    expired_memberships = Membership.objects.filter(status='expired').count()
-    frozen_memberships = Membership.objects.filter(status='frozen').count()
+    # Общая статистика из дневных сводок
+    totals = DailyMembershipCounts.objects.aggregate(
+        total_memberships=Sum('count'),
+        active_memberships=Sum('count', filter=Q(status='active')),
+        expired_memberships=Sum('count', filter=Q(status='expired')),
+        frozen_memberships=Sum('count', filter=Q(status='frozen')),
+        # Новые абонементы за последние 30 дней
+        new_memberships=Sum('count', filter=Q(date__gte=thirty_days_ago)),
+    )
     
     # Скоро истекающие
     week_later = today + datetime.timedelta(days=7)
@@ -289,33 +400,64 @@ def membership_statistics(request):
         end_date__range=[today, week_later]
     ).count()
     
-    # Просроченные (но еще активные в системе)
-    actually_expired = Membership.objects.filter(
-        status='active',
-        end_date__lt=today
-    ).count()
-    
     # Распределение по тарифам
-    from django.db.models import Count
     plans_stats = MembershipPlan.objects.annotate(
-        active_count=Count('memberships', filter=Q(memberships__status='active'))
+        active_count=Coalesce(
+            Sum('daily_counts__count', filter=Q(daily_counts__status='active')), 0
+        )
     ).values('name', 'active_count').order_by('-active_count')
     
-    # Новые абонементы за последние 30 дней
-    thirty_days_ago = today - datetime.timedelta(days=30)
-    new_memberships = Membership.objects.filter(
-        start_date__gte=thirty_days_ago
-    ).count()
-    
     context = {
-        'total_memberships': total_memberships,
-        'active_memberships': active_memberships,
-        'expired_memberships': expired_memberships,
-        'frozen_memberships': frozen_memberships,
+        'total_memberships': totals['total_memberships'] or 0,
+        'active_memberships': totals['active_memberships'] or 0,
+        'expired_memberships': totals['expired_memberships'] or 0,
+        'frozen_memberships': totals['frozen_memberships'] or 0,
         'expiring_soon': expiring_soon,
-        'actually_expired': actually_expired,
         'plans_stats': plans_stats,
-        'new_memberships': new_memberships,
+        'new_memberships': totals['new_memberships'] or 0,
+        'today': today,
+    }
+    return render(request, 'subscriptions/membership_statistics.html', context)
+
+# Колонки машиночитаемой выгрузки абонементов
+MEMBERSHIP_EXPORT_COLUMNS = [
+    'id', 'client_id', 'client__last_name', 'client__first_name', 'client__phone',
+    'plan_id', 'plan__name', 'start_date', 'end_date', 'remaining_visits',
+    'status', 'auto_renewal', 'frozen_until',
+]
+
+@login_required
+def export_memberships_data(request, fmt):
+    """Потоковая выгрузка абонементов в CSV/NDJSON (с учетом фильтров списка)"""
+    form = MembershipSearchForm(request.GET or None)
+    memberships = filter_memberships(Membership.objects.all(), form).order_by('id')
+    return stream_export(memberships, MEMBERSHIP_EXPORT_COLUMNS, fmt, 'memberships')
+
+@login_required
+def visit_statistics(request):
+    """Посещаемость по часам и дням недели (из почасовых сводок)"""
+    from .occupancy import hourly_profile, weekday_profile
+    
+    try:
+        days = max(1, min(int(request.GET.get('days', 30)), 365))
+    except ValueError:
+        days = 30
+    today = timezone.localdate()
+    first_day = today - datetime.timedelta(days=days - 1)
+    
+    hourly = hourly_profile(first_day, today)
+    weekdays = weekday_profile(first_day, today)
+    peak_hour = max(range(24), key=lambda hour: hourly[hour]) if any(hourly) else None
+    
+    context = {
+        'days': days,
+        'first_day': first_day,
         'today': today,
+        'hour_labels': [f'{hour:02d}:00' for hour in range(24)],
+        'hourly': hourly,
+        'weekday_labels': ['Пн', 'Вт', 'Ср', 'Чт', 'Пт', 'Сб', 'Вс'],
+        'weekdays': weekdays,
+        'peak_hour': peak_hour,
+        'total_entries': sum(weekdays),
     }
-    return render(request, 'subscriptions/membership_statistics.html', context)
\ No newline at end of file
+    return render(request, 'subscriptions/visit_statistics.html', context)
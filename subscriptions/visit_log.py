@@ -0,0 +1,108 @@
+import atexit
+import logging
+import threading
+from collections import Counter
+from django.conf import settings
+from django.db import connections, transaction
+from django.utils import timezone
+from .models import Visit
+from .occupancy import add_counts_to_occupancy, add_visits_to_occupancy, hour_key
+
+logger = logging.getLogger(__name__)
+
+VISIT_BUFFER_SIZE = getattr(settings, 'VISIT_BUFFER_SIZE', 100)
+VISIT_FLUSH_INTERVAL = getattr(settings, 'VISIT_FLUSH_INTERVAL', 5)
+
+
+class OccupancyBuffer:
+    """
+    Буфер почасовой загрузки: проходы уже записаны в журнал Visit, а их
+    счетчики копятся в памяти процесса и прибавляются к HourlyOccupancy
+    одной пачкой, когда набирается max_size проходов или проходит interval
+    секунд с первого прохода в буфере (и при завершении процесса).
+
+    При аварийной остановке процесса теряются только несброшенные счетчики
+    (проходы последних interval секунд); журнал цел, и backfill_rollups
+    пересобирает по нему HourlyOccupancy.
+    """
+
+    def __init__(self, max_size=VISIT_BUFFER_SIZE, interval=VISIT_FLUSH_INTERVAL):
+        self.max_size = max_size
+        self.interval = interval
+        self._counts = Counter()
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._timer = None
+
+    def add(self, visit):
+        with self._lock:
+            self._counts[hour_key(visit.timestamp), visit.direction] += 1
+            self._pending += 1
+            full = self._pending >= self.max_size
+            if not full and self._timer is None and self.interval:
+                self._timer = threading.Timer(self.interval, self._flush_from_timer)
+                self._timer.daemon = True
+                self._timer.start()
+        if full or not self.interval:
+            self.flush()
+
+    def flush(self):
+        """Прибавить накопленные счетчики к HourlyOccupancy; возвращает число проходов"""
+        with self._lock:
+            counts, self._counts = self._counts, Counter()
+            pending, self._pending = self._pending, 0
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+        if not pending:
+            return 0
+        try:
+            add_counts_to_occupancy(counts)
+        except Exception:
+            # Не теряем счетчики: вернем их в буфер до следующей попытки
+            with self._lock:
+                self._counts.update(counts)
+                self._pending += pending
+            raise
+        return pending
+
+    def _flush_from_timer(self):
+        try:
+            self.flush()
+        except Exception:
+            logger.exception('Occupancy flush failed')
+        finally:
+            connections.close_all()
+
+    def __len__(self):
+        return self._pending
+
+
+occupancy_buffer = OccupancyBuffer()
+
+
+def log_visit(client_id, membership_id=None, direction='in', timestamp=None, buffered=True):
+    """
+    Записать проход в журнал сразу (в текущей транзакции). Почасовой
+    счетчик обновляется через буфер после коммита, а при buffered=False -
+    тут же, в той же транзакции.
+    """
+    visit = Visit.objects.create(
+        client_id=client_id,
+        membership_id=membership_id,
+        direction=direction,
+        timestamp=timestamp or timezone.now(),
+    )
+    if buffered:
+        transaction.on_commit(lambda: occupancy_buffer.add(visit))
+    else:
+        add_visits_to_occupancy([visit])
+    return visit
+
+
+@atexit.register
+def _flush_on_exit():
+    try:
+        occupancy_buffer.flush()
+    except Exception:
+        logger.exception('Occupancy flush at exit failed')
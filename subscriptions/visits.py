@@ -0,0 +1,97 @@
+from collections import namedtuple
+from django.db import transaction
+from django.db.models import Case, F, Q, Value, When
+from django.utils import timezone
+from .models import Membership
+from .rollups import memberships_changed
+from .visit_log import log_visit
+
+# ok - вход разрешен; remaining - остаток посещений после входа (None - безлимит);
+# reason - почему вход запрещен: 'not_found', 'inactive', 'not_started', 'expired',
+# 'no_visits', 'access_time' (для входа по телефону/карте также 'client_not_found', 'no_membership')
+VisitResult = namedtuple('VisitResult', ['ok', 'remaining', 'reason'])
+
+REFUSAL_MESSAGES = {
+    'not_found': 'Абонемент не найден.',
+    'inactive': 'Абонемент не активен.',
+    'not_started': 'Абонемент еще не начал действовать.',
+    'expired': 'Срок действия абонемента истек.',
+    'no_visits': 'Посещения по абонементу закончились.',
+    'access_time': 'По тарифу вход в это время не разрешен.',
+    'client_not_found': 'Клиент с таким телефоном или картой не найден.',
+    'no_membership': 'У клиента нет действующего абонемента.',
+}
+
+
+def _allowed(membership_id, today):
+    return Membership.objects.filter(
+        Q(end_date__isnull=True) | Q(end_date__gte=today),
+        Q(remaining_visits__isnull=True) | Q(remaining_visits__gt=0),
+        pk=membership_id,
+        status='active',
+        start_date__lte=today,
+    )
+
+
+def _decrement(membership_id, today, now):
+    """
+    Списать посещение одним условным UPDATE; возвращает (остаток, статус,
+    дата начала, клиент) или None, если вход не разрешен. Вызывается внутри
+    транзакции: строка заблокирована UPDATE до чтения остатка.
+    """
+    updated = _allowed(membership_id, today).update(
+        remaining_visits=F('remaining_visits') - 1,
+        status=Case(
+            When(remaining_visits__lte=1, then=Value('expired')),
+            default=F('status'),
+        ),
+        updated_at=now,
+    )
+    if not updated:
+        return None
+    return Membership.objects.filter(pk=membership_id).values_list(
+        'remaining_visits', 'status', 'start_date', 'client_id'
+    ).first()
+
+
+def _refusal_reason(membership_id, today):
+    """Почему вход не разрешен (дополнительный запрос только при отказе)"""
+    row = Membership.objects.filter(pk=membership_id).values_list(
+        'status', 'start_date', 'end_date', 'remaining_visits'
+    ).first()
+    if row is None:
+        return 'not_found'
+    status, start_date, end_date, remaining_visits = row
+    if status != 'active':
+        return 'no_visits' if status == 'expired' and remaining_visits == 0 else 'inactive'
+    if start_date > today:
+        return 'not_started'
+    if end_date and end_date < today:
+        return 'expired'
+    return 'no_visits'
+
+
+def register_visit(membership_id, today=None, buffered=True):
+    """
+    Зарегистрировать посещение по абонементу.
+
+    Проверка и списание выполняются одним условным UPDATE, поэтому два
+    одновременных прохода через турникет не могут списать одно посещение
+    дважды или пройти по последнему посещению вдвоем. Проход записывается
+    в журнал посещений в той же транзакции; почасовая загрузка обновляется
+    через буфер, а при buffered=False - сразу. Возвращает VisitResult.
+    """
+    today = today or timezone.localdate()
+    now = timezone.now()
+    with transaction.atomic():
+        row = _decrement(membership_id, today, now)
+        if row is None:
+            return VisitResult(False, None, _refusal_reason(membership_id, today))
+
+        remaining, status, start_date, client_id = row
+        log_visit(client_id, membership_id, timestamp=now, buffered=buffered)
+
+    if status == 'expired':
+        # Последнее посещение: абонемент истек, обновляем сводки
+        memberships_changed({start_date}, {client_id})
+    return VisitResult(True, remaining, None)